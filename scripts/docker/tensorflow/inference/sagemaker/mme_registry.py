@@ -0,0 +1,302 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Shared registry of the TFS processes serving multi-model endpoint models.
+
+Every gunicorn worker needs the same model name -> [TfsInstanceStatus] map.
+It lives in a SQLite database in WAL mode:
+
+* readers never block and never take multi_model_utils.lock(); a worker checks
+  the registry version (one indexed row) per invocation and re-reads the map
+  only when another worker has changed it;
+* writers replace or delete one model's rows in a single transaction, so a
+  load or unload costs O(instances of that model), not a rewrite of the whole
+  map. Writers are already serialized by multi_model_utils.lock().
+
+Each write bumps the registry version and stamps the written rows with it as
+their generation, so a worker can tell a model that was unloaded and loaded
+again under the same name from the one it has cached.
+
+model_stats holds per-model usage shared by all workers: last invocation time
+(the LRU eviction order), load count and latency, and eviction count. Its
+writes do not bump the version; they never change routing.
+
+warm_tfs lists the pre-spawned TFS processes that serve no model yet, with
+the ports they hold; a load claims one instead of starting a process. Like
+model_stats, it is not routing state and does not bump the version.
+"""
+
+import logging
+import os
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+MME_REGISTRY_PATH = "/sagemaker/tfs_instance.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS registry_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO registry_version (id, version) VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS tfs_instances (
+    model_name TEXT NOT NULL,
+    instance_index INTEGER NOT NULL,
+    rest_port INTEGER NOT NULL,
+    grpc_port INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    PRIMARY KEY (model_name, instance_index)
+);
+CREATE TABLE IF NOT EXISTS model_stats (
+    model_name TEXT PRIMARY KEY,
+    last_used REAL NOT NULL DEFAULT 0,
+    loads INTEGER NOT NULL DEFAULT 0,
+    last_load_seconds REAL NOT NULL DEFAULT 0,
+    load_seconds_total REAL NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS warm_tfs (
+    rest_port INTEGER PRIMARY KEY,
+    grpc_port INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL
+);
+"""
+
+
+class TfsInstanceStatus:
+    def __init__(self, rest_port: int, grpc_port: int, pid: int, generation: int = 0):
+        self.rest_port = rest_port
+        self.grpc_port = grpc_port
+        self.pid = pid
+        self.generation = generation
+
+    def __repr__(self):
+        return (
+            f"TFS Instance Status (rest_port : {self.rest_port}, grpc_port: {self.grpc_port}, "
+            f"pid: {self.pid}, generation: {self.generation})"
+        )
+
+
+class ModelRegistry:
+    """Process-local handle on the shared registry database.
+
+    The connection is opened lazily and per pid: python_service builds its
+    resources before gunicorn forks, and an SQLite connection must not cross a
+    fork.
+    """
+
+    def __init__(self, path=MME_REGISTRY_PATH):
+        self._path = path
+        self._conn = None
+        self._conn_pid = None
+
+    def _connection(self):
+        pid = os.getpid()
+        if self._conn is None or self._conn_pid != pid:
+            # isolation_level=None: transactions are explicit (BEGIN below).
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # The registry is rebuilt by loads after a container restart, so
+            # losing the last commits on power loss is acceptable.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("BEGIN IMMEDIATE;" + _SCHEMA + "COMMIT;")
+            log.info("opened mme registry %s (pid: %s)", self._path, pid)
+            self._conn, self._conn_pid = conn, pid
+        return self._conn
+
+    def version(self):
+        """Return the registry version; it changes on every committed write."""
+        row = self._connection().execute("SELECT version FROM registry_version").fetchone()
+        return row[0]
+
+    def snapshot(self):
+        """Return (version, {model_name: [TfsInstanceStatus]}) from one read transaction."""
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT version FROM registry_version").fetchone()[0]
+            rows = conn.execute(
+                "SELECT model_name, rest_port, grpc_port, pid, generation FROM tfs_instances "
+                "ORDER BY model_name, instance_index"
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        instances = {}
+        for model_name, rest_port, grpc_port, pid, generation in rows:
+            instances.setdefault(model_name, []).append(
+                TfsInstanceStatus(rest_port, grpc_port, pid, generation)
+            )
+        return version, instances
+
+    def put(self, model_name, instances):
+        """Replace model_name's instances with `instances`; return their generation.
+
+        Updates each TfsInstanceStatus.generation in place.
+        """
+        return self.put_many({model_name: instances})
+
+    def put_many(self, instances_by_model):
+        """Replace the instances of every model in {model_name: instances} in one commit.
+
+        All of them get the same new generation, which is returned; each
+        TfsInstanceStatus.generation is updated in place.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            generation = self._bump_version(conn)
+            conn.executemany(
+                "DELETE FROM tfs_instances WHERE model_name = ?",
+                [(model_name,) for model_name in instances_by_model],
+            )
+            conn.executemany(
+                "INSERT INTO tfs_instances VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (model_name, i, status.rest_port, status.grpc_port, status.pid, generation)
+                    for model_name, instances in instances_by_model.items()
+                    for i, status in enumerate(instances)
+                ],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        for instances in instances_by_model.values():
+            for status in instances:
+                status.generation = generation
+        return generation
+
+    def remove(self, model_name):
+        """Delete model_name's instances; return True if it was registered."""
+        return bool(self.remove_many([model_name]))
+
+    def remove_many(self, model_names):
+        """Delete the instances of model_names in one commit; return the names that were registered."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = [
+                model_name
+                for model_name in model_names
+                if conn.execute(
+                    "DELETE FROM tfs_instances WHERE model_name = ?", (model_name,)
+                ).rowcount
+                > 0
+            ]
+            if removed:
+                self._bump_version(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return removed
+
+    @staticmethod
+    def _bump_version(conn):
+        conn.execute("UPDATE registry_version SET version = version + 1")
+        return conn.execute("SELECT version FROM registry_version").fetchone()[0]
+
+    def touch(self, model_name, timestamp):
+        """Record an invocation of model_name at `timestamp` (time.time())."""
+        self.touch_many({model_name: timestamp})
+
+    def touch_many(self, timestamps):
+        """Record the invocations in {model_name: timestamp} in one commit.
+
+        last_used never moves backwards, so workers may flush in any order.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE model_stats SET last_used = MAX(last_used, ?) WHERE model_name = ?",
+                [(timestamp, model_name) for model_name, timestamp in timestamps.items()],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def record_load(self, model_name, seconds, timestamp):
+        """Count a successful load that took `seconds`; it counts as a use."""
+        self._connection().execute(
+            "INSERT INTO model_stats (model_name, last_used, loads, last_load_seconds, "
+            "load_seconds_total) VALUES (?1, ?2, 1, ?3, ?3) "
+            "ON CONFLICT (model_name) DO UPDATE SET last_used = ?2, loads = loads + 1, "
+            "last_load_seconds = ?3, load_seconds_total = load_seconds_total + ?3",
+            (model_name, timestamp, seconds),
+        )
+
+    def record_eviction(self, model_name):
+        self._connection().execute(
+            "UPDATE model_stats SET evictions = evictions + 1 WHERE model_name = ?", (model_name,)
+        )
+
+    def least_recently_used(self):
+        """Return registered model names, least recently invoked first."""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT DISTINCT i.model_name FROM tfs_instances i "
+                "LEFT JOIN model_stats s ON s.model_name = i.model_name "
+                "ORDER BY COALESCE(s.last_used, 0), i.model_name"
+            )
+            .fetchall()
+        )
+        return [row[0] for row in rows]
+
+    def stats(self):
+        """Return {model_name: {last_used, loads, last_load_seconds, ...}} for every model seen."""
+        cursor = self._connection().execute(
+            "SELECT model_name, last_used, loads, last_load_seconds, load_seconds_total, "
+            "evictions FROM model_stats ORDER BY model_name"
+        )
+        columns = [column[0] for column in cursor.description[1:]]
+        return {row[0]: dict(zip(columns, row[1:])) for row in cursor.fetchall()}
+
+    def add_warm(self, status, timestamp):
+        """Record a warm TFS process (TfsInstanceStatus) started at `timestamp`."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO warm_tfs VALUES (?, ?, ?, ?)",
+            (status.rest_port, status.grpc_port, status.pid, timestamp),
+        )
+
+    def claim_warm(self):
+        """Remove and return the longest-running warm TFS (TfsInstanceStatus), or None."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT rest_port, grpc_port, pid FROM warm_tfs ORDER BY started LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM warm_tfs WHERE rest_port = ?", (row[0],))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return TfsInstanceStatus(*row) if row is not None else None
+
+    def remove_warm(self, rest_port):
+        self._connection().execute("DELETE FROM warm_tfs WHERE rest_port = ?", (rest_port,))
+
+    def warm_instances(self):
+        """Return the warm TFS processes (TfsInstanceStatus), oldest first."""
+        rows = (
+            self._connection()
+            .execute("SELECT rest_port, grpc_port, pid FROM warm_tfs ORDER BY started")
+            .fetchall()
+        )
+        return [TfsInstanceStatus(*row) for row in rows]
@@ -17,6 +17,8 @@ import threading
 import time
 from contextlib import contextmanager
 
+import tfs_metrics
+
 log = logging.getLogger(__name__)
 
 MODEL_CONFIG_FILE = "/sagemaker/model-config.cfg"
@@ -49,6 +51,7 @@ def lock(path=DEFAULT_LOCK_FILE, poll_interval=0.05, timeout=60.0):
     """
     global _LOCK_FH
 
+    start = time.monotonic()
     deadline = time.time() + timeout
     remaining = timeout
 
@@ -71,6 +74,7 @@ def lock(path=DEFAULT_LOCK_FILE, poll_interval=0.05, timeout=60.0):
                         "timed out acquiring MME file lock at {} after {}s".format(path, timeout)
                     )
                 time.sleep(poll_interval)
+        tfs_metrics.observe("sagemaker_tfs_mme_lock_wait_seconds", time.monotonic() - start)
         try:
             yield
         finally:
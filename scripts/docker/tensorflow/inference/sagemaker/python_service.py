@@ -17,23 +17,32 @@ import gevent.monkey
 gevent.monkey.patch_all()
 
 import argparse  # noqa: E402
+import collections  # noqa: E402
 import copy  # noqa: E402
+import functools  # noqa: E402
 import importlib.util  # noqa: E402
 import json  # noqa: E402
 import logging  # noqa: E402
 import os  # noqa: E402
-import pickle  # noqa: E402
-import random  # noqa: E402
 import re  # noqa: E402
 import shutil  # noqa: E402
 import signal  # noqa: E402
 import subprocess  # noqa: E402
-import sys  # noqa: E402
+import time  # noqa: E402
 
 import falcon  # noqa: E402
+import gevent  # noqa: E402
+import gevent.pool  # noqa: E402
 import grpc  # noqa: E402
 import requests  # noqa: E402
+import tfs_balancer  # noqa: E402
+import tfs_convert  # noqa: E402
+import tfs_grpc_utils  # noqa: E402
+import tfs_handlers  # noqa: E402
+import tfs_metrics  # noqa: E402
+import tfs_microbatch  # noqa: E402
 import tfs_utils  # noqa: E402
+from mme_registry import ModelRegistry, TfsInstanceStatus  # noqa: E402
 from multi_model_utils import MultiModelException, lock  # noqa: E402
 
 SAGEMAKER_MULTI_MODEL_ENABLED = os.environ.get("SAGEMAKER_MULTI_MODEL", "false").lower() == "true"
@@ -49,6 +58,51 @@ TFS_GRPC_PORTS = os.environ.get("TFS_GRPC_PORTS")
 TFS_REST_PORTS = os.environ.get("TFS_REST_PORTS")
 SAGEMAKER_TFS_PORT_RANGE = os.environ.get("SAGEMAKER_SAFE_PORT_RANGE")
 TFS_INSTANCE_COUNT = int(os.environ.get("SAGEMAKER_TFS_INSTANCE_COUNT", "1"))
+# Transport used by the default handler: "rest" (JSON to the TFS REST API) or
+# "grpc" (PredictRequest with raw tensor bytes over the worker's gRPC channel).
+SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL = os.environ.get(
+    "SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL", "rest"
+).lower()
+# MME admission: when a load would exceed the port range or push projected
+# memory use past the threshold (percent of MemTotal), evict least recently
+# invoked models first instead of answering 507.
+SAGEMAKER_TFS_MME_LRU_EVICTION = (
+    os.environ.get("SAGEMAKER_TFS_MME_LRU_EVICTION", "false").lower() == "true"
+)
+SAGEMAKER_TFS_MME_MEMORY_THRESHOLD = float(
+    os.environ.get("SAGEMAKER_TFS_MME_MEMORY_THRESHOLD", "70")
+)
+# MME models hosted by this many shared TFS processes (started by serve.py and
+# reconfigured with HandleReloadConfigRequest); 0 spawns one TFS per model.
+SAGEMAKER_TFS_MME_SHARED_INSTANCES = (
+    int(os.environ.get("SAGEMAKER_TFS_MME_SHARED_INSTANCES", "0"))
+    if SAGEMAKER_MULTI_MODEL_ENABLED
+    else 0
+)
+# Opt-in coalescing of concurrent input_handler outputs into one TFS predict
+# request (see tfs_microbatch): at most MAX_SIZE rows, held at most MAX_WAIT_MS.
+SAGEMAKER_TFS_MICRO_BATCHING = (
+    os.environ.get("SAGEMAKER_TFS_MICRO_BATCHING", "false").lower() == "true"
+)
+SAGEMAKER_TFS_MICRO_BATCH_MAX_SIZE = int(os.environ.get("SAGEMAKER_TFS_MICRO_BATCH_MAX_SIZE", "32"))
+SAGEMAKER_TFS_MICRO_BATCH_MAX_WAIT_MS = float(
+    os.environ.get("SAGEMAKER_TFS_MICRO_BATCH_MAX_WAIT_MS", "2")
+)
+# MME keeps this many idle TFS processes started (empty model config, reserved
+# port pair) so a load only pushes a config reload instead of paying process
+# and TF runtime start-up. Not used with shared instances, which are always up.
+SAGEMAKER_TFS_MME_WARM_POOL_SIZE = (
+    int(os.environ.get("SAGEMAKER_TFS_MME_WARM_POOL_SIZE", "0"))
+    if SAGEMAKER_MULTI_MODEL_ENABLED and not SAGEMAKER_TFS_MME_SHARED_INSTANCES
+    else 0
+)
+# Bulk POST /models runs at most this many model loads at a time.
+SAGEMAKER_TFS_MME_BULK_LOAD_CONCURRENCY = int(
+    os.environ.get("SAGEMAKER_TFS_MME_BULK_LOAD_CONCURRENCY", "4")
+)
+# Last-invocation times are kept in memory and each worker writes them to the
+# registry, in one transaction, at most this often.
+MME_TOUCH_INTERVAL_SECONDS = 1.0
 
 logging.basicConfig(
     format="%(process)d %(asctime)s %(levelname)-8s %(message)s", force=True, level=logging.INFO
@@ -56,13 +110,74 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 CUSTOM_ATTRIBUTES_HEADER = "X-Amzn-SageMaker-Custom-Attributes"
-MME_TFS_INSTANCE_STATUS_FILE = "/sagemaker/tfs_instance.pickle"
 
 
-def default_handler(data, context):
-    """Send POST to TFS rest port; propagate TFS error status to the caller."""
-    data = data.read().decode("utf-8")
-    response = requests.post(context.rest_uri, data=data, timeout=context.timeout)
+def default_handler(data, context, default_model_name=None):
+    """Send POST to TFS rest port; propagate TFS error status to the caller.
+
+    .npy/.npz bodies and Accept types have no REST form, so they always go
+    over gRPC via grpc_default_handler. Other bodies are streamed to TFS in
+    SAGEMAKER_TFS_REQUEST_CHUNK_SIZE pieces without being read into memory.
+    """
+    if tfs_grpc_utils.is_binary_tensor_request(context.request_content_type, context.accept_header):
+        return grpc_default_handler(data, context, default_model_name)
+    return _post_to_tfs_rest(tfs_utils.RequestBodyStream(data, context.content_length), context)
+
+
+def grpc_default_handler(data, context, default_model_name=None):
+    """Send a gRPC PredictRequest over context.channel; REST for REST-only payloads.
+
+    classify/regress, tf.Example, b64 and other payloads the fast path cannot
+    pack exactly go to the REST API unchanged, so behavior matches default_handler.
+    """
+    body = data.read()
+    binary = tfs_grpc_utils.is_binary_tensor_request(
+        context.request_content_type, context.accept_header
+    )
+    if binary and not tfs_grpc_utils.grpc_available():
+        raise falcon.HTTPError(
+            falcon.HTTP_415,
+            description=json.dumps({"error": "npy/npz tensors need the TFS gRPC messages"}),
+        )
+    if context.channel is None or (context.method or "predict") != "predict":
+        if binary:
+            raise falcon.HTTPError(
+                falcon.HTTP_400,
+                description=json.dumps(
+                    {"error": "npy/npz tensors are only supported for predict requests"}
+                ),
+            )
+        return _post_to_tfs_rest(body, context)
+    try:
+        request_tensors = tfs_grpc_utils.parse_payload(body, context.request_content_type)
+        outputs = tfs_grpc_utils.predict(
+            context.channel,
+            context.model_name or default_model_name,
+            context.model_version,
+            request_tensors,
+            context.timeout,
+        )
+        return tfs_grpc_utils.encode_response(
+            outputs, request_tensors.row_format, context.accept_header
+        )
+    except tfs_grpc_utils.UnsupportedAcceptError as e:
+        raise falcon.HTTPError(falcon.HTTP_406, description=json.dumps({"error": str(e)}))
+    except tfs_grpc_utils.UnsupportedPayloadError as e:
+        if binary:
+            raise falcon.HTTPError(falcon.HTTP_400, description=json.dumps({"error": str(e)}))
+        log.info("gRPC fast path not applicable (%s); using REST", e)
+        return _post_to_tfs_rest(body, context)
+    except grpc.RpcError as e:
+        raise falcon.HTTPError(
+            falcon.code_to_http_status(tfs_grpc_utils.rpc_error_status(e)),
+            description=json.dumps({"error": e.details()}),
+        )
+
+
+def _post_to_tfs_rest(data, context):
+    response = tfs_utils.get_tfs_session().post(
+        context.rest_uri, data=data, timeout=context.timeout
+    )
     if response.status_code != 200:
         raise falcon.HTTPError(
             falcon.code_to_http_status(response.status_code),
@@ -71,37 +186,66 @@ def default_handler(data, context):
     return response.content, context.accept_header
 
 
-class TfsInstanceStatus:
-    def __init__(self, rest_port: str, grpc_port: str, pid: int):
-        self.rest_port = rest_port
-        self.grpc_port = grpc_port
-        self.pid = pid
-
-    def __repr__(self):
-        return f"TFS Instance Status (rest_port : {self.rest_port}, grpc_port: {self.grpc_port}, pid: {self.pid}))"
-
-
 class PythonServiceResource:
     def __init__(self):
+        self._channels = {}
+        self._tfs_default_model_name = os.environ.get("TFS_DEFAULT_MODEL_NAME", "None")
         if SAGEMAKER_MULTI_MODEL_ENABLED:
             self._mme_tfs_instances_status: dict[str, list[TfsInstanceStatus]] = {}
+            self._mme_registry = ModelRegistry()
+            self._mme_registry_version = None
+            self._mme_pending_touches = {}
+            self._mme_touch_flusher_pid = None
+            if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+                # models are added and removed with gRPC config reloads
+                if not tfs_grpc_utils.grpc_available():
+                    raise RuntimeError(
+                        "SAGEMAKER_TFS_MME_SHARED_INSTANCES is set but TFS config reloads "
+                        "cannot be sent: the TFS gRPC messages cannot be imported"
+                    )
+                self._tfs_shared_grpc_ports = [
+                    int(port) for port in self._parse_concat_ports(TFS_GRPC_PORTS)
+                ]
+                self._tfs_shared_rest_ports = [
+                    int(port) for port in self._parse_concat_ports(TFS_REST_PORTS)
+                ]
             self._tfs_ports = self._parse_sagemaker_port_range_mme(SAGEMAKER_TFS_PORT_RANGE)
             self._tfs_available_ports = self._parse_sagemaker_port_range_mme(
                 SAGEMAKER_TFS_PORT_RANGE
             )
-            # If Multi-Model mode is enabled, dependencies/handlers will be imported
-            # during the _handle_load_model_post()
-            self.model_handlers = {}
+            # ports taken by the load in progress (under lock()) but not yet in
+            # _mme_tfs_instances_status; an eviction must not hand them out again
+            self._mme_reserved_ports = set()
+            # Model-specific inference.py handlers, imported on a model's first
+            # invocation in each worker
+            self.model_handlers = tfs_handlers.HandlerCache(self._make_handler)
+            balanced_ports = (
+                self._tfs_shared_rest_ports
+                if SAGEMAKER_TFS_MME_SHARED_INSTANCES
+                else self._tfs_ports["rest_port"]
+            )
         else:
             self._tfs_grpc_ports = self._parse_concat_ports(TFS_GRPC_PORTS)
             self._tfs_rest_ports = self._parse_concat_ports(TFS_REST_PORTS)
+            balanced_ports = self._tfs_rest_ports
 
-            self._channels = {}
             for grpc_port in self._tfs_grpc_ports:
                 # Initialize grpc channel here so gunicorn worker could have mapping
                 # between each grpc port and channel
                 self._setup_channel(grpc_port)
 
+        # Built before gunicorn forks so every worker shares the load table;
+        # spare rows let respawned workers claim a row without waiting.
+        self._balancer = tfs_balancer.LoadBalancer(
+            balanced_ports, int(os.environ.get("SAGEMAKER_GUNICORN_WORKERS", 1)) + 4
+        )
+
+        self._micro_batcher = None
+        if SAGEMAKER_TFS_MICRO_BATCHING:
+            self._micro_batcher = tfs_microbatch.MicroBatcher(
+                SAGEMAKER_TFS_MICRO_BATCH_MAX_SIZE, SAGEMAKER_TFS_MICRO_BATCH_MAX_WAIT_MS / 1000.0
+            )
+
         self._default_handlers_enabled = False
         if os.path.exists(INFERENCE_SCRIPT_PATH):
             # Single-Model Mode & Multi-Model Mode both use one inference.py
@@ -110,29 +254,90 @@ class PythonServiceResource:
                 self._handler, self._input_handler, self._output_handler
             )
         else:
-            self._handlers = default_handler
+            self._handlers = functools.partial(
+                default_handler, default_model_name=self._tfs_default_model_name
+            )
             self._default_handlers_enabled = True
 
         self._tfs_enable_batching = SAGEMAKER_BATCHING_ENABLED == "true"
-        self._tfs_default_model_name = os.environ.get("TFS_DEFAULT_MODEL_NAME", "None")
         self._tfs_inter_op_parallelism = os.environ.get("SAGEMAKER_TFS_INTER_OP_PARALLELISM", 0)
         self._tfs_intra_op_parallelism = os.environ.get("SAGEMAKER_TFS_INTRA_OP_PARALLELISM", 0)
         self._tfs_instance_count = int(os.environ.get("SAGEMAKER_TFS_INSTANCE_COUNT", 1))
         self._gunicorn_workers = int(os.environ.get("SAGEMAKER_GUNICORN_WORKERS", 1))
         self._tfs_wait_time_seconds = int(os.environ.get("SAGEMAKER_TFS_WAIT_TIME_SECONDS", 60))
 
+        if SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL not in ["rest", "grpc"]:
+            raise ValueError("SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL must be 'rest' or 'grpc'")
+        self._grpc_default_handler_enabled = False
+        if self._default_handlers_enabled and SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL == "grpc":
+            if SAGEMAKER_MULTI_MODEL_ENABLED:
+                log.warning("gRPC default handler is single-model only; using REST")
+            elif not tfs_grpc_utils.grpc_available():
+                raise RuntimeError(
+                    "SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL is 'grpc' but the TFS gRPC "
+                    "messages cannot be imported"
+                )
+            else:
+                self._handlers = functools.partial(
+                    grpc_default_handler, default_model_name=self._tfs_default_model_name
+                )
+                self._grpc_default_handler_enabled = True
+
+        if SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+            # Warm TFS processes start empty and are only ever given models by
+            # a gRPC config reload.
+            if not tfs_grpc_utils.grpc_available():
+                raise RuntimeError(
+                    "SAGEMAKER_TFS_MME_WARM_POOL_SIZE is set but TFS config reloads "
+                    "cannot be sent: the TFS gRPC messages cannot be imported"
+                )
+            # Runs once, in the gunicorn master: the pool is ready before the
+            # first load. Loads refill it afterwards.
+            with lock():
+                self._sync_local_mme_instance_status()
+                self._update_ports_available()
+                self._fill_warm_pool()
+
     def on_post(self, req, res, model_name=None):
         if model_name or "invocations" in req.uri:
-            self._handle_invocation_post(req, res, model_name)
+            start = time.monotonic()
+            status = None
+            try:
+                self._handle_invocation_post(req, res, model_name)
+                status = res.status
+            except falcon.HTTPError as e:
+                status = e.status
+                raise
+            finally:
+                self._record_invocation(req, model_name, status, time.monotonic() - start)
         else:
             data = json.loads(req.stream.read().decode("utf-8"))
-            self._handle_load_model_post(res, data)
+            if isinstance(data, dict) and "models" in data:
+                self._handle_bulk_load_model_post(res, data["models"])
+            else:
+                self._handle_load_model_post(res, data)
 
     def _parse_concat_ports(self, concat_ports):
         return concat_ports.split(",")
 
     def _pick_port(self, ports):
-        return random.choice(ports)
+        return self._balancer.pick(ports)
+
+    def _record_invocation(self, req, model_name, status, seconds):
+        if not tfs_metrics.ENABLED:
+            return
+        model = model_name or self._tfs_default_model_name
+        code = str(status or falcon.HTTP_500).split(" ", 1)[0]
+        tfs_metrics.inc("sagemaker_tfs_requests_total", model=model, code=code)
+        tfs_metrics.observe("sagemaker_tfs_request_duration_seconds", seconds, model=model)
+        # nginx stamps the time it forwarded the request ("t=<epoch seconds>")
+        request_start = req.get_header("X-Request-Start") or ""
+        if request_start.startswith("t="):
+            try:
+                queued = time.time() - seconds - float(request_start[2:])
+            except ValueError:
+                return
+            tfs_metrics.observe("sagemaker_tfs_request_queue_seconds", max(0.0, queued))
 
     def _parse_sagemaker_port_range_mme(self, port_range):
         lower, upper = port_range.split("-")
@@ -147,24 +352,36 @@ class PythonServiceResource:
         return tfs_ports
 
     def _ports_available(self):
+        if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+            # models share the serve.py-managed TFS ports
+            return True
         rest_ports = self._tfs_available_ports["rest_port"]
         grpc_ports = self._tfs_available_ports["grpc_port"]
         return len(rest_ports) > 0 and len(grpc_ports) > 0
 
     def _update_ports_available(self):
         self._tfs_available_ports = copy.deepcopy(self._tfs_ports)
-        for _, tf_status_list in self._mme_tfs_instances_status.items():
+        in_use = list(self._mme_tfs_instances_status.values())
+        if SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+            in_use.append(self._mme_registry.warm_instances())
+        for tf_status_list in in_use:
             for tf_status in tf_status_list:
                 if tf_status.rest_port in self._tfs_available_ports["rest_port"]:
                     self._tfs_available_ports["rest_port"].remove(tf_status.rest_port)
                 if tf_status.grpc_port in self._tfs_available_ports["grpc_port"]:
                     self._tfs_available_ports["grpc_port"].remove(tf_status.grpc_port)
+        for port_type in ("rest_port", "grpc_port"):
+            self._tfs_available_ports[port_type] = [
+                port
+                for port in self._tfs_available_ports[port_type]
+                if port not in self._mme_reserved_ports
+            ]
         log.info(f"available ports : {self._tfs_available_ports}")
 
-    def _load_model(self, model_name, base_path, rest_port, grpc_port, model_index):
+    def _load_model(self, model_name, base_path, rest_port, grpc_port, model_index, warm_pid=None):
+        """Serve model_name from a new TFS on the given ports, or from warm TFS warm_pid."""
         if self.validate_model_dir(base_path):
             try:
-                self._import_custom_modules(model_name)
                 tfs_config = tfs_utils.create_tfs_config_individual_model(model_name, base_path)
                 tfs_config_file = "/sagemaker/tfs-config/{}/{}/model-config.cfg".format(
                     model_name, model_index
@@ -183,30 +400,14 @@ class PythonServiceResource:
                     os.makedirs(os.path.dirname(batching_config_file), exist_ok=True)
                     tfs_utils.create_batching_config(batching_config_file)
 
-                cmd = tfs_utils.tfs_command(
-                    grpc_port,
-                    rest_port,
-                    tfs_config_file,
-                    self._tfs_enable_batching,
-                    batching_config_file,
-                    tfs_intra_op_parallelism=self._tfs_intra_op_parallelism,
-                    tfs_inter_op_parallelism=self._tfs_inter_op_parallelism,
-                )
-                log.info("MME starts tensorflow serving with command: {}".format(cmd))
-                p = subprocess.Popen(cmd.split())
-                try:
-                    tfs_utils.wait_for_model(
-                        rest_port, model_name, self._tfs_wait_time_seconds, p.pid
+                if warm_pid is not None:
+                    pid = self._load_into_warm_tfs(
+                        model_name, tfs_config, rest_port, grpc_port, warm_pid
+                    )
+                else:
+                    pid = self._start_model_tfs(
+                        model_name, tfs_config_file, batching_config_file, rest_port, grpc_port
                     )
-                except BaseException:
-                    p.kill()
-                    try:
-                        p.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        log.error("tfs pid %s did not exit after SIGKILL", p.pid)
-                    raise
-
-                log.info("started tensorflow serving (pid: %d)", p.pid)
 
                 return {
                     "status": falcon.HTTP_200,
@@ -217,7 +418,7 @@ class PythonServiceResource:
                             "and grpc port {}.".format(model_name, rest_port, grpc_port)
                         },
                     ),
-                    "pid": p.pid,
+                    "pid": pid,
                 }
             except MultiModelException as multi_model_exception:
                 if multi_model_exception.code == 409:
@@ -277,6 +478,230 @@ class PythonServiceResource:
                 ),
             }
 
+    def _start_model_tfs(
+        self, model_name, tfs_config_file, batching_config_file, rest_port, grpc_port
+    ):
+        cmd = tfs_utils.tfs_command(
+            grpc_port,
+            rest_port,
+            tfs_config_file,
+            self._tfs_enable_batching,
+            batching_config_file,
+            tfs_intra_op_parallelism=self._tfs_intra_op_parallelism,
+            tfs_inter_op_parallelism=self._tfs_inter_op_parallelism,
+        )
+        log.info("MME starts tensorflow serving with command: {}".format(cmd))
+        p = subprocess.Popen(cmd.split())
+        try:
+            tfs_utils.wait_for_model(rest_port, model_name, self._tfs_wait_time_seconds, p.pid)
+        except BaseException:
+            p.kill()
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                log.error("tfs pid %s did not exit after SIGKILL", p.pid)
+            raise
+
+        log.info("started tensorflow serving (pid: %d)", p.pid)
+        return p.pid
+
+    def _load_into_warm_tfs(self, model_name, tfs_config, rest_port, grpc_port, pid):
+        log.info("MME loads model %s into warm tensorflow serving (pid: %d)", model_name, pid)
+        try:
+            # usually up long ago; a pool refilled moments before may still be starting
+            tfs_utils.wait_for_tfs_server(rest_port, self._tfs_wait_time_seconds, pid)
+            self._setup_channel(grpc_port)
+            tfs_grpc_utils.reload_config(
+                self._channels[grpc_port], tfs_config, self._tfs_wait_time_seconds
+            )
+            tfs_utils.wait_for_model(rest_port, model_name, self._tfs_wait_time_seconds, pid)
+        except BaseException:
+            # not our child (the pool may have been filled by the gunicorn
+            # master), so it cannot be waited for here
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            raise
+        return pid
+
+    def _load_model_instances(self, model_name, base_path, instance_ports):
+        """Load one TFS per (rest_port, grpc_port, warm_pid) concurrently; return the first failure.
+
+        warm_pid is a claimed warm TFS to reload, or None to start a new one.
+        Every started pid is recorded in _mme_tfs_instances_status so the caller's
+        all-or-nothing cleanup covers it. On the first failure the remaining
+        loads are killed; _load_model kills their TFS process on the way out.
+        """
+        greenlets = {
+            gevent.spawn(
+                self._load_model, model_name, base_path, rest_port, grpc_port, i, warm_pid
+            ): (rest_port, grpc_port)
+            for i, (rest_port, grpc_port, warm_pid) in enumerate(instance_ports)
+        }
+        failure = success = None
+        for greenlet in gevent.iwait(list(greenlets)):
+            rest_port, grpc_port = greenlets[greenlet]
+            if isinstance(greenlet.value, gevent.GreenletExit):
+                continue  # killed after another instance failed
+            if greenlet.successful():
+                response = greenlet.value
+            else:
+                log.error("loading model %s raised: %s", model_name, greenlet.exception)
+                response = {
+                    "status": falcon.HTTP_500,
+                    "body": json.dumps({"error": str(greenlet.exception)}),
+                }
+            if "pid" in response:
+                self._mme_tfs_instances_status.setdefault(model_name, []).append(
+                    TfsInstanceStatus(rest_port, grpc_port, response["pid"])
+                )
+            if response["status"] != falcon.HTTP_200 and failure is None:
+                log.info(f"Failed to load model : {model_name}")
+                failure = response
+                gevent.killall([g for g in greenlets if not g.ready()], block=False)
+            elif failure is None:
+                success = response
+        return failure or success
+
+    def _load_model_shared(self, model_name, base_path):
+        """Add model_name to the least busy shared TFS instances via config reload."""
+        if not self.validate_model_dir(base_path):
+            return {
+                "status": falcon.HTTP_404,
+                "body": json.dumps(
+                    {
+                        "error": "Could not find valid base path {} for servable {}".format(
+                            base_path, model_name
+                        )
+                    }
+                ),
+            }
+        return self._load_models_shared({model_name: base_path})[model_name]
+
+    def _load_models_shared(self, base_paths):
+        """Add {model_name: base_path} to the least busy shared TFS instances.
+
+        Each instance gets one config reload however many models it receives.
+        Returns {model_name: response}.
+        """
+        hosted = collections.Counter(
+            status.grpc_port
+            for statuses in self._mme_tfs_instances_status.values()
+            for status in statuses
+        )
+        adds = collections.defaultdict(dict)
+        # SAGEMAKER_TFS_INSTANCE_COUNT replicas, at most the whole pool
+        replicas = min(self._tfs_instance_count, len(self._tfs_shared_grpc_ports))
+        for model_name, base_path in base_paths.items():
+            instance_ids = sorted(
+                range(len(self._tfs_shared_grpc_ports)),
+                key=lambda i: (hosted[self._tfs_shared_grpc_ports[i]], i),
+            )[:replicas]
+            for i in instance_ids:
+                hosted[self._tfs_shared_grpc_ports[i]] += 1
+                adds[i][model_name] = base_path
+                # Recorded before the reload so a failed load is cleaned up by _delete_model.
+                # The registry needs a pid; 0 stands for one serve.py has not written yet.
+                self._mme_tfs_instances_status.setdefault(model_name, []).append(
+                    TfsInstanceStatus(
+                        self._tfs_shared_rest_ports[i],
+                        self._tfs_shared_grpc_ports[i],
+                        tfs_utils.read_shared_tfs_pid(i) or 0,
+                    )
+                )
+
+        responses = {}
+        for i, models in adds.items():
+            try:
+                self._reload_shared_tfs(i, add=models)
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("failed to load models %s on shared TFS %s: %s", sorted(models), i, e)
+                # TFS i never got these models: drop their entries for it, so
+                # only instances that did load them are unloaded on cleanup.
+                grpc_port = self._tfs_shared_grpc_ports[i]
+                for model_name in models:
+                    statuses = [
+                        status
+                        for status in self._mme_tfs_instances_status[model_name]
+                        if status.grpc_port != grpc_port
+                    ]
+                    if statuses:
+                        self._mme_tfs_instances_status[model_name] = statuses
+                    else:
+                        del self._mme_tfs_instances_status[model_name]
+                    responses.setdefault(
+                        model_name,
+                        {"status": falcon.HTTP_500, "body": json.dumps({"error": str(e)})},
+                    )
+
+        def wait(model_name, i):
+            try:
+                tfs_utils.wait_for_model(
+                    self._tfs_shared_rest_ports[i],
+                    model_name,
+                    self._tfs_wait_time_seconds,
+                    tfs_utils.read_shared_tfs_pid(i),
+                )
+            except MultiModelException as multi_model_exception:
+                responses.setdefault(
+                    model_name, {"status": falcon.HTTP_408, "body": multi_model_exception.msg}
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("failed to load model %s on shared TFS %s: %s", model_name, i, e)
+                responses.setdefault(
+                    model_name, {"status": falcon.HTTP_500, "body": json.dumps({"error": str(e)})}
+                )
+
+        pool = gevent.pool.Pool(SAGEMAKER_TFS_MME_BULK_LOAD_CONCURRENCY)
+        for i, models in adds.items():
+            for model_name in models:
+                if model_name not in responses:
+                    pool.spawn(wait, model_name, i)
+        pool.join()
+
+        for model_name in base_paths:
+            if model_name in responses:
+                continue
+            responses[model_name] = {
+                "status": falcon.HTTP_200,
+                "body": json.dumps(
+                    {
+                        "success": "Successfully loaded model {} on shared TFS grpc ports {}.".format(
+                            model_name,
+                            [
+                                status.grpc_port
+                                for status in self._mme_tfs_instances_status[model_name]
+                            ],
+                        )
+                    }
+                ),
+            }
+        return responses
+
+    def _reload_shared_tfs(self, instance_id, add=None, remove=()):
+        """Rewrite shared TFS instance_id's model list and tell it to reload.
+
+        add maps model names to base paths; remove lists model names.
+        """
+        previous = tfs_utils.read_shared_tfs_models(instance_id)
+        base_paths = dict(previous)
+        base_paths.update(add or {})
+        for model_name in remove:
+            base_paths.pop(model_name, None)
+        config = tfs_utils.write_shared_tfs_config(instance_id, base_paths)
+        grpc_port = self._tfs_shared_grpc_ports[instance_id]
+        log.info("reloading shared TFS %s with models %s", instance_id, sorted(base_paths))
+        try:
+            self._setup_channel(grpc_port)
+            tfs_grpc_utils.reload_config(
+                self._channels[grpc_port], config, self._tfs_wait_time_seconds
+            )
+        except Exception:
+            # keep the files (which serve.py restarts TFS from) matching what it serves
+            tfs_utils.write_shared_tfs_config(instance_id, previous)
+            raise
+
     _MODEL_NAME_RE = re.compile(r"\A[A-Za-z0-9][A-Za-z0-9._-]{0,254}\Z")
 
     @staticmethod
@@ -293,7 +718,7 @@ class PythonServiceResource:
             return True
         return False
 
-    def _handle_load_model_post(self, res, data):  # noqa: C901
+    def _handle_load_model_post(self, res, data):
         with lock():
             model_name = data["model_name"]
             base_path = data["url"]
@@ -307,7 +732,6 @@ class PythonServiceResource:
             # sync sync_local_mme_instance_status & update available ports
             self._sync_local_mme_instance_status()
             self._update_ports_available()
-            self._sync_model_handlers()
 
             # model is already loaded
             if model_name in self._mme_tfs_instances_status:
@@ -315,101 +739,329 @@ class PythonServiceResource:
                 res.body = json.dumps({"error": "Model {} is already loaded.".format(model_name)})
                 return
 
-            is_load_successful = True
-            response = {}
-            for i in range(self._tfs_instance_count):
-                # check if there are available ports
-                if not self._ports_available():
-                    is_load_successful = False
-                    response["status"] = falcon.HTTP_507
-                    response["body"] = json.dumps(
-                        {"error": "Memory exhausted: no available ports to load the model."}
-                    )
-                    break
-                tfs_rest_port = self._tfs_available_ports["rest_port"].pop()
-                tfs_grpc_port = self._tfs_available_ports["grpc_port"].pop()
+            load_start = time.time()
+            model_bytes = (
+                tfs_utils.get_dir_size_bytes(base_path) if SAGEMAKER_TFS_MME_LRU_EVICTION else 0
+            )
+            try:
+                instance_ports, admission_error = self._reserve_mme_instances(
+                    model_name, model_bytes
+                )
+                if admission_error:
+                    response = self._admission_error_response(admission_error)
+                elif SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+                    response = self._load_model_shared(model_name, base_path)
+                else:
+                    response = self._load_model_instances(model_name, base_path, instance_ports)
+                results = {model_name: (response, time.time() - load_start)}
+                self._finish_mme_loads(results)
+                response = results[model_name][0]
+            finally:
+                self._mme_reserved_ports.clear()
+
+            res.status = response["status"]
+            res.body = response["body"]
+
+    def _handle_bulk_load_model_post(self, res, entries):  # noqa: C901
+        """Load a list of {model_name, url} under one lock() and one registry commit.
+
+        Malformed input fails the whole request with 400. Otherwise every model
+        gets its own status, as a single POST /models would return it; the
+        response is 200 if all of them loaded and 207 if not.
+        """
+        errors = self._bulk_request_errors(
+            entries,
+            lambda entry: (
+                isinstance(entry, dict)
+                and isinstance(entry.get("url"), str)
+                and isinstance(entry.get("model_name"), str)
+                and not self._is_bad_model_name(entry["model_name"])
+            ),
+            lambda entry: entry["model_name"],
+            "expected {model_name, url} with a valid model_name",
+        )
+        if errors:
+            res.status = falcon.HTTP_400
+            res.body = json.dumps({"error": "; ".join(errors)})
+            return
 
-                response = self._load_model(model_name, base_path, tfs_rest_port, tfs_grpc_port, i)
+        with lock():
+            self._sync_local_mme_instance_status()
+            self._update_ports_available()
+
+            responses = {}
+            base_paths = {}
+            for entry in entries:
+                model_name, base_path = entry["model_name"], entry["url"]
+                if model_name in self._mme_tfs_instances_status:
+                    responses[model_name] = {
+                        "status": falcon.HTTP_409,
+                        "body": json.dumps(
+                            {"error": "Model {} is already loaded.".format(model_name)}
+                        ),
+                    }
+                elif not self.validate_model_dir(base_path):
+                    responses[model_name] = {
+                        "status": falcon.HTTP_404,
+                        "body": json.dumps(
+                            {
+                                "error": "Could not find valid base path {} for servable {}".format(
+                                    base_path, model_name
+                                )
+                            }
+                        ),
+                    }
+                else:
+                    base_paths[model_name] = base_path
 
-                if "pid" in response:
-                    self._mme_tfs_instances_status.setdefault(model_name, []).append(
-                        TfsInstanceStatus(tfs_rest_port, tfs_grpc_port, response["pid"])
+            load_start = time.time()
+            results = {}
+            try:
+                # Admission (and eviction) stays serial; memory promised to the
+                # models admitted before counts against the next one.
+                reserved = {}
+                pending_bytes = 0
+                for model_name, base_path in base_paths.items():
+                    model_bytes = (
+                        tfs_utils.get_dir_size_bytes(base_path)
+                        if SAGEMAKER_TFS_MME_LRU_EVICTION
+                        else 0
+                    )
+                    instance_ports, admission_error = self._reserve_mme_instances(
+                        model_name, model_bytes, pending_bytes
                     )
+                    if admission_error:
+                        results[model_name] = (
+                            self._admission_error_response(admission_error),
+                            time.time() - load_start,
+                        )
+                        continue
+                    reserved[model_name] = instance_ports
+                    pending_bytes += model_bytes * max(1, len(instance_ports))
 
-                if response["status"] != falcon.HTTP_200:
-                    log.info(f"Failed to load model : {model_name}")
-                    is_load_successful = False
-                    break
+                if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+                    shared_responses = self._load_models_shared(
+                        {model_name: base_paths[model_name] for model_name in reserved}
+                    )
+                    seconds = time.time() - load_start
+                    for model_name, response in shared_responses.items():
+                        results[model_name] = (response, seconds)
+                else:
+                    results.update(self._load_models_instances(base_paths, reserved))
+                self._finish_mme_loads(results)
+            finally:
+                self._mme_reserved_ports.clear()
 
-            if not is_load_successful:
-                log.info(f"Failed to load model : {model_name}, Starting to cleanup...")
-                self._delete_model(model_name)
-                self._remove_model_config(model_name)
-                self._mme_tfs_instances_status.pop(model_name, None)
-                self._update_ports_available()
-                self._upload_mme_instance_status()
-            else:
-                self._upload_mme_instance_status()
+        for model_name, (response, _) in results.items():
+            responses[model_name] = response
+        self._bulk_response(res, [entry["model_name"] for entry in entries], responses)
 
-            res.status = response["status"]
-            res.body = response["body"]
+    def _load_models_instances(self, base_paths, reserved):
+        """Run _load_model_instances for every model in reserved, a bounded number at a time.
 
-    def _import_custom_modules(self, model_name):
-        inference_script_path = "/opt/ml/models/{}/model/code/inference.py".format(model_name)
-        python_lib_path = "/opt/ml/models/{}/model/code/lib".format(model_name)
-        if os.path.exists(python_lib_path):
-            log.info(
-                "Add Python code library for the model {} found at path {}.".format(
-                    model_name, python_lib_path
-                )
-            )
-            sys.path.append(python_lib_path)
-        else:
-            log.info(
-                "Python code library for the model {} not found at path {}.".format(
-                    model_name, python_lib_path
+        Returns {model_name: (response, seconds)}.
+        """
+
+        def load(model_name, instance_ports):
+            start = time.time()
+            try:
+                response = self._load_model_instances(
+                    model_name, base_paths[model_name], instance_ports
                 )
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("loading model %s failed", model_name)
+                response = {"status": falcon.HTTP_500, "body": json.dumps({"error": str(e)})}
+            return response, time.time() - start
+
+        pool = gevent.pool.Pool(SAGEMAKER_TFS_MME_BULK_LOAD_CONCURRENCY)
+        greenlets = {
+            model_name: pool.spawn(load, model_name, instance_ports)
+            for model_name, instance_ports in reserved.items()
+        }
+        pool.join()
+        return {model_name: greenlet.value for model_name, greenlet in greenlets.items()}
+
+    def _reserve_mme_instances(self, model_name, model_bytes, pending_bytes=0):
+        """Admit model_name and reserve a port pair (or a warm TFS) per instance.
+
+        Called under lock(). Returns (instance_ports, error): instance_ports
+        holds (rest_port, grpc_port, warm_pid) triples (none with shared TFS
+        instances); error is set, and nothing stays reserved, if the model was
+        not admitted. pending_bytes is memory promised to models admitted but
+        not loaded yet. Eviction happens here, serially; each further instance
+        needs room for one more copy.
+        """
+        instance_ports = []
+        for i in range(1 if SAGEMAKER_TFS_MME_SHARED_INSTANCES else self._tfs_instance_count):
+            warm = self._claim_warm_tfs() if SAGEMAKER_TFS_MME_WARM_POOL_SIZE else None
+            # check if there are available ports (and memory), evicting if enabled
+            admission_error = self._admit_mme_instance(
+                model_name, pending_bytes + model_bytes * (i + 1), need_ports=warm is None
             )
-        if os.path.exists(inference_script_path):
-            log.info(
-                "Importing handlers from model-specific inference script for the model {} found at path {}.".format(
-                    model_name, inference_script_path
+            if admission_error:
+                if warm is not None:
+                    self._mme_registry.add_warm(warm, time.time())
+                self._release_mme_instances(instance_ports)
+                return [], admission_error
+            if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+                break
+            if warm is not None:
+                ports = (warm.rest_port, warm.grpc_port, warm.pid)
+            else:
+                ports = (
+                    self._tfs_available_ports["rest_port"].pop(),
+                    self._tfs_available_ports["grpc_port"].pop(),
+                    None,
                 )
-            )
-            handler, input_handler, output_handler = self._import_handlers(inference_script_path)
-            model_handlers = self._make_handler(handler, input_handler, output_handler)
-            self.model_handlers[model_name] = model_handlers
-        else:
-            log.info(
-                "Model-specific inference script for the model {} not found at path {}.".format(
-                    model_name, inference_script_path
+            self._mme_reserved_ports.update(ports[:2])
+            instance_ports.append(ports)
+        return instance_ports, None
+
+    def _release_mme_instances(self, instance_ports):
+        """Undo reservations that will not be loaded; warm TFS go back to the pool."""
+        for rest_port, grpc_port, warm_pid in instance_ports:
+            self._mme_reserved_ports.difference_update((rest_port, grpc_port))
+            if warm_pid is not None:
+                self._mme_registry.add_warm(
+                    TfsInstanceStatus(rest_port, grpc_port, warm_pid), time.time()
                 )
+        self._update_ports_available()
+
+    @staticmethod
+    def _admission_error_response(admission_error):
+        return {
+            "status": falcon.HTTP_507,
+            "body": json.dumps({"error": "Memory exhausted: {}".format(admission_error)}),
+        }
+
+    def _finish_mme_loads(self, results):
+        """Clean up failed loads and register the others in one registry commit.
+
+        results maps model names to (response, seconds); called under lock(). A
+        model whose inference.py fails to import has its response replaced by
+        that error and is cleaned up like any other failed load.
+        """
+        loaded = [
+            model_name
+            for model_name, (response, _) in results.items()
+            if response["status"] == falcon.HTTP_200
+        ]
+        if loaded:
+            generation = self._register_mme_models(loaded)
+            broken = {}
+            for model_name in loaded:
+                import_error = self._import_mme_model_handlers(model_name, generation)
+                if import_error:
+                    broken[model_name] = import_error
+            if broken:
+                self._unregister_mme_models(list(broken))
+                for model_name, import_error in broken.items():
+                    results[model_name] = (import_error, results[model_name][1])
+                loaded = [model_name for model_name in loaded if model_name not in broken]
+        failed = [model_name for model_name in results if model_name not in loaded]
+        for model_name in failed:
+            log.info(f"Failed to load model : {model_name}, Starting to cleanup...")
+        self._delete_models(failed)
+        for model_name in failed:
+            self._remove_model_config(model_name)
+            self._mme_tfs_instances_status.pop(model_name, None)
+        now = time.time()
+        for model_name, (response, seconds) in results.items():
+            if model_name in loaded:
+                self._mme_registry.record_load(model_name, seconds, now)
+            tfs_metrics.observe(
+                "sagemaker_tfs_mme_load_duration_seconds",
+                seconds,
+                result="success" if model_name in loaded else "failure",
             )
 
+        if len(loaded) < len(results) or SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+            self._update_ports_available()
+        if SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+            self._fill_warm_pool()
+
+    def _import_mme_model_handlers(self, model_name, generation):
+        """Import model_name's inference.py in this worker; return an error response if it fails.
+
+        Other workers import it on its first invocation there. Importing once
+        here makes a broken script fail the load instead of every invocation.
+        """
+        try:
+            self.model_handlers.get(model_name, generation)
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception("failed to import handlers of model %s", model_name)
+            return {
+                "status": falcon.HTTP_500,
+                "body": json.dumps(
+                    {"error": "Failed to import inference.py of model {}: {}".format(model_name, e)}
+                ),
+            }
+        return None
+
+    @staticmethod
+    def _bulk_request_errors(entries, valid, name_of, expected):
+        """Return the problems with a bulk request's list of entries (empty if none)."""
+        if not isinstance(entries, list) or not entries:
+            return ["models must be a non-empty list"]
+        errors, seen = [], set()
+        for i, entry in enumerate(entries):
+            if not valid(entry):
+                errors.append("entry {}: {}".format(i, expected))
+            elif name_of(entry) in seen:
+                errors.append("entry {}: duplicate model_name {!r}".format(i, name_of(entry)))
+            else:
+                seen.add(name_of(entry))
+        return errors
+
+    @staticmethod
+    def _bulk_response(res, model_names, responses):
+        """Write {"models": {model_name: {"status": code, ...body}}}: 200 if all succeeded, else 207."""
+        models = {}
+        for model_name in model_names:
+            response = responses[model_name]
+            code = int(str(response["status"]).split(" ", 1)[0])
+            try:
+                body = json.loads(response["body"])
+            except (TypeError, ValueError):
+                body = None
+            if not isinstance(body, dict):
+                body = {"error" if code >= 400 else "success": response["body"]}
+            models[model_name] = dict(body, status=code)
+        all_ok = all(model["status"] == 200 for model in models.values())
+        res.status = falcon.HTTP_200 if all_ok else falcon.HTTP_207
+        res.body = json.dumps({"models": models})
+
     def _handle_invocation_post(self, req, res, model_name=None):
         if SAGEMAKER_MULTI_MODEL_ENABLED:
             if model_name:
-                if model_name not in self._mme_tfs_instances_status or not self._check_pid(
-                    self._mme_tfs_instances_status[model_name][0].pid
+                # Lock-free: re-reads the registry only if another worker changed it.
+                self._sync_local_mme_instance_status()
+                if model_name not in self._mme_tfs_instances_status or not self._mme_instance_alive(
+                    self._mme_tfs_instances_status[model_name][0]
                 ):
                     with lock():
                         self._sync_local_mme_instance_status()
                         # If the model is still present but its TFS child is dead, evict it
                         # so the MME frontend can re-issue a LoadModel.
-                        if model_name in self._mme_tfs_instances_status and not self._check_pid(
-                            self._mme_tfs_instances_status[model_name][0].pid
+                        if model_name in self._mme_tfs_instances_status and not (
+                            self._mme_instance_alive(self._mme_tfs_instances_status[model_name][0])
                         ):
                             log.error(
                                 "TFS for model %s is dead (pid %s); evicting",
                                 model_name,
                                 self._mme_tfs_instances_status[model_name][0].pid,
                             )
+                            unload_start = time.monotonic()
                             self._delete_model(model_name)
                             self._remove_model_config(model_name)
                             self._mme_tfs_instances_status.pop(model_name, None)
                             self._update_ports_available()
-                            self._upload_mme_instance_status()
-                    self._sync_model_handlers()
+                            self._unregister_mme_model(model_name)
+                            tfs_metrics.observe(
+                                "sagemaker_tfs_mme_unload_duration_seconds",
+                                time.monotonic() - unload_start,
+                                reason="dead",
+                            )
 
                 if model_name not in self._mme_tfs_instances_status:
                     res.status = falcon.HTTP_404
@@ -419,16 +1071,16 @@ class PythonServiceResource:
                     return
                 else:
                     log.info("model name: {}".format(model_name))
-                    rest_ports = [
-                        status.rest_port for status in self._mme_tfs_instances_status[model_name]
-                    ]
+                    self._touch_mme_model(model_name)
+                    statuses = self._mme_tfs_instances_status[model_name]
+                    generation = statuses[0].generation
+                    rest_ports = [status.rest_port for status in statuses]
                     rest_port = self._pick_port(rest_ports)
                     log.info("rest port: {}".format(str(rest_port)))
-                    grpc_ports = [
-                        status.grpc_port for status in self._mme_tfs_instances_status[model_name]
-                    ]
+                    grpc_ports = [status.grpc_port for status in statuses]
                     grpc_port = grpc_ports[rest_ports.index(rest_port)]
                     log.info("grpc port: {}".format(str(grpc_port)))
+                    self._setup_channel(grpc_port)
                     try:
                         data, context = tfs_utils.parse_request(
                             req,
@@ -436,6 +1088,7 @@ class PythonServiceResource:
                             grpc_port,
                             self._tfs_default_model_name,
                             model_name=model_name,
+                            channel=self._channels[grpc_port],
                             timeout=self._tfs_wait_time_seconds,
                         )
                     except ValueError as ve:
@@ -449,9 +1102,9 @@ class PythonServiceResource:
                 res.body = json.dumps({"error": "Invocation request does not contain model name."})
                 return
         else:
-            # Randomly pick port used for routing incoming request.
-            grpc_port = self._pick_port(self._tfs_grpc_ports)
+            # Pick the least loaded TFS instance; its REST and gRPC ports go together.
             rest_port = self._pick_port(self._tfs_rest_ports)
+            grpc_port = self._tfs_grpc_ports[self._tfs_rest_ports.index(rest_port)]
             try:
                 data, context = tfs_utils.parse_request(
                     req,
@@ -471,13 +1124,18 @@ class PythonServiceResource:
         try:
             res.status = falcon.HTTP_200
             handlers = self._handlers
-            if SAGEMAKER_MULTI_MODEL_ENABLED and model_name in self.model_handlers:
+            model_handlers = (
+                self.model_handlers.get(model_name, generation)
+                if SAGEMAKER_MULTI_MODEL_ENABLED
+                else None
+            )
+            if model_handlers is not None:
                 log.info(
-                    "Model-specific inference script for the model {} exists, importing handlers.".format(
+                    "Model-specific inference script for the model {} exists, using its handlers.".format(
                         model_name
                     )
                 )
-                handlers = self.model_handlers[model_name]
+                handlers = model_handlers
             elif not self._default_handlers_enabled:
                 log.info(
                     "Universal inference script exists at path {}, importing handlers.".format(
@@ -494,6 +1152,7 @@ class PythonServiceResource:
                     "application/jsonlines",
                     "application/jsons",
                     "text/csv",
+                    *tfs_grpc_utils.BINARY_CONTENT_TYPES,
                 }
                 if content_type and content_type not in _SUPPORTED_CONTENT_TYPES:
                     res.status = falcon.HTTP_415
@@ -501,9 +1160,24 @@ class PythonServiceResource:
                         {"error": "Unsupported Media Type: {}".format(content_type)}
                     ).encode("utf-8")
                     return
-            res.body, res.content_type = handlers(data, context)
+            self._balancer.start(rest_port)
+            start = time.monotonic()
+            try:
+                res.body, res.content_type = handlers(data, context)
+            finally:
+                seconds = time.monotonic() - start
+                self._balancer.finish(rest_port, seconds)
+                tfs_metrics.observe(
+                    "sagemaker_tfs_instance_request_duration_seconds", seconds, instance=rest_port
+                )
         except falcon.HTTPError:
             raise
+        except tfs_convert.InvalidBodyError as e:
+            res.status = falcon.HTTP_400
+            res.body = json.dumps({"error": str(e)}).encode("utf-8")
+        except tfs_convert.UnsupportedContentTypeError as e:
+            res.status = falcon.HTTP_415
+            res.body = json.dumps({"error": str(e)}).encode("utf-8")
         except Exception as e:  # pylint: disable=broad-except
             log.exception("exception handling request: {}".format(e))
             res.status = falcon.HTTP_500
@@ -518,17 +1192,7 @@ class PythonServiceResource:
         spec = importlib.util.spec_from_file_location("inference", inference_script)
         inference = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(inference)
-
-        _custom_handler, _custom_input_handler, _custom_output_handler = None, None, None
-        if hasattr(inference, "handler"):
-            _custom_handler = inference.handler
-        elif hasattr(inference, "input_handler") and hasattr(inference, "output_handler"):
-            _custom_input_handler = inference.input_handler
-            _custom_output_handler = inference.output_handler
-        else:
-            raise NotImplementedError("Handlers are not implemented correctly in user script.")
-
-        return _custom_handler, _custom_input_handler, _custom_output_handler
+        return tfs_handlers.handler_functions(inference)
 
     def _make_handler(self, custom_handler, custom_input_handler, custom_output_handler):
         if custom_handler:
@@ -536,9 +1200,14 @@ class PythonServiceResource:
 
         def handler(data, context):
             processed_input = custom_input_handler(data, context)
-            response = requests.post(
-                context.rest_uri, data=processed_input, timeout=context.timeout
-            )
+            if self._micro_batcher is not None:
+                response = self._micro_batcher.post(
+                    context.rest_uri, processed_input, context.timeout
+                )
+            else:
+                response = tfs_utils.get_tfs_session().post(
+                    context.rest_uri, data=processed_input, timeout=context.timeout
+                )
             if response.status_code != 200:
                 raise falcon.HTTPError(
                     falcon.code_to_http_status(response.status_code),
@@ -555,6 +1224,12 @@ class PythonServiceResource:
         # gunicorn workers; holding it across N x 5s of requests.get() would
         # stall POST/DELETE /models behind a routine listing (and lock() itself
         # raises TimeoutError after 60s).
+        if model_name is None and req.get_param_as_bool("stats"):
+            self._sync_local_mme_instance_status()
+            res.status = falcon.HTTP_200
+            res.body = json.dumps(self._mme_stats())
+            return
+
         with lock():
             self._sync_local_mme_instance_status()
             if model_name is None:
@@ -572,10 +1247,11 @@ class PythonServiceResource:
         if model_name is None:
             models_info = {}
             uri = "http://localhost:{}/v1/models/{}"
+            session = tfs_utils.get_tfs_session()
             for model, port in port_by_model.items():
                 try:
                     info = json.loads(
-                        requests.get(
+                        session.get(
                             uri.format(port, model),
                             timeout=5,
                         ).content
@@ -600,7 +1276,7 @@ class PythonServiceResource:
                 port = port_by_model[model_name]
                 uri = "http://localhost:{}/v1/models/{}".format(port, model_name)
                 try:
-                    r = requests.get(uri, timeout=5)
+                    r = tfs_utils.get_tfs_session().get(uri, timeout=5)
                     if r.status_code != 200:
                         res.status = falcon.code_to_http_status(r.status_code)
                         res.body = r.content
@@ -616,7 +1292,11 @@ class PythonServiceResource:
                     )
                     res.body = json.dumps({"error": str(e)}).encode("utf-8")
 
-    def on_delete(self, req, res, model_name):  # pylint: disable=W0613
+    def on_delete(self, req, res, model_name=None):  # pylint: disable=W0613
+        if model_name is None:
+            data = json.loads(req.stream.read().decode("utf-8") or "{}")
+            self._handle_bulk_delete(res, data.get("models") if isinstance(data, dict) else None)
+            return
         if self._reject_bad_model_name(res, model_name):
             return
         with lock():
@@ -626,10 +1306,20 @@ class PythonServiceResource:
                 res.body = json.dumps({"error": "Model {} is not loaded yet".format(model_name)})
             else:
                 try:
+                    unload_start = time.monotonic()
                     self._delete_model(model_name)
                     self._remove_model_config(model_name)
                     del self._mme_tfs_instances_status[model_name]
-                    self._upload_mme_instance_status()
+                    self._unregister_mme_model(model_name)
+                    tfs_metrics.observe(
+                        "sagemaker_tfs_mme_unload_duration_seconds",
+                        time.monotonic() - unload_start,
+                        reason="request",
+                    )
+                    if SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+                        # a pool cut short by port or memory pressure can grow again
+                        self._update_ports_available()
+                        self._fill_warm_pool()
                     res.status = falcon.HTTP_200
                     res.body = json.dumps(
                         {"success": "Successfully unloaded model {}.".format(model_name)}
@@ -638,18 +1328,97 @@ class PythonServiceResource:
                     res.status = falcon.HTTP_500
                     res.body = json.dumps({"error": str(error)}).encode("utf-8")
 
-    def _delete_model(self, model_name):
-        if model_name not in self._mme_tfs_instances_status:
+    def _handle_bulk_delete(self, res, model_names):
+        """Unload a list of models under one lock() and one registry commit."""
+        errors = self._bulk_request_errors(
+            model_names,
+            lambda model_name: (
+                isinstance(model_name, str) and not self._is_bad_model_name(model_name)
+            ),
+            lambda model_name: model_name,
+            "expected a valid model_name",
+        )
+        if errors:
+            res.status = falcon.HTTP_400
+            res.body = json.dumps({"error": "; ".join(errors)})
             return
-        for tfs_status in self._mme_tfs_instances_status[model_name]:
+
+        with lock():
+            self._sync_local_mme_instance_status()
+            loaded = [m for m in model_names if m in self._mme_tfs_instances_status]
+            responses = {
+                model_name: {
+                    "status": falcon.HTTP_404,
+                    "body": json.dumps({"error": "Model {} is not loaded yet".format(model_name)}),
+                }
+                for model_name in model_names
+                if model_name not in self._mme_tfs_instances_status
+            }
+            unload_start = time.monotonic()
             try:
-                os.kill(tfs_status.pid, signal.SIGKILL)
-            except ProcessLookupError:
-                log.warning(
-                    "tfs pid %s already gone for model %s",
-                    tfs_status.pid,
-                    model_name,
-                )
+                self._delete_models(loaded)
+            except OSError as error:
+                for model_name in loaded:
+                    responses[model_name] = {
+                        "status": falcon.HTTP_500,
+                        "body": json.dumps({"error": str(error)}),
+                    }
+                loaded = []
+            for model_name in loaded:
+                self._remove_model_config(model_name)
+                del self._mme_tfs_instances_status[model_name]
+                responses[model_name] = {
+                    "status": falcon.HTTP_200,
+                    "body": json.dumps(
+                        {"success": "Successfully unloaded model {}.".format(model_name)}
+                    ),
+                }
+            if loaded:
+                self._unregister_mme_models(loaded)
+                # one shared teardown; each model is charged an equal part of it
+                seconds = (time.monotonic() - unload_start) / len(loaded)
+                for model_name in loaded:
+                    tfs_metrics.observe(
+                        "sagemaker_tfs_mme_unload_duration_seconds", seconds, reason="request"
+                    )
+            if loaded and SAGEMAKER_TFS_MME_WARM_POOL_SIZE:
+                self._update_ports_available()
+                self._fill_warm_pool()
+
+        self._bulk_response(res, model_names, responses)
+
+    def _delete_model(self, model_name):
+        self._delete_models([model_name])
+
+    def _delete_models(self, model_names):
+        """Stop serving model_names: kill their TFS, or remove them from the shared TFS.
+
+        Each shared TFS instance is reloaded once, whatever the number of models.
+        """
+        model_names = [m for m in model_names if m in self._mme_tfs_instances_status]
+        if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+            removes = collections.defaultdict(list)
+            for model_name in model_names:
+                for tfs_status in self._mme_tfs_instances_status[model_name]:
+                    removes[self._tfs_shared_grpc_ports.index(tfs_status.grpc_port)].append(
+                        model_name
+                    )
+            for instance_id, models in removes.items():
+                try:
+                    self._reload_shared_tfs(instance_id, remove=models)
+                except Exception as e:  # pylint: disable=broad-except
+                    log.error("failed to unload models %s from shared TFS: %s", models, e)
+            return
+        for model_name in model_names:
+            for tfs_status in self._mme_tfs_instances_status[model_name]:
+                try:
+                    os.kill(tfs_status.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    log.warning(
+                        "tfs pid %s already gone for model %s",
+                        tfs_status.pid,
+                        model_name,
+                    )
 
     def _remove_model_config(self, model_name):
         shutil.rmtree("/sagemaker/tfs-config/{}".format(model_name), ignore_errors=True)
@@ -677,44 +1446,331 @@ class PythonServiceResource:
                 return True
         return False
 
-    def _upload_mme_instance_status(self):
-        log.info("uploading mme instance status: {}".format(self._mme_tfs_instances_status))
-        # Atomic write: tmp file + fsync + rename. Without this, a SIGKILL
-        # during pickle.dump (OOM / scale-in) leaves a truncated pickle on
-        # disk that bricks every subsequent /models call with a 500 while
-        # /ping stays 200.
-        tmp_path = MME_TFS_INSTANCE_STATUS_FILE + ".tmp"
-        with open(tmp_path, "wb") as handle:
-            pickle.dump(self._mme_tfs_instances_status, handle, protocol=pickle.HIGHEST_PROTOCOL)
-            handle.flush()
-            os.fsync(handle.fileno())
-        os.replace(tmp_path, MME_TFS_INSTANCE_STATUS_FILE)
+    def _admit_mme_instance(self, model_name, model_bytes, need_ports=True):
+        """Make room for one more TFS instance of model_name; return an error or None.
+
+        Called under lock(). With SAGEMAKER_TFS_MME_LRU_EVICTION, least recently
+        invoked models are unloaded until a port pair is free (unless need_ports
+        is False: the instance is a warm TFS that holds its own) and memory in
+        use plus model_bytes (the model's on-disk size, a lower bound on what
+        TFS will map) stays under SAGEMAKER_TFS_MME_MEMORY_THRESHOLD percent.
+        """
+        while True:
+            error = self._mme_admission_error(model_bytes, need_ports)
+            if error is None or not SAGEMAKER_TFS_MME_LRU_EVICTION:
+                return error
+            # other workers' invocations reach the registry within MME_TOUCH_INTERVAL_SECONDS
+            self._flush_mme_touches()
+            victim = next(
+                (m for m in self._mme_registry.least_recently_used() if m != model_name), None
+            )
+            if victim is None:
+                return error
+            self._evict_mme_model(victim, error)
+
+    def _mme_admission_error(self, model_bytes, need_ports=True):
+        if need_ports and not self._ports_available():
+            return "no available ports to load the model."
+        if SAGEMAKER_TFS_MME_LRU_EVICTION:
+            total_memory, available_memory = tfs_utils.get_cpu_memory_bytes()
+            projected = (total_memory - available_memory + model_bytes) / total_memory * 100
+            if projected > SAGEMAKER_TFS_MME_MEMORY_THRESHOLD:
+                return "projected memory use {:.1f}% exceeds {}%.".format(
+                    projected, SAGEMAKER_TFS_MME_MEMORY_THRESHOLD
+                )
+        return None
+
+    def _evict_mme_model(self, model_name, reason):
+        pids = [status.pid for status in self._mme_tfs_instances_status.get(model_name, [])]
+        resident_bytes = sum(tfs_utils.get_process_rss_bytes(pid) for pid in pids)
+        log.warning(
+            "evicting least recently used model %s (%d resident bytes): %s",
+            model_name,
+            resident_bytes,
+            reason,
+        )
+        unload_start = time.monotonic()
+        self._delete_model(model_name)
+        self._remove_model_config(model_name)
+        self._mme_tfs_instances_status.pop(model_name, None)
+        self._unregister_mme_model(model_name)
+        self._mme_registry.record_eviction(model_name)
+        self._update_ports_available()
+        # The shared TFS frees the model's memory before the reload returns.
+        # SIGKILL is asynchronous; wait for the memory to be released before
+        # re-checking admission. A reaped or zombie child has no resident pages.
+        deadline = time.time() + 5
+        while (
+            not SAGEMAKER_TFS_MME_SHARED_INSTANCES
+            and time.time() < deadline
+            and any(tfs_utils.get_process_rss_bytes(p) for p in pids)
+        ):
+            time.sleep(0.05)
+        tfs_metrics.observe(
+            "sagemaker_tfs_mme_unload_duration_seconds",
+            time.monotonic() - unload_start,
+            reason="eviction",
+        )
 
-    def _sync_local_mme_instance_status(self):
-        if not os.path.exists(MME_TFS_INSTANCE_STATUS_FILE):
-            log.info("mme instance status file does not exist.")
-            self._mme_tfs_instances_status = {}
+    def _claim_warm_tfs(self):
+        """Take a live warm TFS (TfsInstanceStatus) out of the pool, or return None."""
+        while True:
+            warm = self._mme_registry.claim_warm()
+            if warm is None or tfs_utils.process_running(warm.pid):
+                return warm
+            log.warning("warm tfs pid %s on rest port %s is gone", warm.pid, warm.rest_port)
+
+    def _fill_warm_pool(self):
+        """Start warm TFS processes until the pool is full; called under lock().
+
+        Does not wait for them: a load that claims one still starting waits
+        in _load_into_warm_tfs. Stops early when ports or memory run short;
+        loaded models take precedence over idle processes.
+        """
+        alive = 0
+        for warm in self._mme_registry.warm_instances():
+            if tfs_utils.process_running(warm.pid):
+                alive += 1
+            else:
+                log.warning("warm tfs pid %s on rest port %s is gone", warm.pid, warm.rest_port)
+                self._mme_registry.remove_warm(warm.rest_port)
+        for _ in range(SAGEMAKER_TFS_MME_WARM_POOL_SIZE - alive):
+            error = self._mme_admission_error(0)
+            if error is not None:
+                log.info("warm pool not refilled: %s", error)
+                return
+            rest_port = self._tfs_available_ports["rest_port"].pop()
+            grpc_port = self._tfs_available_ports["grpc_port"].pop()
+            try:
+                pid = self._start_warm_tfs(rest_port, grpc_port)
+            except OSError as e:
+                log.error("failed to start warm tfs on rest port %s: %s", rest_port, e)
+                return
+            self._mme_registry.add_warm(TfsInstanceStatus(rest_port, grpc_port, pid), time.time())
+
+    def _start_warm_tfs(self, rest_port, grpc_port):
+        directory = tfs_utils.warm_tfs_dir(rest_port)
+        os.makedirs(directory, exist_ok=True)
+        tfs_config_file = os.path.join(directory, "model-config.cfg")
+        with open(tfs_config_file, "w", encoding="utf8") as f:
+            f.write(tfs_utils.create_tfs_config_models({}))
+        batching_config_file = os.path.join(directory, "batching-config.cfg")
+        if self._tfs_enable_batching:
+            tfs_utils.create_batching_config(batching_config_file)
+        cmd = tfs_utils.tfs_command(
+            grpc_port,
+            rest_port,
+            tfs_config_file,
+            self._tfs_enable_batching,
+            batching_config_file,
+            tfs_intra_op_parallelism=self._tfs_intra_op_parallelism,
+            tfs_inter_op_parallelism=self._tfs_inter_op_parallelism,
+        )
+        p = subprocess.Popen(cmd.split())
+        log.info("started warm tensorflow serving (pid: %d, rest port: %d)", p.pid, rest_port)
+        return p.pid
+
+    def _touch_mme_model(self, model_name):
+        """Note an invocation of model_name; a per-worker greenlet flushes it to the registry."""
+        self._mme_pending_touches[model_name] = time.time()
+        # resources are built before gunicorn forks: start the flusher in each worker
+        if self._mme_touch_flusher_pid != os.getpid():
+            self._mme_touch_flusher_pid = os.getpid()
+            gevent.spawn(self._flush_mme_touches_forever)
+
+    def _flush_mme_touches_forever(self):
+        while True:
+            gevent.sleep(MME_TOUCH_INTERVAL_SECONDS)
+            self._flush_mme_touches()
+
+    def _flush_mme_touches(self):
+        """Write this worker's pending last-used times to the registry in one commit."""
+        pending, self._mme_pending_touches = self._mme_pending_touches, {}
+        if not pending:
             return
         try:
-            with open(MME_TFS_INSTANCE_STATUS_FILE, "rb") as handle:
-                self._mme_tfs_instances_status = pickle.load(handle)
-        except (EOFError, pickle.UnpicklingError) as e:
-            # Truncated pickle (SIGKILL mid-write during OOM/scale-in). Reset
-            # instead of propagating — otherwise every subsequent /models call
-            # returns 500 forever while /ping keeps returning 200.
-            log.error("mme instance status file corrupted (%s); resetting to empty", e)
-            self._mme_tfs_instances_status = {}
-            return
+            self._mme_registry.touch_many(pending)
+        except Exception:
+            log.exception("failed to record last-used times of %s", sorted(pending))
+            # keep them for the next flush unless the model was invoked again since
+            for model_name, timestamp in pending.items():
+                self._mme_pending_touches.setdefault(model_name, timestamp)
+
+    def _mme_stats(self):
+        """Per-model load/eviction counters and resident bytes of the loaded models."""
+        self._flush_mme_touches()
+        models = self._mme_registry.stats()
+        for model_name, stats in models.items():
+            statuses = self._mme_tfs_instances_status.get(model_name, [])
+            stats["loaded"] = bool(statuses)
+            # A shared TFS process holds many models; its RSS is not per model.
+            stats["resident_bytes"] = (
+                None
+                if SAGEMAKER_TFS_MME_SHARED_INSTANCES
+                else sum(tfs_utils.get_process_rss_bytes(status.pid) for status in statuses)
+            )
+        pids = {
+            status.pid
+            for statuses in self._mme_tfs_instances_status.values()
+            for status in statuses
+        }
+        total_memory, available_memory = tfs_utils.get_cpu_memory_bytes()
+        return {
+            "models": models,
+            "warm_pool": len(self._mme_registry.warm_instances()),
+            "evictions": sum(stats["evictions"] for stats in models.values()),
+            "resident_bytes": sum(tfs_utils.get_process_rss_bytes(pid) for pid in pids),
+            "memory_used_percent": round((total_memory - available_memory) / total_memory * 100, 2),
+        }
+
+    def metrics_gauges(self):
+        """Gauges for GET /metrics, read at scrape time (see tfs_metrics.render)."""
+        if SAGEMAKER_MULTI_MODEL_ENABLED:
+            self._sync_local_mme_instance_status()
+            ports = (
+                self._tfs_shared_rest_ports
+                if SAGEMAKER_TFS_MME_SHARED_INSTANCES
+                else sorted(
+                    status.rest_port
+                    for statuses in self._mme_tfs_instances_status.values()
+                    for status in statuses
+                )
+            )
+        else:
+            ports = self._tfs_rest_ports
+        loads = [(port, self._balancer.load(port)) for port in ports]
+        gauges = [
+            (
+                "sagemaker_tfs_instance_in_flight",
+                "gauge",
+                "Requests in flight to each TFS instance (REST port), over all workers.",
+                [({"instance": port}, in_flight) for port, (in_flight, _) in loads],
+            ),
+            (
+                "sagemaker_tfs_instance_latency_ewma_seconds",
+                "gauge",
+                "Load balancer EWMA of request latency per TFS instance.",
+                [({"instance": port}, latency) for port, (_, latency) in loads],
+            ),
+        ]
+        if not SAGEMAKER_MULTI_MODEL_ENABLED:
+            return gauges
+
+        stats = self._mme_stats()
+        instances = sum(len(statuses) for statuses in self._mme_tfs_instances_status.values())
+        gauges += [
+            (
+                "sagemaker_tfs_mme_models_loaded",
+                "gauge",
+                "Models in the MME registry.",
+                [({}, len(self._mme_tfs_instances_status))],
+            ),
+            (
+                "sagemaker_tfs_mme_tfs_instances",
+                "gauge",
+                "TFS instances serving registered models.",
+                [({}, instances)],
+            ),
+            (
+                "sagemaker_tfs_mme_resident_bytes",
+                "gauge",
+                "Resident memory of the TFS processes serving registered models.",
+                [({}, stats["resident_bytes"])],
+            ),
+            (
+                "sagemaker_tfs_mme_memory_used_percent",
+                "gauge",
+                "Host memory in use.",
+                [({}, stats["memory_used_percent"])],
+            ),
+            (
+                "sagemaker_tfs_mme_model_loads_total",
+                "counter",
+                "Successful loads of each model.",
+                [
+                    ({"model": model}, model_stats["loads"])
+                    for model, model_stats in stats["models"].items()
+                ],
+            ),
+            (
+                "sagemaker_tfs_mme_model_evictions_total",
+                "counter",
+                "LRU evictions of each model.",
+                [
+                    ({"model": model}, model_stats["evictions"])
+                    for model, model_stats in stats["models"].items()
+                ],
+            ),
+        ]
+        if not SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+            total = len(self._tfs_ports["rest_port"])
+            gauges.append(
+                (
+                    "sagemaker_tfs_mme_ports",
+                    "gauge",
+                    "REST/gRPC port pairs in the MME port pool, by state.",
+                    [
+                        ({"state": "model"}, instances),
+                        ({"state": "warm"}, stats["warm_pool"]),
+                        ({"state": "free"}, max(0, total - instances - stats["warm_pool"])),
+                    ],
+                )
+            )
+        return gauges
+
+    def _register_mme_models(self, model_names):
+        """Add model_names with their local instances to the registry in one commit."""
+        instances = {
+            model_name: self._mme_tfs_instances_status[model_name] for model_name in model_names
+        }
+        generation = self._mme_registry.put_many(instances)
+        log.info("registered models (generation %s): %s", generation, instances)
+        return generation
+
+    def _unregister_mme_model(self, model_name):
+        self._unregister_mme_models([model_name])
+
+    def _unregister_mme_models(self, model_names):
+        for model_name in model_names:
+            tfs_grpc_utils.forget_model(model_name)
+            self.model_handlers.evict(model_name)
+        removed = self._mme_registry.remove_many(model_names)
+        if removed:
+            log.info("unregistered models %s", removed)
+
+    def _sync_local_mme_instance_status(self):
+        """Refresh the local model map from the registry; return True if it changed.
+
+        Safe without lock(): a single version read when nothing changed, and a
+        consistent snapshot when something did.
+        """
+        version = self._mme_registry.version()
+        if version == self._mme_registry_version:
+            return False
+        version, instances = self._mme_registry.snapshot()
+        for model_name, statuses in self._mme_tfs_instances_status.items():
+            current = instances.get(model_name)
+            if not current or current[0].generation != statuses[0].generation:
+                # Unloaded or reloaded by another worker: its signature may differ.
+                tfs_grpc_utils.forget_model(model_name)
+        self.model_handlers.retain(
+            {model_name: statuses[0].generation for model_name, statuses in instances.items()}
+        )
+        self._mme_tfs_instances_status = instances
+        self._mme_registry_version = version
         log.info(
-            "updated local mme instance status with content: {}".format(
-                self._mme_tfs_instances_status
+            "updated local mme instance status to registry version {}: {}".format(
+                version, self._mme_tfs_instances_status
             )
         )
+        return True
 
-    def _sync_model_handlers(self):
-        for model_name, _ in self._mme_tfs_instances_status.items():
-            if model_name not in self.model_handlers:
-                self._import_custom_modules(model_name)
+    def _mme_instance_alive(self, tfs_status):
+        if SAGEMAKER_TFS_MME_SHARED_INSTANCES:
+            # serve.py restarts a dead shared TFS from its config file; evicting
+            # every model it hosted would only force needless reloads.
+            return True
+        return self._check_pid(tfs_status.pid)
 
     def _check_pid(self, pid):
         """Check For the existence of a unix pid."""
@@ -731,15 +1787,28 @@ class PingResource:
         res.status = falcon.HTTP_200
 
 
+class MetricsResource:
+    def __init__(self, python_service_resource):
+        self._python_service_resource = python_service_resource
+
+    def on_get(self, req, res):  # pylint: disable=W0613
+        res.status = falcon.HTTP_200
+        res.content_type = tfs_metrics.CONTENT_TYPE
+        res.body = tfs_metrics.render(self._python_service_resource.metrics_gauges())
+
+
 class ServiceResources:
     def __init__(self):
         self._enable_model_manager = SAGEMAKER_MULTI_MODEL_ENABLED
         self._python_service_resource = PythonServiceResource()
         self._ping_resource = PingResource()
+        self._metrics_resource = MetricsResource(self._python_service_resource)
 
     def add_routes(self, application):
         application.add_route("/ping", self._ping_resource)
         application.add_route("/invocations", self._python_service_resource)
+        if tfs_metrics.ENABLED:
+            application.add_route("/metrics", self._metrics_resource)
 
         if self._enable_model_manager:
             application.add_route("/models", self._python_service_resource)
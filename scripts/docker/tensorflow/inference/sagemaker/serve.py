@@ -14,10 +14,14 @@ import logging
 import os
 import re
 import signal
+import socket
 import subprocess
+import threading
 import time
 
 import boto3
+import tfs_grpc_utils
+import tfs_metrics
 import tfs_utils
 
 logging.basicConfig(
@@ -29,6 +33,16 @@ JS_PING = "js_content tensorflowServing.ping"
 JS_INVOCATIONS = "js_content tensorflowServing.invocations"
 GUNICORN_PING = "proxy_pass http://gunicorn_upstream/ping"
 GUNICORN_INVOCATIONS = "proxy_pass http://gunicorn_upstream/invocations"
+# With SAGEMAKER_TFS_METRICS, nginx reports invocations it sends straight to TFS
+# (the njs route) to serve.py over syslog, as "<status> <request_time> <model>".
+NGINX_METRICS_SOCKET = "/tmp/nginx-metrics.sock"
+NGINX_METRICS_TAG = "tfs_metrics"
+NGINX_METRICS_ACCESS_LOG = (
+    "access_log /dev/stdout combined;\n"
+    "        access_log syslog:server=unix:{},nohostname,tag={} tfs_metrics;".format(
+        NGINX_METRICS_SOCKET, NGINX_METRICS_TAG
+    )
+)
 CODE_DIR = (
     "/opt/ml/code"
     if os.environ.get("SAGEMAKER_MULTI_MODEL", "False").lower() == "true"
@@ -59,6 +73,7 @@ class ServiceManager(object):
         self._tfs_batching_config_path = "/sagemaker/batching-config.cfg"
 
         _enable_batching = os.environ.get("SAGEMAKER_TFS_ENABLE_BATCHING", "false").lower()
+        _enable_numpy = os.environ.get("SAGEMAKER_TFS_ENABLE_NUMPY", "false").lower()
         _enable_multi_model_endpoint = os.environ.get("SAGEMAKER_MULTI_MODEL", "false").lower()
         # Use this to specify memory that is needed to initialize CUDA/cuDNN and other GPU libraries
         self._tfs_gpu_margin = float(os.environ.get("SAGEMAKER_TFS_FRACTIONAL_GPU_MEM_MARGIN", 0.2))
@@ -93,6 +108,20 @@ class ServiceManager(object):
             raise ValueError("SAGEMAKER_MULTI_MODEL must be 'true' or 'false'")
         self._tfs_enable_multi_model_endpoint = _enable_multi_model_endpoint == "true"
 
+        # MME with a fixed pool of TFS processes that host every model (added and
+        # removed by python_service through HandleReloadConfigRequest) instead of
+        # one process per model. serve.py starts the pool; each model is still
+        # loaded into SAGEMAKER_TFS_INSTANCE_COUNT of its processes.
+        self._tfs_mme_shared_instances = int(
+            os.environ.get("SAGEMAKER_TFS_MME_SHARED_INSTANCES", 0)
+        )
+        # number of TFS processes (and port pairs) serve.py itself starts
+        self._tfs_process_count = (
+            self._tfs_mme_shared_instances
+            if self._tfs_enable_multi_model_endpoint and self._tfs_mme_shared_instances
+            else self._tfs_instance_count
+        )
+
         self._need_python_service()
         log.info("PYTHON SERVICE: {}".format(str(self._enable_python_service)))
 
@@ -100,7 +129,23 @@ class ServiceManager(object):
             raise ValueError("SAGEMAKER_TFS_ENABLE_BATCHING must be 'true' or 'false'")
         self._tfs_enable_batching = _enable_batching == "true"
 
+        if _enable_numpy not in ["true", "false"]:
+            raise ValueError("SAGEMAKER_TFS_ENABLE_NUMPY must be 'true' or 'false'")
+        self._tfs_enable_numpy = _enable_numpy == "true"
+        # python_service sends .npy/.npz tensors to TFS over gRPC only
+        if self._tfs_enable_numpy and not tfs_grpc_utils.grpc_available():
+            raise RuntimeError(
+                "SAGEMAKER_TFS_ENABLE_NUMPY is 'true' but the TFS gRPC messages cannot be imported"
+            )
+
         self._use_gunicorn = self._enable_python_service or self._tfs_enable_multi_model_endpoint
+        # python_service always accepts .npy/.npz; on the njs route it is only started
+        # for them when SAGEMAKER_TFS_ENABLE_NUMPY opts in, or to serve /metrics.
+        self._start_python_service = (
+            self._use_gunicorn or self._tfs_enable_numpy or tfs_metrics.ENABLED
+        )
+        # njs-route invocations never reach python_service; nginx reports them
+        self._nginx_metrics = tfs_metrics.ENABLED and not self._use_gunicorn
 
         if self._sagemaker_port_range is not None:
             parts = self._sagemaker_port_range.split("-")
@@ -108,14 +153,14 @@ class ServiceManager(object):
             hi = int(parts[1])
             self._tfs_grpc_ports = []
             self._tfs_rest_ports = []
-            if low + 2 * self._tfs_instance_count > hi:
+            if low + 2 * self._tfs_process_count > hi:
                 raise ValueError(
                     "not enough ports available in SAGEMAKER_SAFE_PORT_RANGE ({})".format(
                         self._sagemaker_port_range
                     )
                 )
             # select non-overlapping grpc and rest ports based on tfs instance count
-            for i in range(self._tfs_instance_count):
+            for i in range(self._tfs_process_count):
                 self._tfs_grpc_ports.append(str(low + 2 * i))
                 self._tfs_rest_ports.append(str(low + 2 * i + 1))
             # concat selected ports respectively in order to pass them to python service
@@ -144,6 +189,15 @@ class ServiceManager(object):
             "SAGEMAKER_MULTI_MODEL_UNIVERSAL_PREFIX"
         ):
             self._enable_python_service = True
+        # The gRPC default handler lives in python_service, so invocations must
+        # go through gunicorn instead of the njs -> TFS REST route.
+        if os.environ.get("SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL", "rest").lower() == "grpc":
+            if not tfs_grpc_utils.grpc_available():
+                raise RuntimeError(
+                    "SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL is 'grpc' but the TFS gRPC "
+                    "messages cannot be imported"
+                )
+            self._enable_python_service = True
 
     def _concat_ports(self, ports):
         str_ports = [str(port) for port in ports]
@@ -273,6 +327,12 @@ class ServiceManager(object):
         for port in self._tfs_rest_ports:
             tfs_upstream += "{}server localhost:{};\n".format(indentation, port)
         tfs_upstream = tfs_upstream[len(indentation) : -2]
+        if len(self._tfs_rest_ports) > 1:
+            # prefer the TFS instance with the fewest active requests over
+            # round-robin; the zone shares connection counts across nginx workers
+            tfs_upstream = "zone tfs_upstream 64k;\n{0}least_conn;\n{0}{1}".format(
+                indentation, tfs_upstream
+            )
 
         return tfs_upstream
 
@@ -289,6 +349,8 @@ class ServiceManager(object):
             "FORWARD_INVOCATION_REQUESTS": (
                 GUNICORN_INVOCATIONS if self._use_gunicorn else JS_INVOCATIONS
             ),
+            "NUMPY_TO_PYTHON_SERVICE": str(self._tfs_enable_numpy).lower(),
+            "INVOCATIONS_ACCESS_LOG": NGINX_METRICS_ACCESS_LOG if self._nginx_metrics else "",
             "PROXY_READ_TIMEOUT": str(self._nginx_proxy_read_timeout_seconds),
         }
 
@@ -308,7 +370,7 @@ class ServiceManager(object):
 
     def _enable_per_process_gpu_memory_fraction(self):
         nvidia_smi_exist = os.path.exists("/usr/bin/nvidia-smi")
-        if self._tfs_instance_count > 1 and nvidia_smi_exist:
+        if self._tfs_process_count > 1 and nvidia_smi_exist:
             return True
 
         return False
@@ -322,12 +384,12 @@ class ServiceManager(object):
         return 0
 
     def _calculate_per_process_gpu_memory_fraction(self):
-        return round((1 - self._tfs_gpu_margin) / float(self._tfs_instance_count), 4)
+        return round((1 - self._tfs_gpu_margin) / float(self._tfs_process_count), 4)
 
     def _start_tfs(self):
         self._log_version("tensorflow_model_server --version", "tensorflow version info:")
 
-        for i in range(self._tfs_instance_count):
+        for i in range(self._tfs_process_count):
             p = self._start_single_tfs(i)
             self._tfs.append(p)
 
@@ -340,6 +402,29 @@ class ServiceManager(object):
         log.info("started gunicorn (pid: %d)", p.pid)
         self._gunicorn = p
 
+    def _start_nginx_metrics_listener(self):
+        """Record the invocations nginx logs to NGINX_METRICS_SOCKET, in a daemon thread."""
+        if os.path.exists(NGINX_METRICS_SOCKET):
+            os.remove(NGINX_METRICS_SOCKET)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(NGINX_METRICS_SOCKET)
+        # nginx workers do not run as root
+        os.chmod(NGINX_METRICS_SOCKET, 0o666)
+        threading.Thread(target=self._record_nginx_invocations, args=(sock,), daemon=True).start()
+
+    def _record_nginx_invocations(self, sock):
+        marker = "{}: ".format(NGINX_METRICS_TAG).encode("utf-8")
+        while True:
+            message = sock.recv(4096)
+            try:
+                status, request_time, model = message.split(marker, 1)[1].decode().split()
+                seconds = float(request_time)
+            except (IndexError, UnicodeDecodeError, ValueError):
+                log.warning("unexpected nginx metrics message: %r", message)
+                continue
+            tfs_metrics.inc("sagemaker_tfs_requests_total", model=model, code=status)
+            tfs_metrics.observe("sagemaker_tfs_request_duration_seconds", seconds, model=model)
+
     def _start_nginx(self):
         self._log_version("/usr/sbin/nginx -V", "nginx version info:")
         p = subprocess.Popen("/usr/sbin/nginx -c /sagemaker/nginx.conf".split())
@@ -399,9 +484,16 @@ class ServiceManager(object):
     def _wait_for_tfs(self):
         for i in range(self._tfs_instance_count):
             tfs_utils.wait_for_model(
-                self._tfs_rest_ports[i], self._tfs_default_model_name, self._tfs_wait_time_seconds
+                self._tfs_rest_ports[i],
+                self._tfs_default_model_name,
+                self._tfs_wait_time_seconds,
+                self._tfs[i].pid,
             )
 
+    def _wait_for_shared_tfs(self):
+        for i in range(self._tfs_process_count):
+            tfs_utils.wait_for_tfs_server(self._tfs_rest_ports[i], self._tfs_wait_time_seconds)
+
     def _is_tfs_process(self, pid):
         for p in self._tfs:
             if p.pid == pid:
@@ -421,11 +513,21 @@ class ServiceManager(object):
         p = self._start_single_tfs(instance_id)
         self._tfs[instance_id] = p
 
+    def _shared_mme_tfs(self):
+        return self._tfs_enable_multi_model_endpoint and bool(self._tfs_mme_shared_instances)
+
     def _start_single_tfs(self, instance_id):
+        # A restarted shared MME instance comes back with the models that
+        # python_service last wrote to its config file.
+        config_path = (
+            os.path.join(tfs_utils.shared_tfs_dir(instance_id), "model-config.cfg")
+            if self._shared_mme_tfs()
+            else self._tfs_config_path
+        )
         cmd = tfs_utils.tfs_command(
             self._tfs_grpc_ports[instance_id],
             self._tfs_rest_ports[instance_id],
-            self._tfs_config_path,
+            config_path,
             self._tfs_enable_batching,
             self._tfs_batching_config_path,
             tfs_intra_op_parallelism=self._tfs_intra_op_parallelism,
@@ -451,6 +553,11 @@ class ServiceManager(object):
             p = subprocess.Popen(cmd.split())
             log.info("started tensorflow serving (pid: {})".format(p.pid))
 
+        if self._shared_mme_tfs():
+            with open(
+                os.path.join(tfs_utils.shared_tfs_dir(instance_id), "tfs.pid"), "w", encoding="utf8"
+            ) as f:
+                f.write(str(p.pid))
         return p
 
     def _monitor(self):
@@ -462,12 +569,14 @@ class ServiceManager(object):
 
             if pid == self._nginx.pid:
                 log.warning("unexpected nginx exit (status: {}). restarting.".format(status))
+                tfs_metrics.inc("sagemaker_tfs_process_restarts_total", process="nginx")
                 self._start_nginx()
 
             elif self._is_tfs_process(pid):
                 log.warning(
                     "unexpected tensorflow serving exit (status: {}). restarting.".format(status)
                 )
+                tfs_metrics.inc("sagemaker_tfs_process_restarts_total", process="tfs")
                 try:
                     self._restart_single_tfs(pid)
                 except (ValueError, OSError) as error:
@@ -475,18 +584,30 @@ class ServiceManager(object):
 
             elif self._gunicorn and pid == self._gunicorn.pid:
                 log.warning("unexpected gunicorn exit (status: {}). restarting.".format(status))
+                tfs_metrics.inc("sagemaker_tfs_process_restarts_total", process="gunicorn")
                 self._start_gunicorn()
 
     def start(self):
         log.info("starting services")
         self._state = "starting"
         signal.signal(signal.SIGTERM, self._stop)
+        tfs_metrics.reset()
 
         if self._tfs_enable_batching:
             log.info("batching is enabled")
             tfs_utils.create_batching_config(self._tfs_batching_config_path)
 
-        if self._tfs_enable_multi_model_endpoint:
+        if self._tfs_enable_multi_model_endpoint and self._tfs_mme_shared_instances:
+            log.info(
+                "multi-model endpoint is enabled with %s shared TFS model servers",
+                self._tfs_mme_shared_instances,
+            )
+            for i in range(self._tfs_process_count):
+                tfs_utils.write_shared_tfs_config(i, {})
+            self._start_tfs()
+            # python_service loads models into these as soon as gunicorn is up
+            self._wait_for_shared_tfs()
+        elif self._tfs_enable_multi_model_endpoint:
             log.info("multi-model endpoint is enabled, TFS model servers will be started later")
         else:
             self._create_tfs_config()
@@ -495,12 +616,14 @@ class ServiceManager(object):
 
         self._create_nginx_config()
 
-        if self._use_gunicorn:
+        if self._start_python_service:
             self._setup_gunicorn()
             self._start_gunicorn()
             # make sure gunicorn is up
             self._wait_for_gunicorn(timeout_seconds=self._gunicorn_timeout_seconds)
 
+        if self._nginx_metrics:
+            self._start_nginx_metrics_listener()
         self._start_nginx()
         self._state = "started"
         self._monitor()
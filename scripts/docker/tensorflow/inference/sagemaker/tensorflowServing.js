@@ -1,10 +1,19 @@
 var tfs_base_uri = '/tfs/v1/models/'
 var custom_attributes_header = 'X-Amzn-SageMaker-Custom-Attributes'
 
+var binary_tensor_types = ['application/x-npy', 'application/x-npz']
+
 function invocations(r) {
     var ct = (r.headersIn['Content-Type'] || '').split(';')[0].trim().toLowerCase()
 
-    if (ct === 'application/json' || ct === 'application/jsonlines' || ct === 'application/jsons') {
+    if (is_binary_tensor_request(ct, r.headersIn.Accept)) {
+        // the TFS REST API only speaks JSON; python_service sends these over gRPC
+        if (r.variables.numpy_to_python_service === 'true') {
+            r.internalRedirect('@python_service_invocations')
+        } else {
+            return_error(r, 415, 'Unsupported Media Type: .npy/.npz need SAGEMAKER_TFS_ENABLE_NUMPY=true')
+        }
+    } else if (ct === 'application/json' || ct === 'application/jsonlines' || ct === 'application/jsons') {
         json_request(r)
     } else if (ct === 'text/csv') {
         csv_request(r)
@@ -13,6 +22,17 @@ function invocations(r) {
     }
 }
 
+function is_binary_tensor_request(ct, accept) {
+    if (binary_tensor_types.indexOf(ct) !== -1) return true
+    var types = (accept || '').split(',')
+    for (var i = 0; i < types.length; i++) {
+        if (binary_tensor_types.indexOf(types[i].split(';')[0].trim().toLowerCase()) !== -1) {
+            return true
+        }
+    }
+    return false
+}
+
 function ping(r) {
     var uri = make_tfs_uri(r, false)
     if (uri === null) return
@@ -0,0 +1,134 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Load-aware choice of TFS instance, shared by every gunicorn worker.
+
+Each TFS instance (keyed by its REST port) has, per gunicorn worker, an
+in-flight request count and an EWMA of request latency. The table lives in an
+anonymous shared mmap created before gunicorn forks, so all workers see each
+other's load. Every worker owns one row and is its only writer; greenlets
+within a worker never yield between a read and the write that follows, so no
+lock is needed on the request path.
+
+pick() uses the power of two choices: sample two instances and take the one
+with the lower (in_flight + 1) * latency_ewma score. A TFS instance stalled
+by GC or a long batch queue accumulates in-flight requests and latency and
+stops receiving new work, while sampling keeps the choice cheap and avoids
+every worker herding onto the same "best" instance.
+"""
+
+import logging
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+
+log = logging.getLogger(__name__)
+
+# weight of the newest latency sample in the EWMA
+EWMA_ALPHA = 0.3
+# latency assumed for an instance with no samples yet, so it gets tried
+_UNSEEN_LATENCY = 0.0
+
+_SLOT = struct.Struct("qd")  # in_flight, latency_ewma (seconds)
+_ROW_HEADER = struct.Struct("q")  # owning pid
+
+
+class LoadBalancer:
+    def __init__(self, ports, max_workers):
+        self._ports = list(ports)
+        self._index = {port: i for i, port in enumerate(self._ports)}
+        self._rows = max_workers
+        self._row_size = _ROW_HEADER.size + _SLOT.size * len(self._ports)
+        self._mm = mmap.mmap(-1, max(1, self._row_size * self._rows))
+        self._claim_lock = multiprocessing.Lock()
+        self._row = None
+        self._row_pid = None
+
+    def _own_row(self):
+        pid = os.getpid()
+        if self._row_pid != pid:
+            self._row = self._claim_row(pid)
+            self._row_pid = pid
+        return self._row
+
+    def _claim_row(self, pid):
+        """Claim a free row, or the row of a dead worker (resetting its counts)."""
+        with self._claim_lock:
+            for row in range(self._rows):
+                offset = row * self._row_size
+                (owner,) = _ROW_HEADER.unpack_from(self._mm, offset)
+                if owner and owner != pid and _alive(owner):
+                    continue
+                self._mm[offset : offset + self._row_size] = bytes(self._row_size)
+                _ROW_HEADER.pack_into(self._mm, offset, pid)
+                return row
+        log.warning("load balancer has no free row for pid %s; its load is not shared", pid)
+        return None
+
+    def _slot_offset(self, row, port):
+        return row * self._row_size + _ROW_HEADER.size + _SLOT.size * self._index[port]
+
+    def load(self, port):
+        """Return (in_flight, latency_ewma) for port summed/averaged over all workers."""
+        if port not in self._index:
+            return 0, _UNSEEN_LATENCY
+        in_flight, latencies = 0, []
+        for row in range(self._rows):
+            (owner,) = _ROW_HEADER.unpack_from(self._mm, row * self._row_size)
+            if not owner:
+                continue
+            count, latency = _SLOT.unpack_from(self._mm, self._slot_offset(row, port))
+            # a worker killed mid-request leaves its count behind until its row is reclaimed
+            if count and not _alive(owner):
+                continue
+            in_flight += count
+            if latency:
+                latencies.append(latency)
+        return in_flight, (sum(latencies) / len(latencies) if latencies else _UNSEEN_LATENCY)
+
+    def _score(self, port):
+        in_flight, latency = self.load(port)
+        return (in_flight + 1) * latency
+
+    def pick(self, ports):
+        """Choose one of ports (power of two choices)."""
+        if len(ports) == 1:
+            return ports[0]
+        first, second = random.sample(ports, 2)
+        return first if self._score(first) <= self._score(second) else second
+
+    def start(self, port):
+        row = self._own_row()
+        if row is None or port not in self._index:
+            return
+        offset = self._slot_offset(row, port)
+        count, latency = _SLOT.unpack_from(self._mm, offset)
+        _SLOT.pack_into(self._mm, offset, count + 1, latency)
+
+    def finish(self, port, seconds):
+        row = self._own_row()
+        if row is None or port not in self._index:
+            return
+        offset = self._slot_offset(row, port)
+        count, latency = _SLOT.unpack_from(self._mm, offset)
+        latency = seconds if not latency else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * latency
+        _SLOT.pack_into(self._mm, offset, max(0, count - 1), latency)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
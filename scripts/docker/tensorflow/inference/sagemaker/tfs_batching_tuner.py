@@ -0,0 +1,266 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Offline tuner for TFS batching parameters.
+
+Starts a local tensorflow_model_server for one SavedModel with batching
+enabled, drives a synthetic closed-loop load against its REST API, and
+searches max_batch_size, batch_timeout_micros and num_batch_threads (one
+coordinate at a time) for the highest throughput whose p99 latency stays under
+a target. The winner is written as a batching parameters file; point
+SAGEMAKER_TFS_BATCHING_CONFIG at it and ServiceManager (and MME loads) use it
+in place of the CPU-count defaults.
+
+Run inside the serving image:
+
+    python3 /sagemaker/tfs_batching_tuner.py --model-dir /opt/ml/model/my_model \\
+        --p99-ms 50 --concurrency 32 --output /opt/ml/model/code/batching-config.cfg
+
+The request payload comes from --payload-file (a JSON body for
+/v1/models/<name>:predict), or is synthesized from the serving signature when
+every input is numeric.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+import tfs_utils
+
+log = logging.getLogger(__name__)
+
+MODEL_NAME = "model"
+MAX_BATCH_SIZES = (1, 4, 8, 16, 32, 64, 128)
+BATCH_TIMEOUTS_MICROS = (0, 500, 1000, 2000, 5000, 10000)
+_NUMERIC_DTYPES = {
+    "DT_FLOAT": float,
+    "DT_DOUBLE": float,
+    "DT_HALF": float,
+    "DT_BFLOAT16": float,
+    "DT_INT8": int,
+    "DT_INT16": int,
+    "DT_INT32": int,
+    "DT_INT64": int,
+    "DT_UINT8": int,
+}
+
+
+def synthesize_payload(rest_port, signature_name, rows):
+    """Build a {"instances": [...]} body matching the model's serving signature."""
+    metadata = requests.get(
+        "http://localhost:{}/v1/models/{}/metadata".format(rest_port, MODEL_NAME), timeout=30
+    ).json()
+    signature = metadata["metadata"]["signature_def"]["signature_def"][signature_name]
+    instance = {}
+    for name, spec in signature["inputs"].items():
+        to_value = _NUMERIC_DTYPES.get(spec["dtype"])
+        if to_value is None:
+            raise ValueError(
+                "input {} has dtype {}; pass --payload-file".format(name, spec["dtype"])
+            )
+        # drop the batch dimension; unknown dimensions become 1
+        dims = [max(1, int(dim["size"])) for dim in spec["tensor_shape"].get("dim", [])[1:]]
+        instance[name] = _random_tensor(dims, to_value)
+    if len(instance) == 1:
+        instance = next(iter(instance.values()))
+    return {"signature_name": signature_name, "instances": [instance] * rows}
+
+
+def _random_tensor(dims, to_value):
+    if not dims:
+        return to_value(random.random() * 10)
+    return [_random_tensor(dims[1:], to_value) for _ in range(dims[0])]
+
+
+class TfsUnderTest:
+    """A local tensorflow_model_server restarted for every candidate config."""
+
+    def __init__(self, model_dir, workdir, rest_port, grpc_port, timeout_seconds):
+        self._workdir = workdir
+        self.rest_port = rest_port
+        self._grpc_port = grpc_port
+        self._timeout_seconds = timeout_seconds
+        self._model_config = os.path.join(workdir, "model-config.cfg")
+        with open(self._model_config, "w", encoding="utf8") as f:
+            f.write(tfs_utils.create_tfs_config_individual_model(MODEL_NAME, model_dir))
+        self._process = None
+
+    def start(self, batching):
+        self.stop()
+        batching_config = os.path.join(self._workdir, "batching-config.cfg")
+        with open(batching_config, "w", encoding="utf8") as f:
+            f.write(tfs_utils.format_batching_config(batching))
+        cmd = tfs_utils.tfs_command(
+            self._grpc_port, self.rest_port, self._model_config, True, batching_config
+        )
+        self._process = subprocess.Popen(
+            cmd.split(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        tfs_utils.wait_for_model(
+            self.rest_port, MODEL_NAME, self._timeout_seconds, self._process.pid
+        )
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process = None
+
+
+def measure(rest_port, body, concurrency, warmup_seconds, duration_seconds):
+    """Closed-loop load for duration_seconds; return (rows/s, p99 ms, error count)."""
+    url = "http://localhost:{}/v1/models/{}:predict".format(rest_port, MODEL_NAME)
+    data = json.dumps(body)
+
+    def worker(deadline, record):
+        session = requests.Session()
+        latencies, errors = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.post(url, data=data, timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if record:
+                if ok:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+        return latencies, errors
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        warmup_deadline = time.perf_counter() + warmup_seconds
+        list(pool.map(lambda _: worker(warmup_deadline, False), range(concurrency)))
+        start = time.perf_counter()
+        deadline = start + duration_seconds
+        results = list(pool.map(lambda _: worker(deadline, True), range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    errors = sum(worker_errors for _, worker_errors in results)
+    if not latencies:
+        return 0.0, float("inf"), errors
+    p99 = latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))]
+    rows = len(body["instances"])
+    return len(latencies) * rows / elapsed, p99, errors
+
+
+def tune(args):
+    cpu_count = multiprocessing.cpu_count()
+    candidates = {
+        "max_batch_size": list(MAX_BATCH_SIZES),
+        "batch_timeout_micros": list(BATCH_TIMEOUTS_MICROS),
+        "num_batch_threads": sorted({max(1, cpu_count // 4), max(1, cpu_count // 2), cpu_count}),
+    }
+    best = {
+        "max_batch_size": 8,
+        "batch_timeout_micros": 1000,
+        "num_batch_threads": cpu_count,
+        "max_enqueued_batches": args.max_enqueued_batches,
+    }
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="tfs-batching-tuner-") as workdir:
+        tfs = TfsUnderTest(
+            args.model_dir, workdir, args.rest_port, args.grpc_port, args.wait_seconds
+        )
+        try:
+            tfs.start(best)
+            if args.payload_file:
+                with open(args.payload_file, "r", encoding="utf8") as f:
+                    body = json.load(f)
+            else:
+                body = synthesize_payload(args.rest_port, args.signature_name, args.rows)
+
+            def evaluate(config):
+                key = tuple(sorted(config.items()))
+                if key not in results:
+                    tfs.start(config)
+                    throughput, p99, errors = measure(
+                        args.rest_port, body, args.concurrency, args.warmup, args.duration
+                    )
+                    results[key] = (throughput, p99, errors)
+                    log.info(
+                        "%s -> %.1f rows/s, p99 %.1f ms, %d errors",
+                        config,
+                        throughput,
+                        p99,
+                        errors,
+                    )
+                return results[key]
+
+            def score(config):
+                throughput, p99, errors = evaluate(config)
+                # configurations over the latency target (or failing) lose to any that meet it
+                return (p99 <= args.p99_ms and errors == 0, throughput)
+
+            best_score = score(best)
+            for _ in range(args.rounds):
+                improved = False
+                for parameter, values in candidates.items():
+                    for value in values:
+                        candidate = dict(best, **{parameter: value})
+                        candidate_score = score(candidate)
+                        if candidate_score > best_score:
+                            best, best_score, improved = candidate, candidate_score, True
+                if not improved:
+                    break
+        finally:
+            tfs.stop()
+
+    throughput, p99, errors = results[tuple(sorted(best.items()))]
+    if not best_score[0]:
+        log.warning("no configuration met p99 <= %s ms; writing the fastest one", args.p99_ms)
+    return best, {"rows_per_second": throughput, "p99_ms": p99, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--model-dir", required=True, help="SavedModel base path (version dirs)")
+    parser.add_argument("--output", required=True, help="batching parameters file to write")
+    parser.add_argument("--p99-ms", type=float, required=True, help="p99 latency target")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--rows", type=int, default=1, help="instances per synthetic request")
+    parser.add_argument("--payload-file", default=None)
+    parser.add_argument("--signature-name", default="serving_default")
+    parser.add_argument("--duration", type=float, default=20, help="seconds measured per config")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of warmup per config")
+    parser.add_argument("--rounds", type=int, default=2, help="coordinate search passes")
+    parser.add_argument("--max-enqueued-batches", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--rest-port", type=int, default=18501)
+    parser.add_argument("--grpc-port", type=int, default=19000)
+    parser.add_argument("--wait-seconds", type=int, default=300)
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(levelname)-8s %(message)s", level=logging.INFO)
+    best, metrics = tune(args)
+    with open(args.output, "w", encoding="utf8") as f:
+        f.write(tfs_utils.format_batching_config(best))
+    print(json.dumps({"batching_parameters": best, **metrics}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
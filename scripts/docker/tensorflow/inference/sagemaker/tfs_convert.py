@@ -0,0 +1,327 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""CSV / JSON Lines to TFS REST request conversion for custom handlers.
+
+nginx converts text/csv and JSON Lines bodies to {"instances": [...]} in njs
+(tensorflowServing.js), but requests routed to python_service because an
+inference.py exists never pass through it. to_tfs_json() produces the same
+bytes the njs handlers would send to TFS, so an input_handler can do
+
+    def input_handler(data, context):
+        return context.to_tfs_json(data.read())
+
+The text conversion keeps numeric fields verbatim, as njs does. An all-numeric
+CSV without quotes (the common Batch Transform shard) is validated against the
+njs number grammar with NumPy array operations over its bytes and rewritten by
+bytes.replace, never touching a field from Python; anything else goes through
+a port of the njs field splitter. Blank CSV lines are skipped, as in njs.
+
+Bodies that are not UTF-8 raise InvalidBodyError and content types without a
+conversion raise UnsupportedContentTypeError; python_service answers them
+with 400 and 415.
+
+csv_to_ndarray() and ndarray_to_json() are the typed route: NumPy's C CSV
+parser into an ndarray, then an "instances" (row) or "inputs" (columnar)
+body, encoded with orjson when it is installed.
+"""
+
+import io
+import json
+import logging
+import re
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional; json + ndarray.tolist() is the fallback
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+CSV_CONTENT_TYPE = "text/csv"
+JSON_CONTENT_TYPES = ("application/json", "application/jsonlines", "application/jsons")
+
+# String.prototype.trim() whitespace and the njs numeric field test
+_JS_WS = "\t\n\v\f\r \u00a0\u1680\u2028\u2029\u202f\u205f\u3000\ufeff" + "".join(
+    chr(c) for c in range(0x2000, 0x200B)
+)
+_ASCII_WS = b"\t\n\v\f\r "
+_LINE_SPLIT_RE = re.compile(r"\r?\n")
+_NUMBER = r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?"
+_NUMBER_RE = re.compile(r"\A" + _NUMBER + r"\Z")
+
+# whole-body fast path: lines of unquoted numeric fields, spaces/tabs allowed
+# around fields, blank lines allowed between rows
+_SP = r"[ \t\f\v]*"
+_NUMERIC_ROW = "{sp}{n}{sp}(?:,{sp}{n}{sp})*".format(sp=_SP, n=_NUMBER)
+_NUMERIC_CSV_RE = re.compile(r"{row}(?:\r?\n(?:{row}|{sp}))*".format(row=_NUMERIC_ROW, sp=_SP))
+_FIELD_SEPARATOR_RE = re.compile(_SP + "," + _SP)
+_ROW_SEPARATOR_RE = re.compile(_SP + r"(?:\r?\n" + _SP + r")+")
+_MULTI_COLUMN_ROW_RE = re.compile(r"^([^\n]*,[^\n]*)$", re.MULTILINE)
+
+# byte classes for the vectorized validator
+_INVALID, _DIGIT, _DOT, _MINUS, _PLUS, _EXP, _COMMA, _NEWLINE = range(8)
+_BYTE_CLASS = np.zeros(256, dtype=np.uint8)
+_BYTE_CLASS[ord("0") : ord("9") + 1] = _DIGIT
+_BYTE_CLASS[ord(".")] = _DOT
+_BYTE_CLASS[ord("-")] = _MINUS
+_BYTE_CLASS[ord("+")] = _PLUS
+_BYTE_CLASS[[ord("e"), ord("E")]] = _EXP
+_BYTE_CLASS[ord(",")] = _COMMA
+_BYTE_CLASS[ord("\n")] = _NEWLINE
+_INNER_BLANK_RE = re.compile(rb"[0-9.eE+-][ \t]+[0-9.eE+-]")
+# validated per block of whole lines, bounding the temporary arrays
+_VALIDATE_BLOCK_BYTES = 1 << 20
+
+# a quoted run (to the closing quote or line end), unquoted text, or a comma
+_CSV_TOKEN_RE = re.compile(r'"((?:[^"]|"")*)(?:"|\Z)|([^",]+)|(,)')
+
+_TFS_JSON_RE = re.compile(r'"(instances|inputs|examples)"\s*:')
+_JSON_LINES_RE = re.compile(r"[}\]]\s*[\[{]")
+_NESTED_ARRAY_RE = re.compile(r"\A\s*\[\s*\[")
+
+
+class InvalidBodyError(ValueError):
+    """The request body cannot be read as its content type (HTTP 400)."""
+
+
+class UnsupportedContentTypeError(ValueError):
+    """There is no TFS conversion for the request content type (HTTP 415)."""
+
+
+def _text(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        try:
+            return bytes(data).decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise InvalidBodyError("request body is not valid UTF-8: {}".format(e)) from e
+    return data
+
+
+def _js_trim(text):
+    return text.strip(_JS_WS)
+
+
+def to_tfs_json(data, content_type):
+    """Return the TFS REST request body (bytes) nginx would build for this body."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type == CSV_CONTENT_TYPE:
+        return csv_to_instances(data)
+    if media_type in JSON_CONTENT_TYPES:
+        text = _text(data)
+        if _TFS_JSON_RE.search(text):
+            return text.encode("utf-8")
+        if _JSON_LINES_RE.search(text):
+            return json_lines_to_instances(text)
+        if not _NESTED_ARRAY_RE.search(text):
+            text = "[" + text + "]"
+        return ('{"instances":' + text + "}").encode("utf-8")
+    raise UnsupportedContentTypeError(
+        "unsupported content type for TFS conversion: {}".format(content_type)
+    )
+
+
+def csv_to_instances(data):
+    """Convert a CSV body to {"instances": [...]} exactly as njs csv_request does."""
+    if isinstance(data, (bytes, bytearray, memoryview)) and bytes(data).isascii():
+        rows = _plain_numeric_rows(bytes(data).strip(_ASCII_WS))
+        if rows is not None:
+            return b'{"instances":[' + rows + b"]}"
+    text = _js_trim(_text(data))
+    if '"' not in text and _NUMERIC_CSV_RE.fullmatch(text):
+        rows = _FIELD_SEPARATOR_RE.sub(",", text)
+        rows = _ROW_SEPARATOR_RE.sub("\n", rows)
+        rows = _MULTI_COLUMN_ROW_RE.sub(r"[\1]", rows)
+        body = '{"instances":[' + rows.replace("\n", ",") + "]}"
+        return body.encode("utf-8")
+
+    rows = []
+    for line in _LINE_SPLIT_RE.split(text):
+        line = _js_trim(line)
+        if not line:
+            continue
+        fields = [_csv_field(field) for field in _split_csv_fields(line)]
+        rows.append("[" + ",".join(fields) + "]" if len(fields) > 1 else fields[0])
+    return ('{"instances":[' + ",".join(rows) + "]}").encode("utf-8")
+
+
+def _plain_numeric_rows(raw):
+    """Return the instance rows of a CSV body of bare numbers, or None.
+
+    Covers bodies made only of numbers, commas, newlines and padding blanks,
+    every row with the same arity (one column or several). Each number is checked against
+    the njs numeric grammar with array operations; the rows are then emitted
+    by two bytes.replace calls, so no field is touched from Python.
+    """
+    if not raw or b'"' in raw:
+        return None
+    if b"\r" in raw:
+        raw = raw.replace(b"\r\n", b"\n")
+    if b" " in raw or b"\t" in raw:
+        # padding around a field is trimmed; whitespace inside one makes it a string
+        if _INNER_BLANK_RE.search(raw):
+            return None
+        raw = raw.translate(None, b" \t")
+    view = memoryview(raw)
+    multi_column = None
+    start = 0
+    while start < len(raw):
+        end = len(raw)
+        if end - start > _VALIDATE_BLOCK_BYTES:
+            end = raw.rfind(b"\n", start, start + _VALIDATE_BLOCK_BYTES) + 1 or end
+        block_multi_column = _numeric_block_columns(view[start:end])
+        if block_multi_column is None:
+            return None
+        if multi_column is None:
+            multi_column = block_multi_column
+        elif multi_column != block_multi_column:
+            return None
+        start = end
+    if multi_column:
+        return b"[" + raw.replace(b"\n", b"],[") + b"]"
+    return raw.replace(b"\n", b",")
+
+
+def _numeric_block_columns(block):
+    """Validate whole lines of bare numbers; return True (all multi-column), False, or None."""
+    byte_class = _BYTE_CLASS[np.frombuffer(block, dtype=np.uint8)]
+    if not byte_class.all():
+        return None
+    separator = byte_class >= _COMMA
+    # the block is whole lines, so it is preceded by a line break; a trailing
+    # newline (block boundary) is followed by the next line
+    before = np.empty_like(byte_class)
+    before[0] = _NEWLINE
+    before[1:] = byte_class[:-1]
+    after = np.empty_like(byte_class)
+    after[-1] = _NEWLINE if byte_class[-1] != _NEWLINE else _DIGIT
+    after[:-1] = byte_class[1:]
+    digit = byte_class == _DIGIT
+    field_start = before >= _COMMA
+    minus = byte_class == _MINUS
+    sign = minus | (byte_class == _PLUS)
+    exponent = byte_class == _EXP
+    dot = byte_class == _DOT
+
+    # -?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)? for every field
+    bad = field_start & ~(digit | minus)
+    bad |= separator & (after >= _COMMA)
+    bad |= (after >= _COMMA) & ~separator & ~digit
+    bad |= sign & ~((minus & field_start) | (before == _EXP))
+    bad |= sign & (after != _DIGIT)
+    bad |= exponent & (
+        (before != _DIGIT) | ~((after == _DIGIT) | (after == _MINUS) | (after == _PLUS))
+    )
+    bad |= dot & ((before != _DIGIT) | (after != _DIGIT))
+    integer_start = field_start & digit
+    integer_start[1:] |= field_start[:-1] & minus[:-1]
+    bad |= integer_start & (np.frombuffer(block, dtype=np.uint8) == ord("0")) & (after == _DIGIT)
+    if bad.any():
+        return None
+
+    # per field at most one '.' then at most one exponent, checked on the
+    # sequence of '.', exponent and separator bytes
+    events = byte_class[(byte_class == _DOT) | (byte_class >= _EXP)]
+    previous, current = events[:-1], events[1:]
+    in_field = (previous < _COMMA) & (current < _COMMA)
+    if (in_field & ~((previous == _DOT) & (current == _EXP))).any():
+        return None
+
+    # rows are multi-column iff they contain a comma; all must agree. The
+    # block starts a line, and a line ends at each newline (or the block end).
+    separators = events[events >= _COMMA]
+    if byte_class[-1] != _NEWLINE:
+        separators = np.append(separators, _NEWLINE)
+    line_ends = separators == _NEWLINE
+    lines = int(line_ends.sum())
+    lines_with_commas = int((line_ends[1:] & (separators[:-1] == _COMMA)).sum())
+    if lines_with_commas == lines:
+        return True
+    if lines_with_commas == 0:
+        return False
+    return None
+
+
+def _csv_field(raw):
+    probe = _js_trim(raw)
+    if probe and _NUMBER_RE.match(probe):
+        return probe
+    return '"' + raw.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _split_csv_fields(line):
+    """Split a CSV line as njs split_csv_fields does: a quote toggles quoting, "" in quotes is a quote."""
+    if '"' not in line:
+        return line.split(",")
+    fields, current = [], []
+    for quoted, plain, comma in _CSV_TOKEN_RE.findall(line):
+        if comma:
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(quoted.replace('""', '"') if quoted else plain)
+    fields.append("".join(current))
+    return fields
+
+
+def json_lines_to_instances(data):
+    """Convert a JSON Lines body to {"instances": ...} exactly as njs json_lines_request does."""
+    lines = _LINE_SPLIT_RE.split(_js_trim(_text(data)))
+    if len(lines) == 1:
+        return ('{"instances":' + _js_trim(lines[0]) + "}").encode("utf-8")
+    rows = [line for line in map(_js_trim, lines) if line]
+    return ('{"instances":[' + ",".join(rows) + "]}").encode("utf-8")
+
+
+def csv_to_ndarray(data, dtype=np.float32):
+    """Parse an all-numeric CSV body into a 2-D ndarray of dtype (one row per line)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return np.loadtxt(io.BytesIO(data), delimiter=",", dtype=dtype, ndmin=2)
+
+
+def ndarray_to_json(array, columnar=False, input_name=None):
+    """Encode an ndarray (or {input name: ndarray}) as a TFS REST request body.
+
+    Row format gives {"instances": array}; columnar=True gives {"inputs": array}.
+    With input_name, or a dict of arrays, the tensors are named.
+    """
+    if input_name is not None:
+        array = {input_name: array}
+    if isinstance(array, dict):
+        if columnar:
+            payload = {"inputs": array}
+        else:
+            arrays = {name: np.asarray(value) for name, value in array.items()}
+            rows = len(next(iter(arrays.values()))) if arrays else 0
+            payload = {
+                "instances": [
+                    {name: value[i] for name, value in arrays.items()} for i in range(rows)
+                ]
+            }
+    else:
+        payload = {"inputs" if columnar else "instances": array}
+    return _dumps(payload)
+
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), default=_to_builtin).encode("utf-8")
+
+
+def _to_builtin(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError("{!r} is not JSON serializable".format(type(value).__name__))
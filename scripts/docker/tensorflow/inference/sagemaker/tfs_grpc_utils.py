@@ -0,0 +1,480 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""gRPC Predict fast path for the python_service default handler.
+
+TFS's REST API parses JSON tensors element by element, which dominates CPU
+time for large numeric payloads. This module turns a JSON / CSV / NPY / NPZ
+request body into a PredictRequest whose tensors are packed as raw
+`tensor_content` bytes and sends it over the worker's existing gRPC channel.
+The response is rendered back as the JSON the REST API returns, or as an
+.npy / .npz body when the caller's Accept header asks for one.
+
+Request parsing mirrors tensorflowServing.js (json_request, json_lines_request,
+csv_request, generic_json_request), so a payload means the same thing on both
+paths. Anything the fast path cannot represent exactly (b64 objects, ragged
+lists, non-numeric CSV, "examples") raises UnsupportedPayloadError and the
+caller falls back to REST.
+
+Messages come from tfs_protos, which needs only protobuf and grpcio. They
+are imported lazily; grpc_available() reports whether they can be, and
+python_service refuses to start a gRPC-only feature when they cannot.
+"""
+
+import io
+import json
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SIGNATURE_NAME = "serving_default"
+
+JSON_CONTENT_TYPES = frozenset({"application/json", "application/jsonlines", "application/jsons"})
+CSV_CONTENT_TYPE = "text/csv"
+NPY_CONTENT_TYPE = "application/x-npy"
+NPZ_CONTENT_TYPE = "application/x-npz"
+BINARY_CONTENT_TYPES = frozenset({NPY_CONTENT_TYPE, NPZ_CONTENT_TYPE})
+
+# (model_name, model_version, signature_name) -> (inputs, outputs), where both
+# are {tensor name: tensorflow DataType enum}. Signatures only change when a new
+# model version is loaded, which changes the key, so entries never go stale.
+_SIGNATURE_CACHE = {}
+# (id(channel), method) -> grpc multicallable, like a generated stub's methods.
+_RPCS = {}
+_GRPC_AVAILABLE = None
+
+
+class UnsupportedPayloadError(ValueError):
+    """The payload cannot be sent over gRPC unchanged; use the REST path."""
+
+
+class UnsupportedAcceptError(ValueError):
+    """The outputs cannot be rendered in the requested Accept type (HTTP 406)."""
+
+
+class _RequestTensors:
+    """Tensors parsed from a request body, plus the REST format they came in."""
+
+    def __init__(self, tensors, row_format, signature_name):
+        # {input name or None: np.ndarray}; None means "the signature's only input".
+        self.tensors = tensors
+        self.row_format = row_format
+        self.signature_name = signature_name or DEFAULT_SIGNATURE_NAME
+
+
+def grpc_available():
+    """True if Predict, GetModelMetadata and config reloads can be sent over gRPC."""
+    global _GRPC_AVAILABLE
+    if _GRPC_AVAILABLE is None:
+        try:
+            _apis()
+            _GRPC_AVAILABLE = True
+        except ImportError as e:
+            log.error("TFS gRPC messages unavailable: %s", e)
+            _GRPC_AVAILABLE = False
+    return _GRPC_AVAILABLE
+
+
+def _media_types(header):
+    return [part.split(";")[0].strip().lower() for part in (header or "").split(",")]
+
+
+def binary_accept_type(accept_header):
+    """Return the first .npy/.npz media type in an Accept header, else None."""
+    for media_type in _media_types(accept_header):
+        if media_type in BINARY_CONTENT_TYPES:
+            return media_type
+    return None
+
+
+def is_binary_tensor_request(content_type, accept_header):
+    """True if the body or the requested response is .npy/.npz.
+
+    Such requests have no REST equivalent short of a JSON round-trip, so they
+    always take the gRPC path.
+    """
+    return _media_types(content_type)[0] in BINARY_CONTENT_TYPES or bool(
+        binary_accept_type(accept_header)
+    )
+
+
+def _apis():
+    import grpc  # noqa: F401
+    import tfs_protos
+
+    return tfs_protos
+
+
+def parse_payload(body, content_type):
+    """Parse a request body into _RequestTensors; raise UnsupportedPayloadError."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type == NPY_CONTENT_TYPE:
+        return _parse_npy(body)
+    if content_type == NPZ_CONTENT_TYPE:
+        return _parse_npz(body)
+    if content_type == CSV_CONTENT_TYPE:
+        return _parse_csv(body)
+    if not content_type or content_type in JSON_CONTENT_TYPES:
+        return _parse_json(body)
+    raise UnsupportedPayloadError("unsupported content type: {}".format(content_type))
+
+
+def _parse_npy(body):
+    # An .npy body is a batch, like {"instances": array}.
+    return _RequestTensors({None: load_npy(body)}, row_format=True, signature_name=None)
+
+
+def load_npy(body):
+    """Decode an .npy body as a zero-copy np.frombuffer view over `body`."""
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    except ValueError as e:
+        raise UnsupportedPayloadError("invalid npy payload: {}".format(e)) from e
+    if dtype.hasobject:
+        raise UnsupportedPayloadError("npy payloads with object dtype are not supported")
+    count = int(np.prod(shape)) if shape else 1
+    try:
+        array = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    except ValueError as e:
+        raise UnsupportedPayloadError("truncated npy payload: {}".format(e)) from e
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+
+def _parse_npz(body):
+    # An .npz body maps input names to batches, like named {"instances": ...}.
+    # Arrays saved positionally (np.savez(f, x)) are called arr_0, arr_1, ...
+    try:
+        with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+            tensors = {name: archive[name] for name in archive.files}
+    except (ValueError, OSError, EOFError) as e:
+        raise UnsupportedPayloadError("invalid npz payload: {}".format(e)) from e
+    if not tensors:
+        raise UnsupportedPayloadError("empty npz payload")
+    if list(tensors) == ["arr_0"]:
+        tensors = {None: tensors["arr_0"]}
+    return _RequestTensors(tensors, row_format=True, signature_name=None)
+
+
+def _parse_csv(body):
+    # csv_request: one instance per line; one column -> scalar, else a list.
+    # np.loadtxt is C-backed; quoted or non-numeric fields raise ValueError and
+    # go to REST, where tensorflowServing.js semantics apply unchanged.
+    try:
+        array = np.loadtxt(io.BytesIO(body), delimiter=",", dtype=np.float64, ndmin=2)
+    except ValueError as e:
+        raise UnsupportedPayloadError("non-numeric csv payload: {}".format(e)) from e
+    if array.shape[1] == 1:
+        array = array.reshape(-1)
+    return _RequestTensors({None: array}, row_format=True, signature_name=None)
+
+
+def _parse_json(body):
+    text = body.decode("utf-8")
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # json_lines_request: one JSON value per line -> instances.
+        try:
+            instances = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except ValueError as e:
+            raise UnsupportedPayloadError("invalid json payload: {}".format(e)) from e
+        return _RequestTensors(_row_tensors(instances), row_format=True, signature_name=None)
+
+    if isinstance(data, dict) and "examples" in data:
+        raise UnsupportedPayloadError("tf.Example payloads are REST only")
+    if isinstance(data, dict) and "instances" in data:
+        return _RequestTensors(
+            _row_tensors(data["instances"]),
+            row_format=True,
+            signature_name=data.get("signature_name"),
+        )
+    if isinstance(data, dict) and "inputs" in data:
+        inputs = data["inputs"]
+        if isinstance(inputs, dict):
+            tensors = {name: _to_array(value) for name, value in inputs.items()}
+        else:
+            tensors = {None: _to_array(inputs)}
+        return _RequestTensors(tensors, row_format=False, signature_name=data.get("signature_name"))
+
+    # generic_json_request: anything not already a list of lists is one instance.
+    if not (isinstance(data, list) and data and isinstance(data[0], list)):
+        data = [data]
+    return _RequestTensors(_row_tensors(data), row_format=True, signature_name=None)
+
+
+def _row_tensors(instances):
+    if not isinstance(instances, list) or not instances:
+        raise UnsupportedPayloadError("instances must be a non-empty list")
+    if isinstance(instances[0], dict):
+        names = instances[0].keys()
+        try:
+            return {name: _to_array([inst[name] for inst in instances]) for name in names}
+        except (KeyError, TypeError) as e:
+            raise UnsupportedPayloadError("inconsistent named instances") from e
+    return {None: _to_array(instances)}
+
+
+def _to_array(value):
+    try:
+        array = np.asarray(value)
+    except ValueError as e:
+        # ragged nesting
+        raise UnsupportedPayloadError(str(e)) from e
+    if array.dtype == object:
+        # b64 objects, mixed types, ...: leave to TFS's REST decoder.
+        raise UnsupportedPayloadError("payload does not form a dense numeric tensor")
+    return array
+
+
+def _numpy_dtypes():
+    protos = _apis()
+    return {
+        protos.DT_HALF: np.float16,
+        protos.DT_FLOAT: np.float32,
+        protos.DT_DOUBLE: np.float64,
+        protos.DT_INT8: np.int8,
+        protos.DT_INT16: np.int16,
+        protos.DT_INT32: np.int32,
+        protos.DT_INT64: np.int64,
+        protos.DT_UINT8: np.uint8,
+        protos.DT_UINT16: np.uint16,
+        protos.DT_UINT32: np.uint32,
+        protos.DT_UINT64: np.uint64,
+        protos.DT_BOOL: np.bool_,
+    }
+
+
+def make_tensor_proto(array, dtype):
+    """Pack an ndarray as a TensorProto of `dtype` using raw tensor_content bytes."""
+    protos = _apis()
+    proto = protos.TensorProto(dtype=dtype)
+    for size in array.shape:
+        proto.tensor_shape.dim.add(size=size)
+    if dtype == protos.DT_STRING:
+        if array.dtype.kind not in ("S", "U"):
+            raise UnsupportedPayloadError("string input given non-string values")
+        proto.string_val.extend(
+            v.encode("utf-8") if isinstance(v, str) else v for v in array.reshape(-1).tolist()
+        )
+        return proto
+    np_dtype = _numpy_dtypes().get(dtype)
+    if np_dtype is None or array.dtype.kind not in ("b", "i", "u", "f"):
+        raise UnsupportedPayloadError("cannot pack {} as DataType {}".format(array.dtype, dtype))
+    if array.dtype.kind == "f" and np.dtype(np_dtype).kind != "f":
+        # Casting would silently truncate; let TFS reject it over REST instead.
+        raise UnsupportedPayloadError("float values for a non-float input")
+    # TFS reads tensor_content as little-endian, C-ordered bytes.
+    proto.tensor_content = np.ascontiguousarray(
+        array, dtype=np.dtype(np_dtype).newbyteorder("<")
+    ).tobytes()
+    return proto
+
+
+def make_ndarray(proto):
+    """Inverse of make_tensor_proto, also accepting the typed *_val fields."""
+    protos = _apis()
+    shape = [dim.size for dim in proto.tensor_shape.dim]
+    if proto.dtype == protos.DT_STRING:
+        values = [v.decode("utf-8", "replace") for v in proto.string_val]
+        return np.array(values, dtype=object).reshape(shape)
+    np_dtype = _numpy_dtypes().get(proto.dtype)
+    if np_dtype is None:
+        raise UnsupportedPayloadError("unsupported output DataType {}".format(proto.dtype))
+    np_dtype = np.dtype(np_dtype).newbyteorder("<")
+    if proto.tensor_content:
+        return np.frombuffer(proto.tensor_content, dtype=np_dtype).reshape(shape)
+
+    if proto.dtype == protos.DT_HALF:
+        values = np.array(proto.half_val, dtype=np.uint16).view(np.float16)
+    else:
+        field = {
+            protos.DT_FLOAT: "float_val",
+            protos.DT_DOUBLE: "double_val",
+            protos.DT_INT64: "int64_val",
+            protos.DT_UINT32: "uint32_val",
+            protos.DT_UINT64: "uint64_val",
+            protos.DT_BOOL: "bool_val",
+        }.get(proto.dtype, "int_val")
+        values = np.array(getattr(proto, field), dtype=np_dtype)
+    size = int(np.prod(shape)) if shape else 1
+    if values.size == 1 and size != 1:
+        # TensorProto convention: a single value fills the whole tensor.
+        values = np.full(size, values[0], dtype=np_dtype)
+    return values.reshape(shape)
+
+
+def _rpc(channel, method):
+    call = _RPCS.get((id(channel), method))
+    if call is None:
+        call = _apis().rpc(channel, method)
+        _RPCS[(id(channel), method)] = call
+    return call
+
+
+def reload_config(channel, config_text, timeout):
+    """Replace a TFS server's model_config_list via ModelService/HandleReloadConfigRequest.
+
+    config_text is a model_config_list in text format (as written to
+    --model_config_file). TFS unloads models missing from it and returns once
+    the new ones are loaded; raise RuntimeError if it reports an error.
+    """
+    from google.protobuf import text_format
+
+    protos = _apis()
+    request = protos.ReloadConfigRequest()
+    text_format.Parse(config_text, request.config)
+    response = _rpc(channel, protos.HANDLE_RELOAD_CONFIG_REQUEST)(request, timeout=timeout)
+    if response.status.error_code:
+        raise RuntimeError(
+            "TFS config reload failed ({}): {}".format(
+                response.status.error_code, response.status.error_message
+            )
+        )
+
+
+def forget_model(model_name):
+    """Drop cached signatures for a model that was unloaded or replaced."""
+    for key in [key for key in _SIGNATURE_CACHE if key[0] == model_name]:
+        del _SIGNATURE_CACHE[key]
+
+
+def get_signature(channel, model_name, model_version, signature_name, timeout):
+    """Return ({input: dtype}, {output: dtype}) for a signature, cached per worker."""
+    key = (model_name, model_version, signature_name)
+    signature = _SIGNATURE_CACHE.get(key)
+    if signature is not None:
+        return signature
+
+    protos = _apis()
+    request = protos.GetModelMetadataRequest()
+    request.model_spec.name = model_name
+    if model_version:
+        request.model_spec.version.value = int(model_version)
+    request.metadata_field.append("signature_def")
+    response = _rpc(channel, protos.GET_MODEL_METADATA)(request, timeout=timeout)
+
+    # metadata["signature_def"] is a google.protobuf.Any wrapping a SignatureDefMap.
+    signature_map = protos.SignatureDefMap.FromString(response.metadata["signature_def"].value)
+    if signature_name not in signature_map.signature_def:
+        raise UnsupportedPayloadError(
+            "signature {} not found for model {}".format(signature_name, model_name)
+        )
+    signature_def = signature_map.signature_def[signature_name]
+    signature = (
+        {name: info.dtype for name, info in signature_def.inputs.items()},
+        {name: info.dtype for name, info in signature_def.outputs.items()},
+    )
+    _SIGNATURE_CACHE[key] = signature
+    return signature
+
+
+def predict(channel, model_name, model_version, request_tensors, timeout):
+    """Send a PredictRequest; return {output name: ndarray}.
+
+    On an RPC error the model's cached signature is dropped: an MME model may
+    have been reloaded under the same name with a different signature.
+    """
+    protos = _apis()
+    signature_name = request_tensors.signature_name
+    inputs, _ = get_signature(channel, model_name, model_version, signature_name, timeout)
+
+    request = protos.PredictRequest()
+    request.model_spec.name = model_name
+    request.model_spec.signature_name = signature_name
+    if model_version:
+        request.model_spec.version.value = int(model_version)
+    for name, array in request_tensors.tensors.items():
+        if name is None:
+            if len(inputs) != 1:
+                raise UnsupportedPayloadError("unnamed input for a multi-input signature")
+            name = next(iter(inputs))
+        if name not in inputs:
+            raise UnsupportedPayloadError("unknown input {}".format(name))
+        request.inputs[name].CopyFrom(make_tensor_proto(array, inputs[name]))
+
+    try:
+        response = _rpc(channel, protos.PREDICT)(request, timeout=timeout)
+    except Exception:
+        forget_model(model_name)
+        raise
+    return {name: make_ndarray(proto) for name, proto in response.outputs.items()}
+
+
+def encode_response(outputs, row_format, accept_header):
+    """Render outputs for the caller; return (body, content_type).
+
+    .npy carries a single output tensor; .npz carries every output by name. JSON
+    keeps the REST layout and, like the REST path, echoes the Accept header.
+    """
+    accept_type = binary_accept_type(accept_header)
+    if accept_type is None:
+        return json.dumps(format_outputs(outputs, row_format)), accept_header
+
+    buf = io.BytesIO()
+    if accept_type == NPY_CONTENT_TYPE:
+        if len(outputs) != 1:
+            raise UnsupportedAcceptError(
+                "model returns {} outputs ({}); request {} instead".format(
+                    len(outputs), ", ".join(sorted(outputs)), NPZ_CONTENT_TYPE
+                )
+            )
+        np.save(buf, next(iter(outputs.values())), allow_pickle=False)
+    else:
+        if any(value.dtype == object for value in outputs.values()):
+            raise UnsupportedAcceptError("string outputs cannot be encoded as npz")
+        np.savez(buf, **outputs)
+    return buf.getvalue(), accept_type
+
+
+def format_outputs(outputs, row_format):
+    """Lay out output tensors the way TFS's REST API does.
+
+    Row format -> {"predictions": [...]}: the bare tensor for one output, else one
+    {output: value} object per batch row. Columnar -> {"outputs": tensor or dict}.
+    Float32 values render via Python floats, so digits can differ from TFS's
+    shortest float32 repr while parsing back to the same numbers.
+    """
+    if row_format:
+        if len(outputs) == 1:
+            return {"predictions": next(iter(outputs.values())).tolist()}
+        names = list(outputs)
+        batch = len(outputs[names[0]])
+        return {
+            "predictions": [
+                {name: outputs[name][i].tolist() for name in names} for i in range(batch)
+            ]
+        }
+    if len(outputs) == 1:
+        return {"outputs": next(iter(outputs.values())).tolist()}
+    return {"outputs": {name: value.tolist() for name, value in outputs.items()}}
+
+
+def rpc_error_status(rpc_error):
+    """Map a grpc.RpcError to the HTTP status TFS's REST API uses for it."""
+    import grpc
+
+    return {
+        grpc.StatusCode.INVALID_ARGUMENT: 400,
+        grpc.StatusCode.FAILED_PRECONDITION: 400,
+        grpc.StatusCode.OUT_OF_RANGE: 400,
+        grpc.StatusCode.NOT_FOUND: 404,
+        grpc.StatusCode.UNIMPLEMENTED: 501,
+        grpc.StatusCode.UNAVAILABLE: 503,
+        grpc.StatusCode.DEADLINE_EXCEEDED: 504,
+    }.get(rpc_error.code(), 500)
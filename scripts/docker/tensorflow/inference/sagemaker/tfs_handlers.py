@@ -0,0 +1,128 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""inference.py handlers: import, and a lazy per-model cache for MME.
+
+A multi-model endpoint can host hundreds of models, each optionally with its
+own code/inference.py and code/lib. HandlerCache imports a model's script the
+first time that model is invoked in a worker, not whenever the registry
+changes, and forgets it when the model is unloaded or reloaded.
+
+Each model gets its own module namespace: its code/lib is on sys.path only
+while its inference.py runs, and the modules imported from under its code
+directory are then taken out of sys.modules and kept with its handlers. Two
+models shipping a utils.py each get their own, and unloading a model drops
+its modules. Imports from code/lib must therefore happen when inference.py is
+imported, not inside handler functions.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+
+log = logging.getLogger(__name__)
+
+MODEL_CODE_DIR = "/opt/ml/models/{}/model/code"
+
+
+def load_module(inference_script, lib_path=None):
+    """Exec inference_script as a new module; return (module, private_modules).
+
+    private_modules holds the modules it imported from its own directory tree
+    (code/ and code/lib/), removed from sys.modules so other models cannot see
+    them.
+    """
+    code_dir = os.path.dirname(os.path.abspath(inference_script)) + os.sep
+    before = set(sys.modules)
+    spec = importlib.util.spec_from_file_location("inference", inference_script)
+    module = importlib.util.module_from_spec(spec)
+    on_path = lib_path is not None and os.path.isdir(lib_path)
+    if on_path:
+        sys.path.insert(0, lib_path)
+        importlib.invalidate_caches()
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        if on_path:
+            sys.path.remove(lib_path)
+        private_modules = {
+            name: sys.modules.pop(name)
+            for name in set(sys.modules) - before
+            if (getattr(sys.modules[name], "__file__", None) or "").startswith(code_dir)
+        }
+    return module, private_modules
+
+
+def handler_functions(module):
+    """Return (handler, input_handler, output_handler) defined by an inference module."""
+    if hasattr(module, "handler"):
+        return module.handler, None, None
+    if hasattr(module, "input_handler") and hasattr(module, "output_handler"):
+        return None, module.input_handler, module.output_handler
+    raise NotImplementedError("Handlers are not implemented correctly in user script.")
+
+
+class _Entry:
+    __slots__ = ("generation", "handlers", "modules")
+
+    def __init__(self, generation, handlers, modules):
+        self.generation = generation
+        self.handlers = handlers
+        self.modules = modules
+
+
+class HandlerCache:
+    """Per-model handlers, imported on first use for each model generation.
+
+    make_handler turns (handler, input_handler, output_handler) into the
+    callable invocations use. get() returns None for a model without its own
+    inference.py.
+    """
+
+    def __init__(self, make_handler, code_dir=MODEL_CODE_DIR):
+        self._make_handler = make_handler
+        self._code_dir = code_dir
+        self._entries = {}
+
+    def __contains__(self, model_name):
+        return model_name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, model_name, generation):
+        entry = self._entries.get(model_name)
+        if entry is None or entry.generation != generation:
+            entry = self._entries[model_name] = self._import(model_name, generation)
+        return entry.handlers
+
+    def evict(self, model_name):
+        if self._entries.pop(model_name, None) is not None:
+            log.info("dropped handlers of model %s", model_name)
+
+    def retain(self, generations):
+        """Evict every model whose generation is not the one in {model_name: generation}."""
+        for model_name, entry in list(self._entries.items()):
+            if generations.get(model_name) != entry.generation:
+                self.evict(model_name)
+
+    def _import(self, model_name, generation):
+        code_dir = self._code_dir.format(model_name)
+        inference_script = os.path.join(code_dir, "inference.py")
+        if not os.path.exists(inference_script):
+            log.info("model %s has no inference script; using the endpoint's handlers", model_name)
+            return _Entry(generation, None, {})
+        log.info("importing handlers of model %s from %s", model_name, inference_script)
+        module, modules = load_module(inference_script, os.path.join(code_dir, "lib"))
+        return _Entry(generation, self._make_handler(*handler_functions(module)), modules)
@@ -0,0 +1,273 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Prometheus metrics for serve.py, the gunicorn workers and MME lock waits.
+
+Counters and histograms are recorded in memory by the process that observes
+them (serve.py for restarts and for invocations nginx sends straight to TFS,
+each gunicorn worker for its requests, loads and lock waits). A background
+thread writes each process's values to its own JSON file under METRICS_DIR at
+most once per FLUSH_INTERVAL_SECONDS. GET /metrics, served by whichever
+gunicorn worker nginx picks, sums every file - files of exited workers
+included, so counters never go backwards - adds gauges read at scrape time
+(TFS in-flight requests, MME registry and port pool) and renders the
+Prometheus text exposition format. No client library is needed.
+
+Recording is a no-op unless SAGEMAKER_TFS_METRICS is true.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("SAGEMAKER_TFS_METRICS", "false").lower() == "true"
+METRICS_DIR = "/sagemaker/metrics"
+FLUSH_INTERVAL_SECONDS = 1.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LOAD_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help, buckets); the recorded counters and histograms
+FAMILIES = {
+    "sagemaker_tfs_requests_total": (
+        "counter",
+        "Invocations, by model and HTTP status code.",
+        None,
+    ),
+    "sagemaker_tfs_request_duration_seconds": (
+        "histogram",
+        "Invocation latency (handlers plus TFS, or nginx plus TFS on the njs route), by model.",
+        LATENCY_BUCKETS,
+    ),
+    "sagemaker_tfs_request_queue_seconds": (
+        "histogram",
+        "Time from nginx forwarding an invocation to a gunicorn worker starting it.",
+        LATENCY_BUCKETS,
+    ),
+    "sagemaker_tfs_instance_request_duration_seconds": (
+        "histogram",
+        "Invocation latency by TFS instance (REST port).",
+        LATENCY_BUCKETS,
+    ),
+    "sagemaker_tfs_mme_lock_wait_seconds": (
+        "histogram",
+        "Time spent waiting for the MME model-management lock.",
+        LATENCY_BUCKETS,
+    ),
+    "sagemaker_tfs_mme_load_duration_seconds": (
+        "histogram",
+        "MME model load duration, by result.",
+        LOAD_BUCKETS,
+    ),
+    "sagemaker_tfs_mme_unload_duration_seconds": (
+        "histogram",
+        "MME model unload duration, by reason (request, eviction, dead).",
+        LOAD_BUCKETS,
+    ),
+    "sagemaker_tfs_process_restarts_total": (
+        "counter",
+        "Unexpected exits of nginx, gunicorn and TFS restarted by serve.py.",
+        None,
+    ),
+}
+
+
+class _Recorder:
+    """This process's counters and histograms, flushed to its own file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._values = {}
+        self._dirty = False
+
+    def _own(self):
+        # values inherited across fork belong to the parent and are in its file
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._path = os.path.join(METRICS_DIR, "{}-{}.json".format(pid, time.time_ns()))
+            self._values = {}
+            self._dirty = False
+            threading.Thread(target=self._flush_loop, args=(pid,), daemon=True).start()
+
+    def inc(self, name, value, labels):
+        with self._lock:
+            self._own()
+            key = (name, _label_key(labels))
+            self._values[key] = self._values.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, value, labels):
+        buckets = FAMILIES[name][2]
+        with self._lock:
+            self._own()
+            key = (name, _label_key(labels))
+            histogram = self._values.get(key)
+            if histogram is None:
+                # per-bucket (not cumulative) counts, +Inf last, then the sum
+                histogram = self._values[key] = [0] * (len(buckets) + 2)
+            histogram[_bucket_index(buckets, value)] += 1
+            histogram[-1] += value
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if self._pid != os.getpid() or not self._dirty:
+                return
+            samples = [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+            self._dirty = False
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            tmp = "{}.tmp".format(self._path)
+            with open(tmp, "w", encoding="utf8") as f:
+                json.dump(samples, f)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            log.warning("failed to write metrics file %s: %s", self._path, e)
+
+    def _flush_loop(self, pid):
+        while os.getpid() == pid:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self.flush()
+
+
+_RECORDER = _Recorder()
+
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        _RECORDER.inc(name, value, labels)
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        _RECORDER.observe(name, value, labels)
+
+
+def reset():
+    """Remove the metrics files of a previous run; called by serve.py on start."""
+    if not os.path.isdir(METRICS_DIR):
+        return
+    for filename in os.listdir(METRICS_DIR):
+        try:
+            os.remove(os.path.join(METRICS_DIR, filename))
+        except OSError as e:
+            log.warning("failed to remove metrics file %s: %s", filename, e)
+
+
+def collect():
+    """Sum the files of every process; return {(name, labels): value}."""
+    _RECORDER.flush()
+    totals = {}
+    filenames = os.listdir(METRICS_DIR) if os.path.isdir(METRICS_DIR) else []
+    for filename in filenames:
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename), "r", encoding="utf8") as f:
+                samples = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("skipping metrics file %s: %s", filename, e)
+            continue
+        for name, labels, value in samples:
+            if name not in FAMILIES:
+                continue
+            key = (name, tuple(tuple(label) for label in labels))
+            total = totals.get(key)
+            if total is None:
+                totals[key] = value
+            elif isinstance(value, list):
+                totals[key] = [a + b for a, b in zip(total, value)]
+            else:
+                totals[key] = total + value
+    return totals
+
+
+def render(gauges=()):
+    """Render the recorded metrics plus gauges in the Prometheus text format.
+
+    gauges is a sequence of (name, type, help, [(labels, value), ...]) read by
+    the caller at scrape time.
+    """
+    by_family = {}
+    for (name, labels), value in collect().items():
+        by_family.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (metric_type, help_text, buckets) in FAMILIES.items():
+        samples = by_family.get(name)
+        if not samples:
+            continue
+        lines.append("# HELP {} {}".format(name, help_text))
+        lines.append("# TYPE {} {}".format(name, metric_type))
+        for labels, value in sorted(samples):
+            if metric_type != "histogram":
+                lines.append(_sample(name, labels, value))
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (math.inf,), value[:-1]):
+                cumulative += count
+                lines.append(_sample(name + "_bucket", labels + (("le", bound),), cumulative))
+            lines.append(_sample(name + "_sum", labels, value[-1]))
+            lines.append(_sample(name + "_count", labels, cumulative))
+    for name, metric_type, help_text, samples in gauges:
+        lines.append("# HELP {} {}".format(name, help_text))
+        lines.append("# TYPE {} {}".format(name, metric_type))
+        for labels, value in samples:
+            lines.append(_sample(name, _label_key(labels), value))
+    return "\n".join(lines) + "\n"
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _bucket_index(buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += "{{{}}}".format(
+            ",".join('{}="{}"'.format(key, _escape(val)) for key, val in labels)
+        )
+    return "{} {}".format(name, _format_value(value))
+
+
+def _escape(value):
+    if isinstance(value, float):
+        return _format_value(value)
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
@@ -0,0 +1,172 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Request-level micro-batching of input_handler outputs within one worker.
+
+Every invocation is a greenlet that runs input_handler, posts its own body to
+TFS and runs output_handler, so concurrent small requests reach TFS one by
+one and its server-side batching has little to batch. MicroBatcher.post()
+holds row-format predict bodies ({"instances": [...]}, optionally with a
+signature_name) bound for the same TFS URI for up to max_wait seconds or
+max_batch_size rows, sends them as one request, and hands each waiting
+greenlet a requests.Response holding just its slice of "predictions", so
+output_handler sees what it would have seen without batching.
+
+Anything else (columnar "inputs", classify/regress, non-JSON bodies) is posted
+on its own. If a combined request fails, or its predictions do not line up
+with the rows sent, every member is re-sent alone, so one bad request cannot
+fail its neighbours and errors reach the client unchanged.
+"""
+
+import json
+import logging
+
+import gevent
+import requests
+import tfs_utils
+from gevent.event import AsyncResult
+
+log = logging.getLogger(__name__)
+
+_BATCHABLE_KEYS = frozenset({"instances", "signature_name"})
+
+
+class _Batch:
+    def __init__(self, key):
+        self.key = key
+        self.bodies = []
+        self.waiters = []
+        self.rows = 0
+        self.timeout = 0
+        self.timer = None
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size, max_wait_seconds):
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._pending = {}
+
+    def post(self, rest_uri, data, timeout):
+        """POST data to rest_uri, possibly combined with concurrent requests.
+
+        Returns a requests.Response.
+        """
+        body = _batchable_body(rest_uri, data)
+        if body is None or len(body["instances"]) >= self._max_batch_size:
+            return _post(rest_uri, data, timeout)
+
+        key = (rest_uri, body.get("signature_name"))
+        batch = self._pending.get(key)
+        if batch is not None and batch.rows + len(body["instances"]) > self._max_batch_size:
+            self._close(batch)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _Batch(key)
+            batch.timer = gevent.spawn_later(self._max_wait_seconds, self._close, batch)
+
+        waiter = AsyncResult()
+        batch.bodies.append(body)
+        batch.waiters.append(waiter)
+        batch.rows += len(body["instances"])
+        batch.timeout = max(batch.timeout, timeout)
+        if batch.rows >= self._max_batch_size:
+            self._close(batch)
+
+        response = waiter.get()
+        # None: the combined request could not be split; send this one alone
+        return response if response is not None else _post(rest_uri, data, timeout)
+
+    def _close(self, batch):
+        """Stop adding to batch and send it from its own greenlet."""
+        if self._pending.get(batch.key) is not batch:
+            return  # already closed (full before its timer fired)
+        del self._pending[batch.key]
+        if gevent.getcurrent() is not batch.timer:
+            batch.timer.kill(block=False)
+        gevent.spawn(self._send, batch)
+
+    def _send(self, batch):
+        if len(batch.waiters) == 1:
+            batch.waiters[0].set(None)
+            return
+
+        rest_uri, signature_name = batch.key
+        combined = {"instances": [row for body in batch.bodies for row in body["instances"]]}
+        if signature_name is not None:
+            combined["signature_name"] = signature_name
+        try:
+            response = _post(rest_uri, json.dumps(combined), batch.timeout)
+            predictions = _predictions(response, batch.rows)
+        except Exception as e:  # pylint: disable=broad-except
+            # every waiter must be woken, whatever went wrong
+            log.warning(
+                "micro-batch of %s rows failed (%s); sending each request alone", batch.rows, e
+            )
+            predictions = None
+        if predictions is None:
+            for waiter in batch.waiters:
+                waiter.set(None)
+            return
+
+        log.debug("sent micro-batch of %s requests (%s rows)", len(batch.waiters), batch.rows)
+        start = 0
+        for body, waiter in zip(batch.bodies, batch.waiters):
+            end = start + len(body["instances"])
+            waiter.set(_slice_response(response, predictions[start:end]))
+            start = end
+
+
+def _post(rest_uri, data, timeout):
+    return tfs_utils.get_tfs_session().post(rest_uri, data=data, timeout=timeout)
+
+
+def _batchable_body(rest_uri, data):
+    """Return the parsed body if it is a row-format predict request, else None."""
+    if not rest_uri.endswith(":predict") or not isinstance(data, (str, bytes, bytearray)):
+        return None
+    try:
+        body = json.loads(data)
+    except ValueError:
+        return None
+    if (
+        not isinstance(body, dict)
+        or not isinstance(body.get("instances"), list)
+        or not body["instances"]
+        or not _BATCHABLE_KEYS.issuperset(body)
+    ):
+        return None
+    return body
+
+
+def _predictions(response, rows):
+    if response.status_code != 200:
+        return None
+    try:
+        predictions = response.json().get("predictions")
+    except ValueError:
+        return None
+    if not isinstance(predictions, list) or len(predictions) != rows:
+        return None
+    return predictions
+
+
+def _slice_response(response, predictions):
+    sliced = requests.Response()
+    sliced.status_code = response.status_code
+    sliced.headers = requests.structures.CaseInsensitiveDict(response.headers)
+    sliced.encoding = response.encoding
+    sliced.url = response.url
+    sliced.request = response.request
+    sliced._content = json.dumps({"predictions": predictions}).encode("utf-8")
+    sliced.headers["Content-Length"] = str(len(sliced._content))
+    return sliced
@@ -0,0 +1,395 @@
+# Copyright 2026 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""The TFS gRPC messages python_service uses, built on protobuf alone.
+
+The generated tensorflow_serving.apis modules import tensorflow.core protos,
+and the image ships neither tensorflow nor the tensorflow-serving-api wheel.
+The handful of messages python_service sends and receives are declared here
+instead, with TFS's full names and field numbers, in a private descriptor
+pool: the wire format is identical, so TFS cannot tell the difference.
+
+Only the fields python_service reads or writes are declared. Unknown fields in
+TFS's responses are kept by protobuf and ignored.
+
+RPCs are made with grpc's generic unary_unary calls (see rpc()) rather than
+generated stubs, so grpcio is the only other dependency.
+"""
+
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory, wrappers_pb2
+
+_F = descriptor_pb2.FieldDescriptorProto
+
+# tensorflow/core/framework/types.proto, values python_service maps to numpy.
+DT_INVALID = 0
+DT_FLOAT = 1
+DT_DOUBLE = 2
+DT_INT32 = 3
+DT_UINT8 = 4
+DT_INT16 = 5
+DT_INT8 = 6
+DT_STRING = 7
+DT_INT64 = 9
+DT_BOOL = 10
+DT_UINT16 = 17
+DT_HALF = 19
+DT_UINT32 = 22
+DT_UINT64 = 23
+
+_DATA_TYPES = [
+    ("DT_INVALID", DT_INVALID),
+    ("DT_FLOAT", DT_FLOAT),
+    ("DT_DOUBLE", DT_DOUBLE),
+    ("DT_INT32", DT_INT32),
+    ("DT_UINT8", DT_UINT8),
+    ("DT_INT16", DT_INT16),
+    ("DT_INT8", DT_INT8),
+    ("DT_STRING", DT_STRING),
+    ("DT_INT64", DT_INT64),
+    ("DT_BOOL", DT_BOOL),
+    ("DT_UINT16", DT_UINT16),
+    ("DT_HALF", DT_HALF),
+    ("DT_UINT32", DT_UINT32),
+    ("DT_UINT64", DT_UINT64),
+]
+
+PREDICT = "/tensorflow.serving.PredictionService/Predict"
+GET_MODEL_METADATA = "/tensorflow.serving.PredictionService/GetModelMetadata"
+HANDLE_RELOAD_CONFIG_REQUEST = "/tensorflow.serving.ModelService/HandleReloadConfigRequest"
+
+
+def _field(name, number, field_type, type_name=None, repeated=False, oneof_index=None):
+    field = _F(
+        name=name,
+        number=number,
+        type=field_type,
+        label=_F.LABEL_REPEATED if repeated else _F.LABEL_OPTIONAL,
+    )
+    if type_name:
+        field.type_name = type_name
+    if oneof_index is not None:
+        field.oneof_index = oneof_index
+    return field
+
+
+def _message(name, fields=(), nested=(), oneofs=()):
+    message = descriptor_pb2.DescriptorProto(name=name)
+    message.field.extend(fields)
+    message.nested_type.extend(nested)
+    for oneof in oneofs:
+        message.oneof_decl.add(name=oneof)
+    return message
+
+
+def _map(owner, name, number, value_type, value_type_name=None):
+    """Return (entry message, field) for `map<string, value> name = number` in `owner`."""
+    entry_name = "".join(part.capitalize() for part in name.split("_")) + "Entry"
+    entry = _message(
+        entry_name,
+        [_field("key", 1, _F.TYPE_STRING), _field("value", 2, value_type, value_type_name)],
+    )
+    entry.options.map_entry = True
+    return entry, _field(name, number, _F.TYPE_MESSAGE, owner + "." + entry_name, True)
+
+
+def _tensorflow_file():
+    # tensorflow/core/framework/{types,tensor_shape,tensor}.proto and
+    # tensorflow/core/protobuf/meta_graph.proto (TensorInfo, SignatureDef).
+    data_type = descriptor_pb2.EnumDescriptorProto(name="DataType")
+    for name, number in _DATA_TYPES:
+        data_type.value.add(name=name, number=number)
+
+    tensor_shape = _message(
+        "TensorShapeProto",
+        [
+            _field("dim", 2, _F.TYPE_MESSAGE, ".tensorflow.TensorShapeProto.Dim", True),
+            _field("unknown_rank", 3, _F.TYPE_BOOL),
+        ],
+        nested=[
+            _message("Dim", [_field("size", 1, _F.TYPE_INT64), _field("name", 2, _F.TYPE_STRING)])
+        ],
+    )
+    tensor = _message(
+        "TensorProto",
+        [
+            _field("dtype", 1, _F.TYPE_ENUM, ".tensorflow.DataType"),
+            _field("tensor_shape", 2, _F.TYPE_MESSAGE, ".tensorflow.TensorShapeProto"),
+            _field("version_number", 3, _F.TYPE_INT32),
+            _field("tensor_content", 4, _F.TYPE_BYTES),
+            _field("float_val", 5, _F.TYPE_FLOAT, repeated=True),
+            _field("double_val", 6, _F.TYPE_DOUBLE, repeated=True),
+            _field("int_val", 7, _F.TYPE_INT32, repeated=True),
+            _field("string_val", 8, _F.TYPE_BYTES, repeated=True),
+            _field("int64_val", 10, _F.TYPE_INT64, repeated=True),
+            _field("bool_val", 11, _F.TYPE_BOOL, repeated=True),
+            _field("half_val", 13, _F.TYPE_INT32, repeated=True),
+            _field("uint32_val", 16, _F.TYPE_UINT32, repeated=True),
+            _field("uint64_val", 17, _F.TYPE_UINT64, repeated=True),
+        ],
+    )
+    tensor_info = _message(
+        "TensorInfo",
+        [
+            _field("name", 1, _F.TYPE_STRING, oneof_index=0),
+            _field("dtype", 2, _F.TYPE_ENUM, ".tensorflow.DataType"),
+            _field("tensor_shape", 3, _F.TYPE_MESSAGE, ".tensorflow.TensorShapeProto"),
+        ],
+        oneofs=["encoding"],
+    )
+    inputs_entry, inputs = _map(
+        ".tensorflow.SignatureDef", "inputs", 1, _F.TYPE_MESSAGE, ".tensorflow.TensorInfo"
+    )
+    outputs_entry, outputs = _map(
+        ".tensorflow.SignatureDef", "outputs", 2, _F.TYPE_MESSAGE, ".tensorflow.TensorInfo"
+    )
+    signature_def = _message(
+        "SignatureDef",
+        [inputs, outputs, _field("method_name", 3, _F.TYPE_STRING)],
+        nested=[inputs_entry, outputs_entry],
+    )
+
+    proto = descriptor_pb2.FileDescriptorProto(
+        name="sagemaker/tfs_protos/tensorflow.proto", package="tensorflow", syntax="proto3"
+    )
+    proto.enum_type.append(data_type)
+    proto.message_type.extend([tensor_shape, tensor, tensor_info, signature_def])
+    return proto
+
+
+def _serving_file():
+    # tensorflow_serving/apis/{model,predict,get_model_metadata,model_management,status}.proto,
+    # tensorflow_serving/config/model_server_config.proto,
+    # tensorflow_serving/sources/storage_path/file_system_storage_path_source.proto.
+    model_spec = _message(
+        "ModelSpec",
+        [
+            _field("name", 1, _F.TYPE_STRING),
+            _field("version", 2, _F.TYPE_MESSAGE, ".google.protobuf.Int64Value", oneof_index=0),
+            _field("signature_name", 3, _F.TYPE_STRING),
+            _field("version_label", 4, _F.TYPE_STRING, oneof_index=0),
+        ],
+        oneofs=["version_choice"],
+    )
+
+    request_inputs_entry, request_inputs = _map(
+        ".tensorflow.serving.PredictRequest",
+        "inputs",
+        2,
+        _F.TYPE_MESSAGE,
+        ".tensorflow.TensorProto",
+    )
+    predict_request = _message(
+        "PredictRequest",
+        [
+            _field("model_spec", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelSpec"),
+            request_inputs,
+            _field("output_filter", 3, _F.TYPE_STRING, repeated=True),
+        ],
+        nested=[request_inputs_entry],
+    )
+    response_outputs_entry, response_outputs = _map(
+        ".tensorflow.serving.PredictResponse",
+        "outputs",
+        1,
+        _F.TYPE_MESSAGE,
+        ".tensorflow.TensorProto",
+    )
+    predict_response = _message(
+        "PredictResponse",
+        [
+            response_outputs,
+            _field("model_spec", 2, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelSpec"),
+        ],
+        nested=[response_outputs_entry],
+    )
+
+    signature_def_entry, signature_def = _map(
+        ".tensorflow.serving.SignatureDefMap",
+        "signature_def",
+        1,
+        _F.TYPE_MESSAGE,
+        ".tensorflow.SignatureDef",
+    )
+    signature_def_map = _message("SignatureDefMap", [signature_def], nested=[signature_def_entry])
+    metadata_request = _message(
+        "GetModelMetadataRequest",
+        [
+            _field("model_spec", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelSpec"),
+            _field("metadata_field", 2, _F.TYPE_STRING, repeated=True),
+        ],
+    )
+    # metadata values are google.protobuf.Any; declaring them as bytes-bearing
+    # messages of our own keeps unpacking independent of Any's well-known-type
+    # helpers, which not every protobuf backend attaches to private pools.
+    metadata_entry, metadata = _map(
+        ".tensorflow.serving.GetModelMetadataResponse",
+        "metadata",
+        2,
+        _F.TYPE_MESSAGE,
+        ".tensorflow.serving.GetModelMetadataResponse.Any",
+    )
+    metadata_response = _message(
+        "GetModelMetadataResponse",
+        [_field("model_spec", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelSpec"), metadata],
+        nested=[
+            metadata_entry,
+            _message(
+                "Any", [_field("type_url", 1, _F.TYPE_STRING), _field("value", 2, _F.TYPE_BYTES)]
+            ),
+        ],
+    )
+
+    policy = ".tensorflow.serving.FileSystemStoragePathSourceConfig.ServableVersionPolicy"
+    version_policy = _message(
+        "ServableVersionPolicy",
+        [
+            _field("latest", 100, _F.TYPE_MESSAGE, policy + ".Latest", oneof_index=0),
+            _field("all", 101, _F.TYPE_MESSAGE, policy + ".All", oneof_index=0),
+            _field("specific", 102, _F.TYPE_MESSAGE, policy + ".Specific", oneof_index=0),
+        ],
+        nested=[
+            _message("Latest", [_field("num_versions", 1, _F.TYPE_UINT32)]),
+            _message("All"),
+            _message("Specific", [_field("versions", 1, _F.TYPE_INT64, repeated=True)]),
+        ],
+        oneofs=["policy_choice"],
+    )
+    storage_path_source_config = _message(
+        "FileSystemStoragePathSourceConfig", nested=[version_policy]
+    )
+    version_labels_entry, version_labels = _map(
+        ".tensorflow.serving.ModelConfig", "version_labels", 8, _F.TYPE_INT64
+    )
+    model_config = _message(
+        "ModelConfig",
+        [
+            _field("name", 1, _F.TYPE_STRING),
+            _field("base_path", 2, _F.TYPE_STRING),
+            _field("model_platform", 4, _F.TYPE_STRING),
+            _field("model_version_policy", 7, _F.TYPE_MESSAGE, policy),
+            version_labels,
+        ],
+        nested=[version_labels_entry],
+    )
+    model_config_list = _message(
+        "ModelConfigList",
+        [_field("config", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelConfig", True)],
+    )
+    model_server_config = _message(
+        "ModelServerConfig",
+        [
+            _field(
+                "model_config_list",
+                1,
+                _F.TYPE_MESSAGE,
+                ".tensorflow.serving.ModelConfigList",
+                oneof_index=0,
+            )
+        ],
+        oneofs=["config"],
+    )
+    status = _message(
+        # error_code is a tensorflow.error.Code enum; int32 has the same encoding.
+        "StatusProto",
+        [_field("error_code", 1, _F.TYPE_INT32), _field("error_message", 2, _F.TYPE_STRING)],
+    )
+    reload_config_request = _message(
+        "ReloadConfigRequest",
+        [
+            _field("config", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.ModelServerConfig"),
+            _field("metric_names", 2, _F.TYPE_STRING, repeated=True),
+        ],
+    )
+    reload_config_response = _message(
+        "ReloadConfigResponse",
+        [_field("status", 1, _F.TYPE_MESSAGE, ".tensorflow.serving.StatusProto")],
+    )
+
+    proto = descriptor_pb2.FileDescriptorProto(
+        name="sagemaker/tfs_protos/tensorflow_serving.proto",
+        package="tensorflow.serving",
+        syntax="proto3",
+        dependency=[wrappers_pb2.DESCRIPTOR.name, "sagemaker/tfs_protos/tensorflow.proto"],
+    )
+    proto.message_type.extend(
+        [
+            model_spec,
+            predict_request,
+            predict_response,
+            signature_def_map,
+            metadata_request,
+            metadata_response,
+            storage_path_source_config,
+            model_config,
+            model_config_list,
+            model_server_config,
+            status,
+            reload_config_request,
+            reload_config_response,
+        ]
+    )
+    return proto
+
+
+def _message_classes():
+    pool = descriptor_pool.DescriptorPool()
+    wrappers = descriptor_pb2.FileDescriptorProto()
+    wrappers_pb2.DESCRIPTOR.CopyToProto(wrappers)
+    for proto in (wrappers, _tensorflow_file(), _serving_file()):
+        pool.Add(proto)
+
+    get_message_class = getattr(message_factory, "GetMessageClass", None)
+    if get_message_class is None:
+        # protobuf < 4.22
+        get_message_class = message_factory.MessageFactory(pool).GetPrototype
+    return {
+        name: get_message_class(pool.FindMessageTypeByName(name))
+        for name in (
+            "tensorflow.TensorProto",
+            "tensorflow.serving.PredictRequest",
+            "tensorflow.serving.PredictResponse",
+            "tensorflow.serving.GetModelMetadataRequest",
+            "tensorflow.serving.GetModelMetadataResponse",
+            "tensorflow.serving.SignatureDefMap",
+            "tensorflow.serving.ReloadConfigRequest",
+            "tensorflow.serving.ReloadConfigResponse",
+        )
+    }
+
+
+_CLASSES = _message_classes()
+TensorProto = _CLASSES["tensorflow.TensorProto"]
+PredictRequest = _CLASSES["tensorflow.serving.PredictRequest"]
+PredictResponse = _CLASSES["tensorflow.serving.PredictResponse"]
+GetModelMetadataRequest = _CLASSES["tensorflow.serving.GetModelMetadataRequest"]
+GetModelMetadataResponse = _CLASSES["tensorflow.serving.GetModelMetadataResponse"]
+SignatureDefMap = _CLASSES["tensorflow.serving.SignatureDefMap"]
+ReloadConfigRequest = _CLASSES["tensorflow.serving.ReloadConfigRequest"]
+ReloadConfigResponse = _CLASSES["tensorflow.serving.ReloadConfigResponse"]
+
+_RESPONSES = {
+    PREDICT: PredictResponse,
+    GET_MODEL_METADATA: GetModelMetadataResponse,
+    HANDLE_RELOAD_CONFIG_REQUEST: ReloadConfigResponse,
+}
+
+
+def rpc(channel, method):
+    """Return a callable for one of the RPCs above on a grpc.Channel.
+
+    Called as rpc(channel, PREDICT)(request, timeout=...), like a stub method.
+    """
+    return channel.unary_unary(
+        method,
+        request_serializer=lambda request: request.SerializeToString(),
+        response_deserializer=_RESPONSES[method].FromString,
+    )
@@ -20,9 +20,8 @@ import time
 from collections import namedtuple
 
 import requests
+import tfs_convert
 from multi_model_utils import MultiModelException
-from urllib3.exceptions import MaxRetryError, NewConnectionError
-from urllib3.util.retry import Retry
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
@@ -37,12 +36,47 @@ CUSTOM_ATTRIBUTES_HEADER = "X-Amzn-SageMaker-Custom-Attributes"
 _TFS_MODEL_NAME_RE = re.compile(r"\A[A-Za-z0-9][A-Za-z0-9._-]{0,254}\Z")
 _TFS_MODEL_VERSION_RE = re.compile(r"^\d+$")
 _TFS_ALLOWED_METHODS = frozenset({"predict", "classify", "regress"})
+_BATCHING_LINE_RE = re.compile(r"\A(\w+)\s*\{\s*value:\s*([^\s}]+)\s*\}\Z")
+
+# Keep-alive connection pooling for python_service -> TFS REST calls. One
+# requests.Session per gunicorn worker; its HTTPAdapter keeps a separate urllib3
+# pool per host:port, so each TFS REST port gets its own set of warm sockets
+# instead of a fresh TCP connect (and a TIME_WAIT socket) per invocation.
+TFS_HTTP_POOL_SIZE = int(os.environ.get("SAGEMAKER_TFS_HTTP_POOL_SIZE", "16"))
+TFS_HTTP_KEEPALIVE = os.environ.get("SAGEMAKER_TFS_HTTP_KEEPALIVE", "true").lower() == "true"
+# Upper bound on distinct per-port pools cached by the adapter. MME endpoints use
+# one port per loaded model instance; least recently used pools beyond this are
+# closed.
+_TFS_HTTP_MAX_POOLS = 256
+# The default handler forwards invocation bodies to TFS REST in chunks of this
+# many bytes instead of reading them into memory, so a large Batch Transform
+# shard costs one chunk per in-flight request rather than several payload copies.
+TFS_REQUEST_CHUNK_SIZE = int(os.environ.get("SAGEMAKER_TFS_REQUEST_CHUNK_SIZE", str(64 * 1024)))
+
+# wait_for_model poll interval bounds (seconds)
+_READY_POLL_MIN_SECONDS = 0.005
+_READY_POLL_MAX_SECONDS = 0.1
+
+_TFS_SESSION = None
+_TFS_SESSION_PID = None
+
+
+class Context(
+    namedtuple(
+        "Context",
+        "model_name, model_version, method, rest_uri, grpc_port, channel, "
+        "custom_attributes, request_content_type, accept_header, content_length, timeout",
+    )
+):
+    __slots__ = ()
 
-Context = namedtuple(
-    "Context",
-    "model_name, model_version, method, rest_uri, grpc_port, channel, "
-    "custom_attributes, request_content_type, accept_header, content_length, timeout",
-)
+    def to_tfs_json(self, data):
+        """Convert a CSV/JSON Lines body to the TFS REST JSON nginx would send.
+
+        nginx only converts requests it sends straight to TFS, so custom
+        input_handlers call this instead (see tfs_convert).
+        """
+        return tfs_convert.to_tfs_json(data, self.request_content_type)
 
 
 def parse_request(
@@ -72,6 +106,63 @@ def parse_request(
     return data, context
 
 
+class RequestBodyStream:
+    """Iterable view of an invocation body that requests can stream upstream.
+
+    Yields at most chunk_size bytes at a time from `stream` and stops after
+    content_length bytes. requests sends a body with a known length (exposed as
+    `len`) with a Content-Length header and any other as chunked transfer
+    encoding. There is deliberately no read(): http.client and urllib3 would
+    then use their own block size rather than chunk_size.
+    """
+
+    def __init__(self, stream, content_length=None, chunk_size=None):
+        self._stream = stream
+        self.len = content_length or 0
+        self._remaining = content_length
+        self._chunk_size = chunk_size or TFS_REQUEST_CHUNK_SIZE
+
+    def __iter__(self):
+        while self._remaining is None or self._remaining > 0:
+            size = self._chunk_size
+            if self._remaining is not None:
+                size = min(size, self._remaining)
+            chunk = self._stream.read(size)
+            if not chunk:
+                return
+            if self._remaining is not None:
+                self._remaining -= len(chunk)
+            yield chunk
+
+
+def get_tfs_session():
+    """Return this worker's pooled requests.Session for TFS REST calls.
+
+    Built lazily and keyed on pid: python_service builds its app before gunicorn
+    forks, and a session created in the master must never hand its sockets to a
+    worker. Greenlets in one worker share the session; urllib3 pools are
+    thread-safe (and gevent-patched).
+    """
+    global _TFS_SESSION, _TFS_SESSION_PID
+    pid = os.getpid()
+    if _TFS_SESSION is None or _TFS_SESSION_PID != pid:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=_TFS_HTTP_MAX_POOLS, pool_maxsize=TFS_HTTP_POOL_SIZE
+        )
+        session.mount("http://", adapter)
+        if not TFS_HTTP_KEEPALIVE:
+            session.headers["Connection"] = "close"
+        log.info(
+            "created TFS http session (pid: %s, pool size: %s, keep-alive: %s)",
+            pid,
+            TFS_HTTP_POOL_SIZE,
+            TFS_HTTP_KEEPALIVE,
+        )
+        _TFS_SESSION, _TFS_SESSION_PID = session, pid
+    return _TFS_SESSION
+
+
 def make_tfs_uri(port, attributes, default_model_name, model_name=None):
     log.info("sagemaker tfs attributes: \n{}".format(attributes))
 
@@ -113,24 +204,77 @@ def parse_tfs_custom_attributes(req):
 
 
 def create_tfs_config_individual_model(model_name, base_path):
+    return create_tfs_config_models({model_name: base_path})
+
+
+def create_tfs_config_models(base_paths):
+    """Build a model_config_list for {model_name: base_path}; may be empty."""
     config = "model_config_list: {\n"
-    config += "  config: {\n"
-    config += "    name: '{}'\n".format(model_name)
-    config += "    base_path: '{}'\n".format(base_path)
-    config += "    model_platform: 'tensorflow'\n"
-
-    config += "    model_version_policy: {\n"
-    config += "      specific: {\n"
-    for version in find_model_versions(base_path):
-        config += "        versions: {}\n".format(version)
-    config += "      }\n"
-    config += "    }\n"
-
-    config += "  }\n"
+    for model_name, base_path in base_paths.items():
+        config += "  config: {\n"
+        config += "    name: '{}'\n".format(model_name)
+        config += "    base_path: '{}'\n".format(base_path)
+        config += "    model_platform: 'tensorflow'\n"
+
+        config += "    model_version_policy: {\n"
+        config += "      specific: {\n"
+        for version in find_model_versions(base_path):
+            config += "        versions: {}\n".format(version)
+        config += "      }\n"
+        config += "    }\n"
+
+        config += "  }\n"
     config += "}\n"
     return config
 
 
+def shared_tfs_dir(instance_id):
+    """State directory of shared MME TFS instance `instance_id`.
+
+    Holds model-config.cfg (what TFS loads on (re)start), models.json (the
+    {model_name: base_path} it was built from) and tfs.pid.
+    """
+    return "/sagemaker/tfs-shared/{}".format(instance_id)
+
+
+def warm_tfs_dir(rest_port):
+    """State directory of the warm (pre-spawned, model-less) MME TFS on rest_port.
+
+    Holds the model-config.cfg (and batching-config.cfg) it was started with.
+    """
+    return "/sagemaker/tfs-warm/{}".format(rest_port)
+
+
+def read_shared_tfs_models(instance_id):
+    path = os.path.join(shared_tfs_dir(instance_id), "models.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def write_shared_tfs_config(instance_id, base_paths):
+    """Atomically write models.json and model-config.cfg; return the config text."""
+    directory = shared_tfs_dir(instance_id)
+    os.makedirs(directory, exist_ok=True)
+    config = create_tfs_config_models(base_paths)
+    for name, content in (("models.json", json.dumps(base_paths)), ("model-config.cfg", config)):
+        tmp_path = os.path.join(directory, name + ".tmp")
+        with open(tmp_path, "w", encoding="utf8") as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(directory, name))
+    return config
+
+
+def read_shared_tfs_pid(instance_id):
+    """pid of shared MME TFS instance_id, or None before serve.py has recorded it."""
+    try:
+        with open(os.path.join(shared_tfs_dir(instance_id), "tfs.pid"), "r", encoding="utf8") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
 def tfs_command(
     tfs_grpc_port,
     tfs_rest_port,
@@ -260,10 +404,19 @@ def create_batching_config(batching_config_file):
         ),
     ]
 
+    # A tuned file (e.g. written by tfs_batching_tuner.py) replaces the
+    # defaults; the per-parameter env vars still win.
+    tuned_config_file = os.environ.get("SAGEMAKER_TFS_BATCHING_CONFIG")
+    tuned, tuned_extra_lines = (
+        read_batching_config(tuned_config_file) if tuned_config_file else ({}, [])
+    )
+
     warning_message = ""
     for batching_parameter in batching_parameters:
         if batching_parameter.env_var in os.environ:
             batching_parameter.value = os.environ[batching_parameter.env_var]
+        elif batching_parameter.key in tuned:
+            batching_parameter.value = tuned[batching_parameter.key]
         else:
             warning_message += batching_parameter.defaulted_message.format(
                 batching_parameter.value, batching_parameter.env_var
@@ -272,50 +425,111 @@ def create_batching_config(batching_config_file):
     if warning_message:
         log.warning(warning_message)
 
-    config = ""
-    for batching_parameter in batching_parameters:
-        config += "%s { value: %s }\n" % (batching_parameter.key, batching_parameter.value)
+    config = format_batching_config(
+        {
+            batching_parameter.key: batching_parameter.value
+            for batching_parameter in batching_parameters
+        }
+    )
+    # lines the env vars do not cover (allowed_batch_sizes, ...) pass through
+    config += "".join(line + "\n" for line in tuned_extra_lines)
 
     log.info("batching config: \n%s\n", config)
     with open(batching_config_file, "w", encoding="utf8") as f:
         f.write(config)
 
 
+def format_batching_config(values):
+    """Render {key: value} as a TFS batching parameters file."""
+    return "".join("%s { value: %s }\n" % (key, value) for key, value in values.items())
+
+
+def read_batching_config(path):
+    """Parse a batching parameters file.
+
+    Returns ({key: value} for every `key { value: v }` line, [other non-empty lines]).
+    """
+    values, extra_lines = {}, []
+    with open(path, "r", encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            match = _BATCHING_LINE_RE.match(line)
+            if match:
+                values[match.group(1)] = match.group(2)
+            elif line:
+                extra_lines.append(line)
+    return values, extra_lines
+
+
 def wait_for_model(rest_port, model_name, timeout_seconds, pid=None):
+    """Block until TFS reports every version of model_name AVAILABLE.
+
+    Polls GET /v1/models/<name> with an adaptive interval that starts at 5 ms
+    and grows to 100 ms, so a model that loads quickly is seen within
+    milliseconds instead of after a fixed 1 s poll. Raises
+    MultiModelException(408) on timeout, and immediately if pid exits first.
     """
-    Notice:
-    The calculation for retry count based on timeout_seconds might introduce a small delta (0.1s) for each retry
-    which might cause total timeout longer than timeout_seconds
+    _wait_for_tfs(
+        "http://localhost:{}/v1/models/{}".format(rest_port, model_name),
+        lambda response: response.status_code == 200 and is_model_ready(response),
+        "model {}".format(model_name),
+        timeout_seconds,
+        pid,
+    )
+
+
+def wait_for_tfs_server(rest_port, timeout_seconds, pid=None):
+    """Block until the TFS on rest_port answers HTTP, whether or not it serves a model.
+
+    Same polling and errors as wait_for_model.
     """
-    tfs_url = "http://localhost:{}/v1/models/{}".format(rest_port, model_name)
-    start = time.time()
+    _wait_for_tfs(
+        "http://localhost:{}/v1/models/_".format(rest_port),
+        lambda response: True,
+        "TFS on port {}".format(rest_port),
+        timeout_seconds,
+        pid,
+    )
+
+
+def _wait_for_tfs(tfs_url, is_ready, what, timeout_seconds, pid):
+    start = time.monotonic()
+    deadline = start + timeout_seconds
+    interval = _READY_POLL_MIN_SECONDS
+    log.info("waiting for model server: %s (timeout: %ss)", tfs_url, timeout_seconds)
+    with requests.Session() as session:
+        while True:
+            try:
+                response = session.get(
+                    tfs_url, timeout=max(0.1, min(5, deadline - time.monotonic()))
+                )
+                if is_ready(response):
+                    log.info("%s ready after %.3fs", what, time.monotonic() - start)
+                    return
+            except requests.exceptions.RequestException:
+                pass  # TFS is not listening yet
+            if pid is not None and not process_running(pid):
+                raise MultiModelException(
+                    408,
+                    "TFS (pid {}) exited before {} was ready".format(pid, what),
+                    pid,
+                )
+            if time.monotonic() + interval > deadline:
+                raise MultiModelException(
+                    408, "Timed out after {} seconds".format(timeout_seconds), pid
+                )
+            time.sleep(interval)
+            interval = min(interval * 1.5, _READY_POLL_MAX_SECONDS)
+
+
+def process_running(pid):
+    """False once pid has exited, including an exited child not yet reaped (zombie)."""
     try:
-        session = requests.Session()
-        backoff_factor = 0.1
-        # sleep = {backoff factor} * (2 ^ ({number of retries so far} - 1))
-        retry_count = retry_from_timeout(timeout_seconds, backoff_factor)
-        retries = Retry(total=retry_count, backoff_factor=backoff_factor)
-        session.mount("http://", requests.adapters.HTTPAdapter(max_retries=retries))
-        log.info(
-            "Trying to connect with model server: {} with timeout : {} and retry : {}".format(
-                tfs_url, timeout_seconds, retry_count
-            )
-        )
-        response = session.get(tfs_url, timeout=5)
-        log.info("tfs response status_code: %s", response.status_code)
-        if response.status_code == 200 and is_model_ready(response):
-            return
-        end = time.time()
-        if wait_for_model_ready(tfs_url, timeout_seconds - int(end - start)):
-            return
-        raise MultiModelException(408, "Timed out after {} seconds".format(timeout_seconds), pid)
-    except (
-        ConnectionRefusedError,
-        NewConnectionError,
-        MaxRetryError,
-        requests.exceptions.ConnectionError,
-    ):
-        raise MultiModelException(408, "Timed out after {} seconds".format(timeout_seconds), pid)
+        with open("/proc/{}/stat".format(pid), "r", encoding="utf8") as f:
+            # state is the field after the parenthesized command name
+            return f.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except (OSError, IndexError):
+        return False
 
 
 def is_model_ready(response):
@@ -326,35 +540,38 @@ def is_model_ready(response):
         return False
 
 
-def wait_for_model_ready(url, timeout_seconds):
-    deadline = time.monotonic() + timeout_seconds
-    while time.monotonic() < deadline:
-        try:
-            response = requests.get(url, timeout=1)
-        except requests.exceptions.RequestException as e:
-            log.info("model not reachable yet: %s", e)
-            time.sleep(1)
-            continue
-        if response.status_code == 200 and is_model_ready(response):
-            return True
-        log.info("model not ready yet: status=%s", response.status_code)
-        time.sleep(1)
-    return False
-
-
-def retry_from_timeout(timeout_seconds, backoff_factor):
-    if backoff_factor <= 0:
+def get_cpu_memory_util():
+    """Percent of system memory in use (MemTotal - MemAvailable), from /proc/meminfo."""
+    total_memory, available_memory = get_cpu_memory_bytes()
+    return round(((total_memory - available_memory) / total_memory) * 100, 2)
+
+
+def get_cpu_memory_bytes():
+    """Return (MemTotal, MemAvailable) in bytes."""
+    meminfo = {}
+    with open("/proc/meminfo", "r", encoding="utf8") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            meminfo[key] = int(value.split()[0]) * 1024
+    return meminfo["MemTotal"], meminfo["MemAvailable"]
+
+
+def get_process_rss_bytes(pid):
+    """Resident set size of pid in bytes, or 0 if the process is gone."""
+    try:
+        with open("/proc/{}/statm".format(pid), "r", encoding="utf8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
         return 0
-    retries, elapsed = 0, 0.0
-    while True:
-        nxt = elapsed + backoff_factor * (2**retries)
-        if nxt > timeout_seconds:
-            return retries
-        elapsed, retries = nxt, retries + 1
 
 
-def get_cpu_memory_util():
-    total_memory, used_memory, free_memory = map(
-        int, os.popen("free -t -m").readlines()[-1].split()[1:]
-    )
-    return round((used_memory / total_memory) * 100, 2)
+def get_dir_size_bytes(path):
+    """Total size of the regular files under path (a model's on-disk footprint)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
@@ -1,10 +1,11 @@
 """WhisperX FastAPI server.
 
-Four routes, all served in one process:
+Five routes, all served in one process:
     POST /v1/audio/transcriptions   — primary, OpenAI-compatible
     POST /invocations               — alias for SageMaker
     GET  /ping                      — readiness health check
     GET  /v1/models                 — advertises the single served model id
+    GET  /metrics                   — result cache counters (Prometheus text)
 
 Extension fields on top of OpenAI's schema: `diarize`, `min_speakers`,
 `max_speakers`. When `diarize=false` (default) output is byte-identical to
@@ -32,22 +33,31 @@ per request.
 
 from __future__ import annotations
 
+import dataclasses
 import functools
 import gc
+import hashlib
 import io
+import itertools
+import json
 import os
+import struct
+import subprocess
 import tempfile
 import threading
+import time
 from collections import OrderedDict
-from contextlib import asynccontextmanager
+from contextlib import ExitStack, asynccontextmanager, closing, nullcontext, suppress
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
 import anyio
+import numpy as np
 import torch
 import whisperx
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from whisperx.diarize import DiarizationPipeline
 from whisperx.utils import WriteSRT, WriteVTT
 
@@ -124,27 +134,25 @@ def _build_vad_options() -> dict[str, Any]:
 # ---------------------------------------------------------------------------
 # Model caches
 # ---------------------------------------------------------------------------
-# One Whisper model per container, pinned at launch (DEFAULT_MODEL) and warmed
-# in the lifespan hook. The request `model` field is ignored (OpenAI-compat
-# no-op), so a single model stays resident rather than a per-name LRU.
-_WHISPER_MODEL: Any = None
-
-# wav2vec2 align models — keyed by language code. Orthogonal to the Whisper
-# model (a request's detected language selects the aligner), so this stays an
-# LRU even though only one Whisper model is served.
-_ALIGN_LRU: "OrderedDict[str, tuple[Any, dict[str, Any]]]" = OrderedDict()
-_ALIGN_LRU_MAX = max(1, int(os.environ.get("WHISPERX_ALIGN_LRU_SIZE", "3")))
-
-# _transcribe runs in an anyio worker thread. _WHISPER_LOCK serializes the
-# one-time model load (defense-in-depth if MAX_CONCURRENT_REQUESTS>1 ever races
-# concurrent cold misses, so only the first thread loads); _ALIGN_LOCK does the
-# same for the align LRU. Inference itself stays outside these locks (it runs in
-# _transcribe after the getters return).
-_WHISPER_LOCK = threading.Lock()
-_ALIGN_LOCK = threading.Lock()
-
-# Fixed models loaded at startup.
-_DIARIZE_PIPELINE: Any = None
+# Models live on replicas (see _Replica): one Whisper model per replica, pinned
+# at launch (DEFAULT_MODEL) and warmed in the lifespan hook. The request `model`
+# field is ignored (OpenAI-compat no-op), so a single model stays resident
+# rather than a per-name LRU. Each replica also keeps an LRU of wav2vec2 align
+# models, keyed by language code and bounded by _ALIGN_LRU_MAX, and the
+# pyannote diarization pipeline loaded at startup.
+#
+# WHISPERX_ALIGN_PRELOAD (comma-separated language codes) loads those aligners
+# at startup, and the LRU is sized to hold at least all of them. With
+# WHISPERX_ALIGN_PREFETCH (default on), a request that will be aligned starts
+# loading a missing aligner in the background as soon as its language is known,
+# so the load overlaps ASR instead of following it (see _prefetch_align).
+ALIGN_PRELOAD = [
+    lang.strip() for lang in os.environ.get("WHISPERX_ALIGN_PRELOAD", "").split(",") if lang.strip()
+]
+ALIGN_PREFETCH = _env_bool("WHISPERX_ALIGN_PREFETCH", True)
+_ALIGN_LRU_MAX = max(1, int(os.environ.get("WHISPERX_ALIGN_LRU_SIZE", "3")), len(ALIGN_PRELOAD))
+# Request-path aligner lookups between two hit-ratio log lines.
+_ALIGN_STATS_EVERY = 100
 
 # Process readiness. Starts True; the inference path flips it False on a fatal
 # CUDA/device fault (see _is_fatal_cuda_error) so /ping can report 503.
@@ -178,110 +186,277 @@ VAD_OPTIONS = _build_vad_options()
 # ---------------------------------------------------------------------------
 # A single WhisperX model/pipeline is not concurrency-safe (FasterWhisperPipeline
 # mutates its options/tokenizer mid-call; diarization is not documented
-# thread-safe), so inference is serialized to 1: MAX_CONCURRENT_REQUESTS is clamped
-# to 1 (other values ignored with a warning) and _INFERENCE_LIMITER serializes the
-# in-flight transcription. _ADMISSION is a hard cap — a BoundedSemaphore sized to
-# executing + queue; each request takes a non-blocking token before touching the
-# body and releases it in finally, shedding 503 when none is free. MAX_UPLOAD_BYTES
+# thread-safe), so each replica serves one transcription at a time, gated by its
+# inference_limiter, and MAX_CONCURRENT_REQUESTS is the replica count
+# (WHISPERX_MAX_CONCURRENT_REQUESTS is ignored with a warning). _ADMISSION is a
+# hard cap — a BoundedSemaphore sized to executing + queue, shared by all
+# replicas; each request takes a non-blocking token before touching the body and
+# releases it in finally, shedding 503 when none is free. MAX_UPLOAD_BYTES
 # bounds temp-file retention (upload streamed in chunks).
+#
+# Replicas (WHISPERX_REPLICAS, default 1) are independent copies of the
+# pipeline in this process: "auto" means one per visible GPU, or on CPU images
+# one per WHISPERX_CPU_THREADS_PER_REPLICA cores; an explicit count larger than
+# the GPU count places replicas on the GPUs round-robin. The models of one
+# replica are loaded once, instead of once per container when scaling out.
+CPU_THREADS_PER_REPLICA = max(1, int(os.environ.get("WHISPERX_CPU_THREADS_PER_REPLICA", "4")))
+
+
+def _replica_devices() -> list[tuple[str, int]]:
+    """(torch device, GPU ordinal) for each replica, from WHISPERX_REPLICAS."""
+    raw = os.environ.get("WHISPERX_REPLICAS", "1").strip().lower()
+    gpus = torch.cuda.device_count() if DEVICE == "cuda" else 0
+    if raw == "auto":
+        count = gpus or max(1, (os.cpu_count() or 1) // CPU_THREADS_PER_REPLICA)
+    else:
+        count = max(1, int(raw))
+    if gpus:
+        return [(f"cuda:{i % gpus}", i % gpus) for i in range(count)]
+    return [(DEVICE, 0)] * count
+
+
+_REPLICA_DEVICES = _replica_devices()
 _RAW_MAX_CONCURRENT = int(os.environ.get("WHISPERX_MAX_CONCURRENT_REQUESTS", "1"))
 if _RAW_MAX_CONCURRENT != 1:
     print(
-        f"WARN: WHISPERX_MAX_CONCURRENT_REQUESTS={_RAW_MAX_CONCURRENT} ignored; this "
-        f"single-model/single-pipeline container serves inference strictly serially "
-        f"(concurrent inference on one WhisperX pipeline is unsafe). Scale out with "
-        f"multiple containers instead."
+        f"WARN: WHISPERX_MAX_CONCURRENT_REQUESTS={_RAW_MAX_CONCURRENT} ignored; each "
+        f"WhisperX pipeline serves inference strictly serially (concurrent inference "
+        f"on one pipeline is unsafe). Set WHISPERX_REPLICAS to run several pipelines "
+        f"in this container."
     )
-MAX_CONCURRENT_REQUESTS = 1
-_INFERENCE_LIMITER = anyio.CapacityLimiter(MAX_CONCURRENT_REQUESTS)
+MAX_CONCURRENT_REQUESTS = len(_REPLICA_DEVICES)
 MAX_QUEUE = max(0, int(os.environ.get("WHISPERX_MAX_QUEUE", "2")))
 MAX_UPLOAD_BYTES = int(os.environ.get("WHISPERX_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
 _UPLOAD_CHUNK_BYTES = 1024 * 1024  # 1 MiB stream chunk
+_FFMPEG_STDERR_BYTES = 64 * 1024  # ffmpeg error output kept for the exception
+# Uploads up to IN_MEMORY_UPLOAD_BYTES stay in RAM and are decoded in-process
+# (see _load_audio); a larger one spills to a temp file mid-stream and is
+# decoded by whisperx.load_audio's ffmpeg subprocess, as is every upload when
+# this is 0. Raw PCM uploads (.pcm/.raw) are read as 16 kHz mono s16le.
+IN_MEMORY_UPLOAD_BYTES = max(
+    0, int(os.environ.get("WHISPERX_IN_MEMORY_UPLOAD_BYTES", str(32 * 1024 * 1024)))
+)
+RAW_PCM_SUFFIXES = {".pcm", ".raw"}
 
 # Hard admission bound: MAX_CONCURRENT_REQUESTS executing + MAX_QUEUE waiting.
 _ADMISSION_CAPACITY = MAX_CONCURRENT_REQUESTS + MAX_QUEUE
 _ADMISSION = threading.BoundedSemaphore(_ADMISSION_CAPACITY)
 
+# Short-clip batching (opt-in). With BATCH_WINDOW_MS > 0, requests that arrive
+# within the window of one another — or while the GPU is busy with an earlier
+# batch — are transcribed together: each clip is decoded and VAD-segmented on
+# its own, then the speech chunks of every clip are packed into one batched
+# faster-whisper pass (one pass per language) and the segments scattered back.
+# Alignment and diarization stay per clip. A batch holds at most
+# BATCH_MAX_REQUESTS requests, and no more than the _ADMISSION capacity can be
+# waiting, so WHISPERX_MAX_QUEUE must be raised for batches to form.
+BATCH_WINDOW_MS = max(0, int(os.environ.get("WHISPERX_BATCH_WINDOW_MS", "0")))
+BATCH_MAX_REQUESTS = max(1, int(os.environ.get("WHISPERX_BATCH_MAX_REQUESTS", "8")))
+_SAMPLE_RATE = 16000
+
+# Stage pipelining (opt-in). With PIPELINE_STAGES, decode, ASR, alignment and
+# diarization run as separate stages (see _transcribe_staged) instead of one
+# _transcribe call under the replica's inference_limiter. Each model keeps a
+# single user; only decoding, which touches no model, runs on DECODE_WORKERS
+# threads shared by all replicas.
+PIPELINE_STAGES = _env_bool("WHISPERX_PIPELINE_STAGES")
+DECODE_WORKERS = max(1, int(os.environ.get("WHISPERX_DECODE_WORKERS", "2")))
+_DECODE_LIMITER = anyio.CapacityLimiter(DECODE_WORKERS)
+
+# Transcript result cache (opt-in, see _ResultCache). RESULT_CACHE_BYTES bounds
+# the in-memory LRU; RESULT_CACHE_DIR adds an on-disk tier bounded by
+# RESULT_CACHE_DISK_BYTES. The cache is on when either tier is configured.
+RESULT_CACHE_BYTES = max(0, int(os.environ.get("WHISPERX_RESULT_CACHE_BYTES", "0")))
+RESULT_CACHE_DIR = os.environ.get("WHISPERX_RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_BYTES = max(
+    0, int(os.environ.get("WHISPERX_RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+)
+
+# Windowed long-audio mode (opt-in). With LONG_AUDIO_WINDOW_SECONDS > 0,
+# every upload is decoded as a stream (see _open_windows), and one whose
+# decoded audio runs past a window gets ASR, alignment and diarization on
+# overlapping windows of that length, so memory is bounded by the window
+# instead of growing with the recording (see _transcribe_windowed). That holds
+# for pipelined, batched and streamed requests too; they only handle audio no
+# longer than one window, which is transcribed whole, as before. A segment
+# is cut at a window edge only if it is longer than LONG_AUDIO_OVERLAP_SECONDS,
+# so the overlap defaults to the 30 s VAD chunk. Speakers diarized in separate
+# windows are merged when their embeddings' cosine similarity reaches
+# LONG_AUDIO_SPEAKER_SIMILARITY (see _SpeakerClusters).
+LONG_AUDIO_WINDOW_SECONDS = max(
+    0.0, float(os.environ.get("WHISPERX_LONG_AUDIO_WINDOW_SECONDS", "0"))
+)
+LONG_AUDIO_OVERLAP_SECONDS = min(
+    max(0.0, float(os.environ.get("WHISPERX_LONG_AUDIO_OVERLAP_SECONDS", "30"))),
+    LONG_AUDIO_WINDOW_SECONDS / 2,
+)
+LONG_AUDIO_SPEAKER_SIMILARITY = float(
+    os.environ.get("WHISPERX_LONG_AUDIO_SPEAKER_SIMILARITY", "0.5")
+)
+
 
 def _get_whisper(model_name: str) -> Any:
-    # One model per container: model_name is always DEFAULT_MODEL, so a single
-    # resident model is cached. _WHISPER_LOCK holds across the check-load-store
-    # so that if MAX_CONCURRENT_REQUESTS>1 ever races two cold misses, only the
-    # first loads (dedupes the ~30 s load); a warm hit takes the lock briefly.
+    # One model per replica: model_name is always DEFAULT_MODEL, so a single
+    # resident model is cached. whisper_lock holds across the check-load-store
+    # so that if two threads ever race a cold miss, only the first loads
+    # (dedupes the ~30 s load); a warm hit takes the lock briefly.
     # Decoding/VAD/task config is global launch config (ASR_OPTIONS/VAD_OPTIONS).
-    global _WHISPER_MODEL
-    with _WHISPER_LOCK:
-        if _WHISPER_MODEL is None:
-            _WHISPER_MODEL = whisperx.load_model(
+    replica = _replica()
+    with replica.whisper_lock:
+        if replica.whisper is None:
+            replica.whisper = whisperx.load_model(
                 model_name,
                 device=DEVICE,
+                device_index=replica.device_index,
                 compute_type=COMPUTE_TYPE,
                 asr_options=ASR_OPTIONS,
                 vad_method=VAD_METHOD,
                 vad_options=VAD_OPTIONS,
                 task=TASK,
+                threads=CPU_THREADS_PER_REPLICA,
             )
-        return _WHISPER_MODEL
+        return replica.whisper
+
 
+def _get_align(language: str, reason: str = "request") -> tuple[Any, dict[str, Any]]:
+    """The replica's aligner for language, loading it on a miss.
 
-def _get_align(language: str) -> tuple[Any, dict[str, Any]]:
-    # Serialized by _ALIGN_LOCK: dedupe concurrent cold misses and evict safely.
-    with _ALIGN_LOCK:
-        if language in _ALIGN_LRU:
-            _ALIGN_LRU.move_to_end(language)
-            return _ALIGN_LRU[language]
+    reason is "request" for the align stage, whose lookups feed the hit-ratio
+    log, or "preload" / "prefetch".
+    """
+    # Serialized by align_lock: dedupe concurrent cold misses and evict safely.
+    replica = _replica()
+    lru = replica.align_lru
+    with replica.align_lock:
+        hit = language in lru
+        if reason == "request":
+            stats = replica.align_stats.setdefault(language, [0, 0])  # [hits, lookups]
+            stats[0] += hit
+            stats[1] += 1
+            if sum(n for _, n in replica.align_stats.values()) % _ALIGN_STATS_EVERY == 0:
+                _log_align_stats(replica)
+        if hit:
+            lru.move_to_end(language)
+            return lru[language]
         # MISS: evict BEFORE loading. whisperx.align models are GPU-resident, so
         # evicting first (dropping the Python ref and emptying the CUDA caching
         # allocator) keeps the resident set bounded by _ALIGN_LRU_MAX rather than
         # transiently holding _ALIGN_LRU_MAX + 1 and risking OOM on a full cache.
         evicted = False
-        while len(_ALIGN_LRU) >= _ALIGN_LRU_MAX:
-            _, old = _ALIGN_LRU.popitem(last=False)
+        while len(lru) >= _ALIGN_LRU_MAX:
+            _, old = lru.popitem(last=False)
             del old
             evicted = True
         if evicted and DEVICE == "cuda":
             gc.collect()
-            torch.cuda.empty_cache()
-        _ALIGN_LRU[language] = whisperx.load_align_model(
-            language_code=language, device=DEVICE, model_name=ALIGN_MODEL
+            with torch.cuda.device(replica.device):
+                torch.cuda.empty_cache()
+        started = time.perf_counter()
+        lru[language] = whisperx.load_align_model(
+            language_code=language, device=replica.device, model_name=ALIGN_MODEL
+        )
+        print(
+            f"INFO: loaded aligner for language={language} on {replica.device} "
+            f"in {time.perf_counter() - started:.2f}s ({reason})"
         )
-        return _ALIGN_LRU[language]
+        return lru[language]
 
 
-# ---------------------------------------------------------------------------
-# App + lifespan
-# ---------------------------------------------------------------------------
-@asynccontextmanager
-async def lifespan(_: FastAPI):
-    """Load fixed models before uvicorn binds so /ping stays shallow but honest.
+def _log_align_stats(replica: _Replica) -> None:
+    # Caller holds align_lock. A hit is a request-path lookup that found the
+    # aligner resident — preloaded, prefetched or left by an earlier request.
+    hits = sum(h for h, _ in replica.align_stats.values())
+    lookups = sum(n for _, n in replica.align_stats.values())
+    per_language = ", ".join(
+        f"{lang} {h}/{n}" for lang, (h, n) in sorted(replica.align_stats.items())
+    )
+    print(
+        f"INFO: aligner hit ratio on {replica.device}: {hits}/{lookups} "
+        f"({hits / lookups:.0%}); {per_language}"
+    )
 
-    `/ping` reachable ⇒ the diarization pipeline and the default Whisper model are
-    resident. VAD uses whisperx's default (pyannote), whose segmentation model
-    ships inside the whisperx wheel.
+
+def _prefetch_align(language: str) -> None:
+    """Start loading language's aligner in the background if it is missing.
+
+    Called as soon as a request that will be aligned knows its language, so a
+    cold load overlaps the rest of ASR instead of following it in the same
+    slot. The align stage's _get_align waits on align_lock for a load still
+    in progress rather than repeating it. A failed prefetch is only logged;
+    the align stage retries the load and reports the error.
     """
-    global _DIARIZE_PIPELINE, _HEALTHY
-    # Warm the default Whisper model so the first request isn't a cold ~30 s
-    # download-and-load.
-    _get_whisper(DEFAULT_MODEL)
+    if not ALIGN_PREFETCH or TASK == "translate" or not language:
+        return
+    replica = _replica()
+    with replica.align_lock:
+        if language in replica.align_lru or language in replica.align_prefetching:
+            return
+        replica.align_prefetching.add(language)
+    threading.Thread(
+        target=_prefetch_align_worker,
+        args=(replica, language),
+        name=f"align-prefetch-{language}",
+        daemon=True,
+    ).start()
+
+
+def _prefetch_align_worker(replica: _Replica, language: str) -> None:
+    _CURRENT_REPLICA.set(replica)  # a new thread starts with an empty context
+    try:
+        _get_align(language, "prefetch")
+    except Exception as exc:  # noqa: BLE001 — the align stage retries and reports it
+        print(f"WARN: aligner prefetch failed for language={language}: {exc}")
+    finally:
+        with replica.align_lock:
+            replica.align_prefetching.discard(language)
 
+
+# ---------------------------------------------------------------------------
+# App + lifespan
+# ---------------------------------------------------------------------------
+def _load_diarization(device: str) -> Any:
     # Diarization: load the pyannote pipeline from the fixed local path the
     # image baked at build time (COPYed from S3). Explicit local path ⇒ no HF
     # token and no network needed. Absence is not fatal — non-diarized requests
     # still work. This path is independent of HF_HOME, so the SageMaker
     # entrypoint repointing HF_HOME (for user-mounted Whisper models) does not
     # hide it.
-    if os.path.isdir(DIARIZE_MODEL_PATH):
-        try:
-            _DIARIZE_PIPELINE = DiarizationPipeline(
-                model_name=DIARIZE_MODEL_PATH,
-                device=DEVICE,
-            )
-        except Exception as exc:  # noqa: BLE001 — best-effort startup
-            print(f"WARN: diarization pipeline failed to load from {DIARIZE_MODEL_PATH}: {exc}")
-            _DIARIZE_PIPELINE = None
-    else:
+    if not os.path.isdir(DIARIZE_MODEL_PATH):
         print(f"WARN: diarization model dir {DIARIZE_MODEL_PATH} missing; diarization disabled")
-        _DIARIZE_PIPELINE = None
+        return None
+    try:
+        return DiarizationPipeline(model_name=DIARIZE_MODEL_PATH, device=device)
+    except Exception as exc:  # noqa: BLE001 — best-effort startup
+        print(f"WARN: diarization pipeline failed to load from {DIARIZE_MODEL_PATH}: {exc}")
+        return None
+
+
+def _warm_replica(replica: _Replica) -> None:
+    """Load a replica's fixed models; runs on its own worker thread."""
+    _CURRENT_REPLICA.set(replica)  # this thread's copy of the context
+    _get_whisper(DEFAULT_MODEL)
+    replica.diarize_pipeline = _load_diarization(replica.device)
+    for language in ALIGN_PRELOAD:
+        try:
+            _get_align(language, "preload")
+        except Exception as exc:  # noqa: BLE001 — best-effort startup, as diarization
+            print(f"WARN: aligner preload failed for language={language}: {exc}")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Load fixed models before uvicorn binds so /ping stays shallow but honest.
+
+    `/ping` reachable ⇒ the diarization pipeline and the default Whisper model are
+    resident on every replica. VAD uses whisperx's default (pyannote), whose segmentation model
+    ships inside the whisperx wheel.
+    """
+    global _HEALTHY
+    # Warm every replica's default Whisper model so the first request isn't a
+    # cold ~30 s download-and-load; replicas load side by side.
+    async with anyio.create_task_group() as tg:
+        for replica in _REPLICAS:
+            tg.start_soon(anyio.to_thread.run_sync, _warm_replica, replica)
 
     # Warmup completed without a fatal load error; confirm readiness. (If
     # _get_whisper raised above, we never reach here and uvicorn won't bind.)
@@ -306,23 +481,31 @@ def _seconds_to_vtt_ts(t: float) -> str:
     return _seconds_to_srt_ts(t).replace(",", ".")
 
 
+# Cues are joined with "\n" (a blank line between them); streamed responses
+# emit the same pieces one at a time, so both paths are byte-identical.
+_VTT_HEADER = "WEBVTT\n"
+
+
+def _srt_cue(index: int, seg: dict[str, Any]) -> str:
+    return (
+        f"{index}\n{_seconds_to_srt_ts(seg['start'])} --> {_seconds_to_srt_ts(seg['end'])}\n"
+        f"{seg.get('text', '').strip()}\n"
+    )
+
+
+def _vtt_cue(seg: dict[str, Any]) -> str:
+    return (
+        f"{_seconds_to_vtt_ts(seg['start'])} --> {_seconds_to_vtt_ts(seg['end'])}\n"
+        f"{seg.get('text', '').strip()}\n"
+    )
+
+
 def _to_srt(segments: list[dict[str, Any]]) -> str:
-    lines: list[str] = []
-    for i, seg in enumerate(segments, start=1):
-        lines.append(str(i))
-        lines.append(f"{_seconds_to_srt_ts(seg['start'])} --> {_seconds_to_srt_ts(seg['end'])}")
-        lines.append(seg.get("text", "").strip())
-        lines.append("")
-    return "\n".join(lines)
+    return "\n".join(_srt_cue(i, seg) for i, seg in enumerate(segments, start=1))
 
 
 def _to_vtt(segments: list[dict[str, Any]]) -> str:
-    lines: list[str] = ["WEBVTT", ""]
-    for seg in segments:
-        lines.append(f"{_seconds_to_vtt_ts(seg['start'])} --> {_seconds_to_vtt_ts(seg['end'])}")
-        lines.append(seg.get("text", "").strip())
-        lines.append("")
-    return "\n".join(lines)
+    return "\n".join([_VTT_HEADER] + [_vtt_cue(seg) for seg in segments])
 
 
 def _render_subtitle(
@@ -399,16 +582,477 @@ def _is_fatal_cuda_error(exc: Exception) -> bool:
     return any(marker in msg for marker in _FATAL_CUDA_MARKERS)
 
 
+def _note_inference_error(exc: Exception) -> None:
+    # A fatal CUDA/device fault corrupts this process's GPU context, so every
+    # later request on this instance will fail too. Flip readiness (=> /ping
+    # 503) so orchestration can drain/replace the host; the caller re-raises so
+    # the current request still errors. Transient failures — CUDA OOM, the
+    # unsupported-language degrade, and the 422/400 HTTPExceptions — are NOT
+    # fatal and simply propagate without flipping health.
+    global _HEALTHY
+    if _is_fatal_cuda_error(exc):
+        _HEALTHY = False
+
+
+def _wav_pcm16(data: bytes | bytearray) -> tuple[memoryview, int, int] | None:
+    """Locate the samples of a 16-bit PCM WAV: (payload view, channels, rate).
+
+    None for anything else (other sample formats, compressed WAV, non-RIFF).
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    view = memoryview(data)
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = bytes(view[pos : pos + 4])
+        (size,) = struct.unpack_from("<I", data, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt " and size >= 16:
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == 0xFFFE and size >= 26:  # WAVE_FORMAT_EXTENSIBLE: subformat GUID
+                (tag,) = struct.unpack_from("<H", data, body + 24)
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None or fmt[0] != 1 or fmt[3] != 16 or fmt[1] < 1:
+                return None
+            # Streamed WAVs may leave the size 0 or 0xFFFFFFFF; read to the end.
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(body + size, len(data))
+            frame = 2 * fmt[1]
+            return view[body : end - (end - body) % frame], fmt[1], fmt[2]
+        pos = body + size + (size & 1)
+    return None
+
+
+def _pcm16_to_float(payload: memoryview | bytes | bytearray, channels: int) -> np.ndarray:
+    # Zero-copy view of the upload; the float conversion is the only copy.
+    # Channels are averaged, as ffmpeg's -ac 1 downmix does.
+    samples = np.frombuffer(payload, dtype="<i2")
+    if channels > 1:
+        return samples.reshape(-1, channels).mean(axis=1, dtype=np.float32) / 32768.0
+    return samples.astype(np.float32) / 32768.0
+
+
+def _pcm16_payload(data: bytes | bytearray, suffix: str) -> tuple[memoryview, int] | None:
+    """(samples, channels) of a raw PCM or 16 kHz PCM16 WAV upload, else None."""
+    if suffix.lower() in RAW_PCM_SUFFIXES:
+        return memoryview(data)[: len(data) - len(data) % 2], 1
+    wav = _wav_pcm16(data)
+    if wav is not None and wav[2] == _SAMPLE_RATE:
+        return wav[0], wav[1]
+    return None
+
+
+def _decode_in_memory(data: bytes | bytearray, suffix: str) -> np.ndarray | None:
+    """Decode an upload to 16 kHz mono float32 without a subprocess or disk.
+
+    16 kHz PCM16 WAV and raw PCM are read straight from the buffer; any other
+    format (FLAC, MP3, resampled WAV, ...) goes through PyAV, faster-whisper's
+    in-process libav decoder. None when PyAV cannot decode it either.
+    """
+    pcm = _pcm16_payload(data, suffix)
+    if pcm is not None:
+        return _pcm16_to_float(*pcm)
+    try:
+        from faster_whisper.audio import decode_audio
+
+        return decode_audio(io.BytesIO(data), sampling_rate=_SAMPLE_RATE)
+    except Exception as exc:  # noqa: BLE001 — any decode failure falls back to ffmpeg
+        print(f"WARN: in-process decode failed ({exc}); falling back to ffmpeg")
+        return None
+
+
+def _load_audio(
+    audio_path: str | None, audio_bytes: bytes | bytearray | None, audio_suffix: str
+) -> Any:
+    """16 kHz mono float32 samples of an upload held on disk or in memory."""
+    if audio_bytes is None:
+        return whisperx.load_audio(audio_path)
+    audio = _decode_in_memory(audio_bytes, audio_suffix)
+    if audio is not None:
+        return audio
+    with tempfile.NamedTemporaryFile(suffix=audio_suffix, delete=True) as tmp:
+        tmp.write(audio_bytes)
+        tmp.flush()
+        return whisperx.load_audio(tmp.name)
+
+
+def _iter_audio_blocks(
+    audio_path: str | None, audio_bytes: bytes | bytearray | None, audio_suffix: str
+) -> Iterator[np.ndarray]:
+    """_load_audio's samples as consecutive float32 blocks, decoded as needed.
+
+    PCM uploads are converted block by block from the buffer; files, and other
+    in-memory formats piped to its stdin, go through a streaming ffmpeg. Only
+    a block of samples is resident at a time.
+    """
+    if audio_bytes is None:
+        yield from _ffmpeg_blocks(audio_path)
+        return
+    pcm = _pcm16_payload(audio_bytes, audio_suffix)
+    if pcm is not None:
+        payload, channels = pcm
+        step = _UPLOAD_CHUNK_BYTES - _UPLOAD_CHUNK_BYTES % (2 * channels)
+        for i in range(0, len(payload), step):
+            yield _pcm16_to_float(payload[i : i + step], channels)
+        return
+    decoded = False
+    try:
+        for block in _ffmpeg_blocks("pipe:0", audio_bytes):
+            decoded = True
+            yield block
+        return
+    except RuntimeError as exc:
+        if decoded:
+            raise
+        # Some containers (MP4 with its index at the end) need a seekable input.
+        print(f"WARN: piped decode failed ({exc}); retrying from a temp file")
+    with tempfile.NamedTemporaryFile(suffix=audio_suffix, delete=True) as tmp:
+        tmp.write(audio_bytes)
+        tmp.flush()
+        yield from _ffmpeg_blocks(tmp.name)
+
+
+def _ffmpeg_blocks(path: str, data: bytes | bytearray | None = None) -> Iterator[np.ndarray]:
+    # The same conversion as whisperx.load_audio, read from ffmpeg's stdout as
+    # it decodes instead of collected whole. With data, path is "pipe:0" and a
+    # thread feeds data to ffmpeg's stdin, so neither pipe can stall the other.
+    cmd = [
+        "ffmpeg",
+        *(["-nostdin"] if data is None else []),
+        "-loglevel",
+        "error",
+        "-threads",
+        "0",
+        "-i",
+        path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(_SAMPLE_RATE),
+        "-",
+    ]
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL if data is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feeder = None
+    if data is not None:
+        feeder = threading.Thread(target=_feed_stdin, args=(proc.stdin, data), daemon=True)
+        feeder.start()
+    # Drained as it is written: ffmpeg blocks on a full stderr pipe just as on stdout.
+    stderr = bytearray()
+    drainer = threading.Thread(target=_drain_stderr, args=(proc.stderr, stderr), daemon=True)
+    drainer.start()
+    try:
+        while chunk := proc.stdout.read(_UPLOAD_CHUNK_BYTES):
+            # read(n) only comes up short at EOF, so only the tail can be odd.
+            yield _pcm16_to_float(chunk[: len(chunk) - len(chunk) % 2], 1)
+        returncode = proc.wait()
+        drainer.join()
+        if returncode != 0:
+            raise RuntimeError(f"Failed to load audio: {stderr.decode(errors='replace')}")
+    finally:
+        if proc.poll() is None:  # abandoned mid-stream
+            proc.kill()
+            proc.wait()
+        if feeder is not None:
+            feeder.join()
+        drainer.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _drain_stderr(stderr: Any, tail: bytearray) -> None:
+    # Keep the last _FFMPEG_STDERR_BYTES for the error message; -loglevel error
+    # output about a bad stream can repeat for every packet.
+    while chunk := stderr.read(_FFMPEG_STDERR_BYTES):
+        tail += chunk
+        del tail[:-_FFMPEG_STDERR_BYTES]
+
+
+def _feed_stdin(stdin: Any, data: bytes | bytearray) -> None:
+    # ffmpeg may stop reading early (it failed, or was killed); that ends the feed.
+    view = memoryview(data)
+    try:
+        with stdin:
+            for i in range(0, len(view), _UPLOAD_CHUNK_BYTES):
+                stdin.write(view[i : i + _UPLOAD_CHUNK_BYTES])
+    except (BrokenPipeError, ValueError):
+        pass
+
+
+def _iter_windows(
+    blocks: Iterator[np.ndarray], window: int, overlap: int
+) -> Iterator[tuple[int, np.ndarray, bool]]:
+    """Cut a block stream into windows of window samples overlapping by overlap.
+
+    Yields (first sample, samples, last). Every window but the last is full
+    length; the last holds the remainder, so audio no longer than one window
+    is a single last window. At most about two windows are buffered.
+    """
+    step = window - overlap
+    pieces: list[np.ndarray] = []
+    buffered = 0
+    start = 0
+    for block in blocks:
+        pieces.append(block)
+        buffered += len(block)
+        if buffered <= window:
+            continue
+        buf = np.concatenate(pieces)
+        # Strictly more than a window: something follows, so this one isn't last.
+        while len(buf) > window:
+            yield start, buf[:window], False
+            buf = buf[step:]
+            start += step
+        pieces, buffered = [buf], len(buf)
+    yield start, np.concatenate(pieces) if pieces else np.zeros(0, np.float32), True
+
+
+# ---------------------------------------------------------------------------
+# Transcript result cache
+# ---------------------------------------------------------------------------
+# Retries, re-renders in another response_format and reruns with diarization
+# toggled resubmit the same audio. With the cache on, a finished _transcribe
+# result is stored under a hash of the decoded samples, the launch-time
+# configuration that shapes it (_RESULT_CACHE_CONFIG) and the request knobs
+# that do (language, want_words, diarize, speaker bounds), and a repeat skips
+# ASR, alignment and diarization; it still pays upload and decode. Keying on
+# decoded audio lets a re-encoded upload of the same samples hit too. Entries
+# are the raw result dict as JSON, so every response_format renders from one
+# entry, and each hit decodes a fresh copy.
+_RESULT_CACHE_CONFIG = json.dumps(
+    {
+        "model": DEFAULT_MODEL,
+        "compute_type": COMPUTE_TYPE,
+        "batch_size": DEFAULT_BATCH_SIZE,
+        "task": TASK,
+        "asr_options": ASR_OPTIONS,
+        "vad_method": VAD_METHOD,
+        "vad_options": VAD_OPTIONS,
+        "align_model": ALIGN_MODEL,
+        "diarize_model": DIARIZE_MODEL_PATH,
+    },
+    sort_keys=True,
+    default=str,
+).encode()
+
+
+def _json_scalar(value: Any) -> Any:
+    # numpy scalars (word scores, timings) that json cannot encode natively.
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _ResultCache:
+    """Encoded _transcribe results: an LRU in memory and, optionally, on disk.
+
+    The memory tier holds at most max_bytes of JSON, least recently used
+    evicted first. With a directory, every entry is also written there as
+    <key>.json (atomically, so containers can share the directory) and the
+    directory is trimmed to max_disk_bytes, oldest first; a disk hit is
+    promoted to memory. Thread-safe: lookups run in worker threads.
+    """
+
+    def __init__(self, max_bytes: int, directory: str | None, max_disk_bytes: int):
+        self._max_bytes = max_bytes
+        self._dir = Path(directory) if directory else None
+        self._max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits["memory"] += 1
+                return json.loads(data)
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits["disk"] += 1
+            self._remember(key, data)
+        return json.loads(data)
+
+    def put(self, key: str, result: dict[str, Any]) -> None:
+        try:
+            data = json.dumps(result, default=_json_scalar).encode()
+        except (TypeError, ValueError) as exc:
+            print(f"WARN: transcription result not cached: {exc}")
+            return
+        with self._lock:
+            self._remember(key, data)
+        if self._dir is not None:
+            self._write_disk(key, data)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        # Caller holds _lock.
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old)
+        if len(data) > self._max_bytes:
+            return
+        self._entries[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> bytes | None:
+        if self._dir is None:
+            return None
+        path = self._dir / f"{key}.json"
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        with suppress(OSError):
+            os.utime(path)  # trimming goes by mtime, so a hit counts as use
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._dir / f"{key}.json"
+        try:
+            previous = path.stat().st_size if path.exists() else 0
+            with tempfile.NamedTemporaryFile(dir=self._dir, suffix=".tmp", delete=False) as tmp:
+                tmp.write(data)
+            os.replace(tmp.name, path)
+        except OSError as exc:
+            print(f"WARN: result cache write to {self._dir} failed: {exc}")
+            return
+        with self._lock:
+            self.disk_bytes += len(data) - previous
+            over = self.disk_bytes > self._max_disk_bytes
+        if over:
+            self._trim_disk()
+
+    def _disk_entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self._dir.glob("*.json"):
+            with suppress(OSError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _trim_disk(self) -> None:
+        # Rescans the directory, which other containers may write to as well.
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self._max_disk_bytes:
+                break
+            with suppress(OSError):
+                path.unlink()
+                total -= size
+        with self._lock:
+            self.disk_bytes = total
+
+
+_RESULT_CACHE = (
+    _ResultCache(RESULT_CACHE_BYTES, RESULT_CACHE_DIR, RESULT_CACHE_DISK_BYTES)
+    if RESULT_CACHE_BYTES or RESULT_CACHE_DIR
+    else None
+)
+
+
+def _cache_lookup(
+    audio: Any,
+    language: str | None,
+    want_words: bool,
+    diarize: bool,
+    min_speakers: int | None,
+    max_speakers: int | None,
+) -> tuple[str | None, dict[str, Any] | None]:
+    """(cache key, cached result or None); (None, None) with the cache off."""
+    if _RESULT_CACHE is None:
+        return None, None
+    digest = hashlib.blake2b(_RESULT_CACHE_CONFIG, digest_size=32)
+    digest.update(json.dumps([language, want_words, diarize, min_speakers, max_speakers]).encode())
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).data)
+    key = digest.hexdigest()
+    return key, _RESULT_CACHE.get(key)
+
+
+def _decode_job(job: dict[str, Any]) -> tuple[Any, str | None, dict[str, Any] | None]:
+    """Decode a job's upload and look it up: (audio, cache key, cached result)."""
+    if "audio" in job:  # already decoded by _open_long_job
+        audio = job["audio"]
+    else:
+        audio = _load_audio(
+            job["audio_path"], job.get("audio_bytes"), job.get("audio_suffix", ".wav")
+        )
+    key, cached = _cache_lookup(
+        audio,
+        job["language"],
+        job["want_words"],
+        job["diarize"],
+        job["min_speakers"],
+        job["max_speakers"],
+    )
+    return audio, key, cached
+
+
+def _cache_store(key: str | None, result: dict[str, Any]) -> None:
+    if key is not None:
+        _RESULT_CACHE.put(key, result)
+
+
 def _transcribe(
-    audio_path: str,
+    audio_path: str | None,
     language: str | None,
     want_words: bool,
     diarize: bool,
     min_speakers: int | None,
     max_speakers: int | None,
+    audio_bytes: bytes | bytearray | None = None,
+    audio_suffix: str = ".wav",
 ) -> dict[str, Any]:
-    audio = whisperx.load_audio(audio_path)
+    if LONG_AUDIO_WINDOW_SECONDS:
+        first, windows = _open_windows(audio_path, audio_bytes, audio_suffix)
+        if windows is not None:
+            with closing(windows):
+                return _transcribe_windowed(
+                    itertools.chain([first], windows),
+                    language,
+                    want_words,
+                    diarize,
+                    min_speakers,
+                    max_speakers,
+                )
+        audio = first[1]
+    else:
+        audio = _load_audio(audio_path, audio_bytes, audio_suffix)
+    key, cached = _cache_lookup(audio, language, want_words, diarize, min_speakers, max_speakers)
+    if cached is not None:
+        return cached
+    result = _asr(audio, language, align=want_words or diarize)
+    result = _finish_transcription(
+        result, audio, language, want_words, diarize, min_speakers, max_speakers
+    )
+    _cache_store(key, result)
+    return result
+
 
+def _asr(audio: Any, language: str | None, align: bool = False) -> dict[str, Any]:
+    """ASR for one clip; with align, prefetch its aligner once the language is known."""
     model = _get_whisper(DEFAULT_MODEL)
     # Decoding params (temperature/prompt/beam/...) are baked into the model at
     # load time via ASR_OPTIONS. FasterWhisperPipeline.transcribe only accepts
@@ -420,125 +1064,788 @@ def _transcribe(
         "chunk_size": VAD_OPTIONS["chunk_size"],
         "task": TASK,
     }
-    if language:
-        transcribe_kwargs["language"] = language
+    try:
+        if align:
+            # transcribe() would detect it the same way; detecting up front lets
+            # the aligner load while the clip is decoded.
+            language = language or model.detect_language(audio)
+            _prefetch_align(language)
+        if language:
+            transcribe_kwargs["language"] = language
+        return model.transcribe(audio, **transcribe_kwargs)
+    except Exception as exc:
+        _note_inference_error(exc)
+        raise
 
+
+def _finish_transcription(
+    result: dict[str, Any],
+    audio: Any,
+    language: str | None,
+    want_words: bool,
+    diarize: bool,
+    min_speakers: int | None,
+    max_speakers: int | None,
+) -> dict[str, Any]:
+    """Align, diarize and shape one clip's ASR result into the response dict."""
     try:
-        result = model.transcribe(audio, **transcribe_kwargs)
-        detected_language = result.get("language", language or "")
-
-        # Whisper's translate task emits ENGLISH text, but detected_language is
-        # the SOURCE language of the audio. A source-language wav2vec2 aligner
-        # forced over the English translation produces meaningless word timings
-        # (and, since diarization assigns speakers BY word timing, wrong speakers
-        # too) with no error — a silent 200. Upstream WhisperX refuses to align
-        # in translate mode ("translation cannot be aligned", transcribe.py); we
-        # mirror that: a best-effort want_words degrades to segment-level (logged,
-        # like the unsupported-language path below), while an explicit diarize
-        # request fails loudly (422) rather than returning speaker-less output.
-        if TASK == "translate" and (want_words or diarize):
-            if diarize:
+        result, detected_language, want_words, diarize = _align_stage(
+            result, audio, language, want_words, diarize
+        )
+        speakers = None
+        if diarize:
+            result, speakers = _diarize_stage(result, audio, min_speakers, max_speakers)
+    except Exception as exc:
+        _note_inference_error(exc)
+        raise
+    return _shape_transcription(result, audio, detected_language, want_words, speakers)
+
+
+def _align_stage(
+    result: dict[str, Any],
+    audio: Any,
+    language: str | None,
+    want_words: bool,
+    diarize: bool,
+) -> tuple[dict[str, Any], str, bool, bool]:
+    """Word-align an ASR result when words or speakers were asked for.
+
+    Returns (result, detected_language, want_words, diarize), the flags
+    lowered when alignment degrades.
+    """
+    detected_language = result.get("language", language or "")
+
+    # Whisper's translate task emits ENGLISH text, but detected_language is
+    # the SOURCE language of the audio. A source-language wav2vec2 aligner
+    # forced over the English translation produces meaningless word timings
+    # (and, since diarization assigns speakers BY word timing, wrong speakers
+    # too) with no error — a silent 200. Upstream WhisperX refuses to align
+    # in translate mode ("translation cannot be aligned", transcribe.py); we
+    # mirror that: a best-effort want_words degrades to segment-level (logged,
+    # like the unsupported-language path below), while an explicit diarize
+    # request fails loudly (422) rather than returning speaker-less output.
+    if TASK == "translate" and (want_words or diarize):
+        if diarize:
+            raise HTTPException(
+                status_code=422,
+                detail=(
+                    "diarization is not available with task=translate: the "
+                    "translated (English) output cannot be word-aligned to the "
+                    "source-language audio. Use task=transcribe for diarization."
+                ),
+            )
+        print(
+            "WARN: word-level timestamps unavailable with task=translate "
+            "(translation cannot be aligned); returning segment-level output"
+        )
+        want_words = False
+
+    # Alignment (word-level timestamps). Required if the caller asked for
+    # word granularity OR diarization (word-level speaker assignment needs
+    # word timing).
+    if want_words or diarize:
+        try:
+            align_model, align_metadata = _get_align(detected_language)
+            result = whisperx.align(
+                result["segments"],
+                align_model,
+                align_metadata,
+                audio,
+                _replica().device,
+                return_char_alignments=False,
+            )
+        except (ValueError, NotImplementedError, KeyError) as exc:
+            # These are the only exceptions whisperX raises when a language
+            # genuinely has no wav2vec2 aligner (no default align-model /
+            # unsupported model type / missing metadata key). Only these
+            # degrade gracefully; any other error (CUDA OOM RuntimeError,
+            # network failure fetching the aligner, ...) propagates so it
+            # surfaces as a real 500 instead of a silently-degraded 200.
+            print(f"WARN: alignment failed for language={detected_language}: {exc}")
+            degraded_from_diarize = diarize
+            want_words = False
+            diarize = False
+            result = {"segments": result["segments"]}
+            # Diarization needs word timing, so degradation makes the
+            # requested speakers impossible to produce. Rather than return
+            # 200 with no speakers, tell the caller explicitly. A best-effort
+            # want_words request keeps the silent (logged) fallback above.
+            if degraded_from_diarize:
                 raise HTTPException(
                     status_code=422,
                     detail=(
-                        "diarization is not available with task=translate: the "
-                        "translated (English) output cannot be word-aligned to the "
-                        "source-language audio. Use task=transcribe for diarization."
+                        f"diarization was requested but alignment is unavailable for "
+                        f"language '{detected_language}' (no wav2vec2 aligner); retry "
+                        f"without diarize or with a supported language"
                     ),
-                )
-            print(
-                "WARN: word-level timestamps unavailable with task=translate "
-                "(translation cannot be aligned); returning segment-level output"
-            )
-            want_words = False
+                ) from exc
+    return result, detected_language, want_words, diarize
 
-        # Alignment (word-level timestamps). Required if the caller asked for
-        # word granularity OR diarization (word-level speaker assignment needs
-        # word timing).
-        if want_words or diarize:
-            try:
-                align_model, align_metadata = _get_align(detected_language)
-                result = whisperx.align(
-                    result["segments"],
-                    align_model,
-                    align_metadata,
-                    audio,
-                    DEVICE,
-                    return_char_alignments=False,
-                )
-            except (ValueError, NotImplementedError, KeyError) as exc:
-                # These are the only exceptions whisperX raises when a language
-                # genuinely has no wav2vec2 aligner (no default align-model /
-                # unsupported model type / missing metadata key). Only these
-                # degrade gracefully; any other error (CUDA OOM RuntimeError,
-                # network failure fetching the aligner, ...) propagates so it
-                # surfaces as a real 500 instead of a silently-degraded 200.
-                print(f"WARN: alignment failed for language={detected_language}: {exc}")
-                degraded_from_diarize = diarize
-                want_words = False
-                diarize = False
-                result = {"segments": result["segments"]}
-                # Diarization needs word timing, so degradation makes the
-                # requested speakers impossible to produce. Rather than return
-                # 200 with no speakers, tell the caller explicitly. A best-effort
-                # want_words request keeps the silent (logged) fallback above.
-                if degraded_from_diarize:
-                    raise HTTPException(
-                        status_code=422,
-                        detail=(
-                            f"diarization was requested but alignment is unavailable for "
-                            f"language '{detected_language}' (no wav2vec2 aligner); retry "
-                            f"without diarize or with a supported language"
-                        ),
-                    ) from exc
 
-        speakers: list[str] = []
-        if diarize:
-            if _DIARIZE_PIPELINE is None:
-                raise HTTPException(
-                    status_code=400,
-                    detail="diarization requested but pyannote pipeline is not available",
-                )
-            diar_kwargs: dict[str, Any] = {}
-            if min_speakers is not None:
-                diar_kwargs["min_speakers"] = min_speakers
-            if max_speakers is not None:
-                diar_kwargs["max_speakers"] = max_speakers
-            diarize_segments = _DIARIZE_PIPELINE(audio, **diar_kwargs)
-            result = whisperx.assign_word_speakers(diarize_segments, result)
-            # Collect unique speaker labels in first-seen order.
-            seen: set[str] = set()
-            for seg in result.get("segments", []):
-                spk = seg.get("speaker")
-                if spk and spk not in seen:
-                    seen.add(spk)
-                    speakers.append(spk)
-    except Exception as exc:
-        # A fatal CUDA/device fault corrupts this process's GPU context, so every
-        # later request on this instance will fail too. Flip readiness (=> /ping
-        # 503) so orchestration can drain/replace the host, then re-raise so the
-        # current request still errors. Transient failures — CUDA OOM, the
-        # unsupported-language degrade above, and the 422/400 HTTPExceptions — are
-        # NOT fatal and simply propagate without flipping health.
-        global _HEALTHY
-        if _is_fatal_cuda_error(exc):
-            _HEALTHY = False
-        raise
+def _diarize_stage(
+    result: dict[str, Any],
+    audio: Any,
+    min_speakers: int | None,
+    max_speakers: int | None,
+) -> tuple[dict[str, Any], list[str]]:
+    """Assign speakers to an aligned result; returns (result, speakers)."""
+    pipeline = _diarize_pipeline()
+    diar_kwargs: dict[str, Any] = {}
+    if min_speakers is not None:
+        diar_kwargs["min_speakers"] = min_speakers
+    if max_speakers is not None:
+        diar_kwargs["max_speakers"] = max_speakers
+    diarize_segments = pipeline(audio, **diar_kwargs)
+    result = whisperx.assign_word_speakers(diarize_segments, result)
+    return result, _speaker_labels(result.get("segments", []))
+
+
+def _diarize_pipeline() -> Any:
+    pipeline = _replica().diarize_pipeline
+    if pipeline is None:
+        raise HTTPException(
+            status_code=400,
+            detail="diarization requested but pyannote pipeline is not available",
+        )
+    return pipeline
+
+
+def _speaker_labels(segments: list[dict[str, Any]]) -> list[str]:
+    # Unique speaker labels in first-seen order.
+    speakers: list[str] = []
+    seen: set[str] = set()
+    for seg in segments:
+        spk = seg.get("speaker")
+        if spk and spk not in seen:
+            seen.add(spk)
+            speakers.append(spk)
+    return speakers
+
 
+def _shape_transcription(
+    result: dict[str, Any],
+    audio: Any,
+    detected_language: str,
+    want_words: bool,
+    speakers: list[str] | None,
+    duration: float | None = None,
+) -> dict[str, Any]:
     segments: list[dict[str, Any]] = result.get("segments", [])
     text = " ".join(seg.get("text", "").strip() for seg in segments).strip()
+    if duration is None:
+        duration = float(len(audio)) / 16000.0 if hasattr(audio, "__len__") else 0.0
 
     return {
         "task": TASK,
         "language": detected_language,
-        "duration": float(len(audio)) / 16000.0 if hasattr(audio, "__len__") else 0.0,
+        "duration": duration,
         "text": text,
         "segments": segments,
         "words": _flatten_words(segments) if want_words else None,
-        "speakers": speakers if diarize else None,
+        "speakers": speakers,
     }
 
 
+# ---------------------------------------------------------------------------
+# Windowed long-audio transcription
+# ---------------------------------------------------------------------------
+_Window = tuple[int, np.ndarray, bool]
+
+
+def _open_windows(
+    audio_path: str | None, audio_bytes: bytes | bytearray | None, audio_suffix: str
+) -> tuple[_Window, Iterator[_Window] | None]:
+    """Decode an upload up to its first LONG_AUDIO_WINDOW_SECONDS window.
+
+    Returns (first window, open stream of the others) for audio longer than
+    one window, and (its only window, None) otherwise. Whether an upload is
+    long is decided by its decoded duration, however it was stored.
+    """
+    windows = _iter_windows(
+        _iter_audio_blocks(audio_path, audio_bytes, audio_suffix),
+        int(LONG_AUDIO_WINDOW_SECONDS * _SAMPLE_RATE),
+        int(LONG_AUDIO_OVERLAP_SECONDS * _SAMPLE_RATE),
+    )
+    first = next(windows)
+    if first[2]:
+        windows.close()
+        return first, None
+    return first, windows
+
+
+def _open_long_job(job: dict[str, Any]) -> tuple[_Window, Iterator[_Window]] | None:
+    """_open_windows for a job: (first window, the others) if its audio is long.
+
+    Short audio is kept as job["audio"], so _decode_job does not decode it
+    again, and None is returned.
+    """
+    first, windows = _open_windows(
+        job["audio_path"], job.get("audio_bytes"), job.get("audio_suffix", ".wav")
+    )
+    if windows is None:
+        job["audio"] = first[1]
+        return None
+    return first, windows
+
+
+def _transcribe_long_job(
+    job: dict[str, Any], long_audio: tuple[_Window, Iterator[_Window]], emit: Any = None
+) -> dict[str, Any]:
+    first, windows = long_audio
+    with closing(windows):
+        return _transcribe_windowed(
+            itertools.chain([first], windows),
+            job["language"],
+            job["want_words"],
+            job["diarize"],
+            job["min_speakers"],
+            job["max_speakers"],
+            emit,
+        )
+
+
+@asynccontextmanager
+async def _long_audio_limiters(replica: _Replica) -> AsyncIterator[None]:
+    # A windowed run aligns and diarizes as it goes. Pipelined, those models
+    # have limiters of their own, which it holds as well so that each model
+    # still has one user; taken in stage order, as the stages never nest.
+    if not PIPELINE_STAGES:
+        yield
+        return
+    async with replica.align_limiter, replica.diarize_limiter:
+        yield
+
+
+async def _transcribe_long(
+    job: dict[str, Any], long_audio: tuple[_Window, Iterator[_Window]], replica: _Replica
+) -> dict[str, Any]:
+    """Run _transcribe_windowed for a job whose decoding _open_long_job started."""
+    with closing(long_audio[1]):  # in case we are cancelled before the thread starts
+        async with _long_audio_limiters(replica):
+            return await anyio.to_thread.run_sync(
+                functools.partial(_transcribe_long_job, job, long_audio),
+                limiter=replica.inference_limiter,
+            )
+
+
+def _transcribe_windowed(
+    windows: Iterator[_Window],
+    language: str | None,
+    want_words: bool,
+    diarize: bool,
+    min_speakers: int | None,
+    max_speakers: int | None,
+    emit: Any = None,
+) -> dict[str, Any]:
+    """_transcribe for audio longer than one window, a window at a time.
+
+    Each window goes through ASR, alignment and diarization on its own, and
+    only its segments and word timings are kept, so memory stays flat however
+    long the recording is. The language detected in the first window is used
+    for the rest. Windows overlap; a segment is kept from the window where its
+    midpoint falls before the next window's half of the overlap. A later window
+    may cut the same speech elsewhere, so its segments lose the words that
+    start before the previous kept segment ends; without word timings only
+    segments starting after that are kept. Speech in the overlap appears once.
+    The result skips the cache, which would need the whole waveform to key
+    on. With emit, each kept segment is handed to it as ("segment", segment)
+    once its window is done.
+    """
+    segments: list[dict[str, Any]] = []
+    clusters = _SpeakerClusters(LONG_AUDIO_SPEAKER_SIMILARITY) if diarize else None
+    kept_until = 0.0
+    samples = 0
+    detected_language = language or ""
+    for start, audio, last in windows:
+        offset = start / _SAMPLE_RATE
+        samples = start + len(audio)
+        result = _asr(audio, language, align=want_words or diarize)
+        language = language or result.get("language")
+        try:
+            result, detected_language, want_words, diarize = _align_stage(
+                result, audio, language, want_words, diarize
+            )
+            if diarize:
+                result = _diarize_window(result, audio, clusters, max_speakers)
+        except Exception as exc:
+            _note_inference_error(exc)
+            raise
+        keep_before = samples / _SAMPLE_RATE - LONG_AUDIO_OVERLAP_SECONDS / 2
+        for seg in result.get("segments", []):
+            _shift_timings(seg, offset)
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if not last and midpoint >= keep_before:
+                continue
+            seg = _trim_before(seg, kept_until)
+            if seg is not None:
+                segments.append(seg)
+                if emit is not None:
+                    emit(("segment", dict(seg)))
+        if segments:
+            kept_until = max(kept_until, segments[-1]["end"])
+    speakers = _speaker_labels(segments) if diarize else None
+    return _shape_transcription(
+        {"segments": segments},
+        None,
+        detected_language,
+        want_words,
+        speakers,
+        duration=samples / _SAMPLE_RATE,
+    )
+
+
+def _trim_before(segment: dict[str, Any], until: float) -> dict[str, Any] | None:
+    """segment without the words that start before until; None if none are left.
+
+    A segment without word timings is kept whole or dropped. The text is cut
+    where the last dropped word ends in it, so spacing and punctuation stay
+    whisperx's own, also for languages written without spaces.
+    """
+    if segment["start"] >= until:
+        return segment
+    words = segment.get("words") or []
+    first = next(
+        (i for i, w in enumerate(words) if w.get("start") is not None and w["start"] >= until),
+        None,
+    )
+    if first is None:
+        return None
+    kept = words[first:]
+    text = segment.get("text", "")
+    cut = 0
+    for word in words[:first]:
+        found = text.find(word.get("word", ""), cut)
+        if found < 0:
+            text, cut = " " + " ".join(w.get("word", "") for w in kept), 0
+            break
+        cut = found + len(word.get("word", ""))
+    return {**segment, "start": kept[0]["start"], "text": text[cut:], "words": kept}
+
+
+def _shift_timings(segment: dict[str, Any], offset: float) -> None:
+    # Window-relative to file-relative times, rounded like whisperx's own.
+    for item in [segment, *segment.get("words", [])]:
+        for field in ("start", "end"):
+            if item.get(field) is not None:
+                item[field] = round(item[field] + offset, 3)
+
+
+def _diarize_window(
+    result: dict[str, Any],
+    audio: np.ndarray,
+    clusters: _SpeakerClusters,
+    max_speakers: int | None,
+) -> dict[str, Any]:
+    """Diarize one window and label its speakers with file-wide labels.
+
+    Only max_speakers bounds a window; a window may hold fewer speakers than
+    min_speakers asks of the whole file.
+    """
+    pipeline = _diarize_pipeline()
+    diar_kwargs: dict[str, Any] = {"return_embeddings": True}
+    if max_speakers is not None:
+        diar_kwargs["max_speakers"] = max_speakers
+    diarize_segments, embeddings = pipeline(audio, **diar_kwargs)
+    if embeddings is None:
+        embeddings = dict.fromkeys(diarize_segments["speaker"].unique())
+    diarize_segments["speaker"] = diarize_segments["speaker"].map(clusters.assign(embeddings))
+    return whisperx.assign_word_speakers(diarize_segments, result)
+
+
+class _SpeakerClusters:
+    """File-wide speaker labels for windows diarized one at a time.
+
+    pyannote labels each window's speakers independently. Every label seen so
+    far keeps the running mean of its speakers' unit-length embeddings; a
+    window's speakers are matched to labels greedily by cosine similarity,
+    most similar pair first, one speaker per label, and a speaker with no
+    match at or above threshold starts a new label. A speaker without a
+    usable embedding always gets a new label.
+    """
+
+    def __init__(self, threshold: float):
+        self._threshold = threshold
+        self._sums: list[np.ndarray | None] = []
+
+    def assign(self, embeddings: dict[str, Any]) -> dict[str, str]:
+        """Map a window's {local label: embedding or None} to file-wide labels."""
+        vectors: dict[str, np.ndarray | None] = {}
+        for local, embedding in embeddings.items():
+            vector = None if embedding is None else np.asarray(embedding, dtype=np.float64)
+            norm = 0.0 if vector is None else float(np.linalg.norm(vector))
+            vectors[local] = vector / norm if norm and np.isfinite(norm) else None
+        pairs = [
+            (float(vector @ total) / float(np.linalg.norm(total)), local, j)
+            for local, vector in vectors.items()
+            if vector is not None
+            for j, total in enumerate(self._sums)
+            if total is not None and np.linalg.norm(total)
+        ]
+        matched: dict[str, int] = {}
+        taken: set[int] = set()
+        for similarity, local, j in sorted(pairs, key=lambda p: p[0], reverse=True):
+            if similarity < self._threshold:
+                break
+            if local not in matched and j not in taken:
+                matched[local] = j
+                taken.add(j)
+        for local in sorted(vectors):
+            vector = vectors[local]
+            if local in matched:
+                self._sums[matched[local]] += vector
+            else:
+                matched[local] = len(self._sums)
+                self._sums.append(vector)
+        return {local: f"SPEAKER_{j:02d}" for local, j in matched.items()}
+
+
+async def _transcribe_staged(job: dict[str, Any]) -> dict[str, Any]:
+    """_transcribe as a pipeline of stages, each behind its own limiter.
+
+    Decode runs on up to DECODE_WORKERS threads; ASR, alignment and
+    diarization each on one at a time per replica, so every model is still
+    used by a single thread while request N+1's ASR overlaps request N's
+    alignment or diarization. A request waiting on a busy stage holds its
+    _ADMISSION token, which bounds everything in flight.
+    """
+    replica = _replica()
+    try:
+        audio, key, cached = await anyio.to_thread.run_sync(
+            _decode_job, job, limiter=_DECODE_LIMITER
+        )
+        if cached is not None:
+            return cached
+        if replica.batcher is not None:
+            result = await replica.batcher.transcribe(
+                audio=audio, language=job["language"], align=job["want_words"] or job["diarize"]
+            )
+        else:
+            result = await anyio.to_thread.run_sync(
+                functools.partial(
+                    _asr, audio, job["language"], align=job["want_words"] or job["diarize"]
+                ),
+                limiter=replica.inference_limiter,
+            )
+        align = functools.partial(
+            _align_stage, result, audio, job["language"], job["want_words"], job["diarize"]
+        )
+        if job["want_words"] or job["diarize"]:
+            aligned = await anyio.to_thread.run_sync(align, limiter=replica.align_limiter)
+        else:
+            aligned = align()  # no model involved
+        result, detected_language, want_words, diarize = aligned
+        speakers = None
+        if diarize:
+            result, speakers = await anyio.to_thread.run_sync(
+                functools.partial(
+                    _diarize_stage, result, audio, job["min_speakers"], job["max_speakers"]
+                ),
+                limiter=replica.diarize_limiter,
+            )
+    except Exception as exc:
+        _note_inference_error(exc)
+        raise
+    result = _shape_transcription(result, audio, detected_language, want_words, speakers)
+    _cache_store(key, result)
+    return result
+
+
+def _pipeline_tokenizer(model: Any, language: str) -> Any:
+    # Same construction FasterWhisperPipeline.transcribe uses for a clip whose
+    # language is known; imported here so the server only needs faster-whisper
+    # when batching is enabled.
+    from faster_whisper.tokenizer import Tokenizer
+
+    return Tokenizer(
+        model.model.hf_tokenizer, model.model.model.is_multilingual, task=TASK, language=language
+    )
+
+
+def _numeral_suppressed_options(model: Any, options: Any) -> Any:
+    from whisperx.asr import find_numeral_symbol_tokens
+
+    suppress = set(find_numeral_symbol_tokens(model.tokenizer)) | set(options.suppress_tokens)
+    return dataclasses.replace(options, suppress_tokens=list(suppress))
+
+
+def _transcribe_packed(
+    model: Any, clips: list[tuple[Any, str | None]], align: list[bool] | None = None
+) -> list[dict[str, Any]]:
+    """ASR for several clips in as few batched GPU passes as possible.
+
+    Mirrors FasterWhisperPipeline.transcribe step for step — VAD and chunk
+    merging per clip, language detection for clips without one, the same
+    tokenizer and numeral suppression — except that the chunks of every clip
+    sharing a language go through one pipeline call, so a batch of short clips
+    fills DEFAULT_BATCH_SIZE instead of each clip running it mostly empty.
+    Returns one {"segments", "language"} per clip, in order. align flags the
+    clips whose aligner to prefetch (see _iter_packed).
+    """
+    languages, segments = _iter_packed(model, clips, align)
+    results: list[dict[str, Any]] = [{"segments": [], "language": lang} for lang in languages]
+    for i, segment in segments:
+        results[i]["segments"].append(segment)
+    return results
+
+
+def _iter_packed(
+    model: Any, clips: list[tuple[Any, str | None]], align: list[bool] | None = None
+) -> tuple[list[str], Iterator[tuple[int, dict[str, Any]]]]:
+    """VAD and language detection for clips, then a lazy packed decode.
+
+    Returns (language per clip, iterator of (clip index, segment)); segments
+    come out as the pipeline decodes them, clip by clip within each language.
+    Clips flagged in align have their aligner prefetched before decoding.
+    """
+    vad = model.vad_model
+    spans = []
+    for audio, _ in clips:
+        scores = vad({"waveform": vad.preprocess_audio(audio), "sample_rate": _SAMPLE_RATE})
+        spans.append(
+            vad.merge_chunks(
+                scores,
+                VAD_OPTIONS["chunk_size"],
+                onset=VAD_OPTIONS["vad_onset"],
+                offset=VAD_OPTIONS["vad_offset"],
+            )
+        )
+    languages = [language or model.detect_language(audio) for audio, language in clips]
+    for lang, wanted in zip(languages, align or []):
+        if wanted:
+            _prefetch_align(lang)
+    return languages, _decode_packed(model, clips, spans, languages)
+
+
+def _decode_packed(
+    model: Any,
+    clips: list[tuple[Any, str | None]],
+    spans: list[list[dict[str, Any]]],
+    languages: list[str],
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    by_language: dict[str, list[int]] = {}
+    for i, lang in enumerate(languages):
+        by_language.setdefault(lang, []).append(i)
+
+    # The tokenizer carries the language/task prompt for the whole pass, so it
+    # is set per language and restored afterwards like transcribe() does.
+    tokenizer, options = model.tokenizer, model.options
+    try:
+        for lang, indices in by_language.items():
+            model.tokenizer = _pipeline_tokenizer(model, lang)
+            if model.suppress_numerals:
+                model.options = _numeral_suppressed_options(model, options)
+            owners = [(i, span) for i in indices for span in spans[i]]
+            inputs = (
+                {
+                    "inputs": clips[i][0][
+                        int(span["start"] * _SAMPLE_RATE) : int(span["end"] * _SAMPLE_RATE)
+                    ]
+                }
+                for i, span in owners
+            )
+            outputs = model(inputs, batch_size=DEFAULT_BATCH_SIZE, num_workers=0)
+            for (i, span), out in zip(owners, outputs):
+                text, avg_logprob = out["text"], out["avg_logprob"]
+                if DEFAULT_BATCH_SIZE in (0, 1):
+                    text, avg_logprob = text[0], avg_logprob[0]
+                yield (
+                    i,
+                    {
+                        "text": text,
+                        "start": round(span["start"], 3),
+                        "end": round(span["end"], 3),
+                        "avg_logprob": avg_logprob,
+                    },
+                )
+    finally:
+        model.tokenizer, model.options = tokenizer, options
+
+
+def _transcribe_batch(jobs: list[dict[str, Any]]) -> list[Any]:
+    """Run _transcribe for several requests with one packed ASR pass.
+
+    jobs are _transcribe keyword arguments. Returns, per job, its result dict
+    or the exception it failed with: an undecodable upload or an alignment
+    error fails only its own request, an ASR failure fails the batch.
+    """
+    outcomes: list[Any] = [None] * len(jobs)
+    audios: list[Any] = [None] * len(jobs)
+    keys: list[str | None] = [None] * len(jobs)
+    for i, job in enumerate(jobs):
+        try:
+            audios[i], keys[i], outcomes[i] = _decode_job(job)
+        except Exception as exc:  # noqa: BLE001 — reported to that request only
+            outcomes[i] = exc
+    live = [i for i in range(len(jobs)) if outcomes[i] is None]
+    if not live:
+        return outcomes
+
+    asr_results = _asr_batch(
+        [
+            {
+                "audio": audios[i],
+                "language": jobs[i]["language"],
+                "align": jobs[i]["want_words"] or jobs[i]["diarize"],
+            }
+            for i in live
+        ]
+    )
+    for i, result in zip(live, asr_results):
+        if isinstance(result, Exception):
+            outcomes[i] = result
+            continue
+        job = jobs[i]
+        try:
+            outcomes[i] = _finish_transcription(
+                result,
+                audios[i],
+                job["language"],
+                job["want_words"],
+                job["diarize"],
+                job["min_speakers"],
+                job["max_speakers"],
+            )
+        except Exception as exc:  # noqa: BLE001 — reported to that request only
+            outcomes[i] = exc
+        else:
+            _cache_store(keys[i], outcomes[i])
+    return outcomes
+
+
+def _asr_batch(jobs: list[dict[str, Any]]) -> list[Any]:
+    """Packed ASR for {"audio", "language", "align"} jobs; an ASR failure fails them all."""
+    try:
+        model = _get_whisper(DEFAULT_MODEL)
+        return _transcribe_packed(
+            model,
+            [(job["audio"], job["language"]) for job in jobs],
+            [job.get("align", False) for job in jobs],
+        )
+    except Exception as exc:  # noqa: BLE001 — reported to every request in the batch
+        _note_inference_error(exc)
+        return [exc] * len(jobs)
+
+
+def _run_batch(jobs: list[dict[str, Any]]) -> list[Any]:
+    # With PIPELINE_STAGES the batch is only the ASR stage: requests decode
+    # before joining it and align/diarize after.
+    return _asr_batch(jobs) if PIPELINE_STAGES else _transcribe_batch(jobs)
+
+
+class _ClipBatcher:
+    """Gathers concurrent transcriptions into _run_batch calls.
+
+    One per replica. The first request to find no open batch leads one: it
+    waits up to the window (less if the batch fills), then for limiter (the
+    replica's inference_limiter), and closes
+    the batch only once it holds the limiter — so under load a batch keeps
+    filling while the previous one runs. Later requests join the open batch
+    and wait for the leader to hand them their result.
+    """
+
+    def __init__(self, window_seconds: float, max_requests: int, limiter: anyio.CapacityLimiter):
+        self._window_seconds = window_seconds
+        self._max_requests = max_requests
+        self._limiter = limiter
+        self._open: list[dict[str, Any]] | None = None
+        self._full: anyio.Event | None = None
+
+    async def transcribe(self, **job: Any) -> dict[str, Any]:
+        entry: dict[str, Any] = {"job": job, "done": anyio.Event(), "outcome": None}
+        if self._open is not None and len(self._open) < self._max_requests:
+            self._open.append(entry)
+            if len(self._open) >= self._max_requests:
+                self._full.set()
+            await entry["done"].wait()
+        else:
+            await self._lead(entry)
+        if isinstance(entry["outcome"], BaseException):
+            raise entry["outcome"]
+        return entry["outcome"]
+
+    async def _lead(self, entry: dict[str, Any]) -> None:
+        batch = self._open = [entry]
+        full = self._full = anyio.Event()
+        # Shielded: followers depend on the leader finishing the batch even if
+        # the leader's own client goes away.
+        with anyio.CancelScope(shield=True):
+            try:
+                with anyio.move_on_after(self._window_seconds):
+                    await full.wait()
+                async with self._limiter:
+                    if self._open is batch:
+                        self._open = None
+                    outcomes = await anyio.to_thread.run_sync(_run_batch, [e["job"] for e in batch])
+            except Exception as exc:  # noqa: BLE001 — handed to every waiter
+                outcomes = [exc] * len(batch)
+            finally:
+                if self._open is batch:
+                    self._open = None
+            for e, outcome in zip(batch, outcomes):
+                e["outcome"] = outcome
+                e["done"].set()
+
+
+# ---------------------------------------------------------------------------
+# Replicas
+# ---------------------------------------------------------------------------
+class _Replica:
+    """One independent WhisperX pipeline: its models and the device they use.
+
+    Thread-safety comes from ownership: a request is dispatched to one replica
+    (_dispatch) and only touches that replica's models, each behind the
+    replica's own limiter, so no model is ever used by two threads at once.
+    Code on the inference path finds its replica with _replica().
+    """
+
+    def __init__(self, index: int, device: str, device_index: int):
+        self.index = index
+        self.device = device  # torch device: "cuda:<n>" or "cpu"
+        self.device_index = device_index  # GPU ordinal, for ctranslate2
+        self.whisper: Any = None
+        self.align_lru: OrderedDict[str, tuple[Any, dict[str, Any]]] = OrderedDict()
+        self.align_prefetching: set[str] = set()
+        self.align_stats: dict[str, list[int]] = {}  # language -> [hits, lookups]
+        self.diarize_pipeline: Any = None
+        # whisper_lock / align_lock dedupe concurrent cold loads; inference
+        # itself stays outside them, serialized by the limiters.
+        self.whisper_lock = threading.Lock()
+        self.align_lock = threading.Lock()
+        self.inference_limiter = anyio.CapacityLimiter(1)
+        self.align_limiter = anyio.CapacityLimiter(1)
+        self.diarize_limiter = anyio.CapacityLimiter(1)
+        self.batcher = (
+            _ClipBatcher(BATCH_WINDOW_MS / 1000.0, BATCH_MAX_REQUESTS, self.inference_limiter)
+            if BATCH_WINDOW_MS
+            else None
+        )
+        # Requests dispatched here and not finished yet (queued or running).
+        self.in_flight = 0
+
+
+_REPLICAS = [_Replica(i, device, index) for i, (device, index) in enumerate(_REPLICA_DEVICES)]
+
+# The replica the current request was dispatched to. anyio copies the context
+# into its worker threads, so stage functions see their request's replica;
+# callers outside a request (tests, scripts) get the first.
+_CURRENT_REPLICA: ContextVar[_Replica] = ContextVar("whisperx_replica")
+
+
+def _replica() -> _Replica:
+    return _CURRENT_REPLICA.get(_REPLICAS[0])
+
+
+def _dispatch() -> _Replica:
+    """Pick the least-loaded replica for a request and count it there.
+
+    Runs on the event loop, so in_flight needs no lock; the caller decrements
+    it when the request finishes.
+    """
+    replica = min(_REPLICAS, key=lambda r: r.in_flight)
+    replica.in_flight += 1
+    return replica
+
+
 def _format_response(
     result: dict[str, Any],
     response_format: str,
@@ -548,42 +1855,355 @@ def _format_response(
     max_line_count: int | None = None,
     highlight_words: bool = False,
 ):
-    segments = result["segments"]
-    # A subtitle knob being set routes srt/vtt through WhisperX's SubtitlesWriter
-    # (byte-identical to the CLI). With no knob set we keep the legacy
-    # _to_srt/_to_vtt so default srt/vtt output is unchanged. The knobs are
-    # subtitle-only: json/text/verbose_json ignore them (mirroring WhisperX).
-    subtitle_knob = max_line_width is not None or max_line_count is not None or highlight_words
     if response_format == "text":
         return PlainTextResponse(result["text"])
-    if response_format == "srt":
-        if subtitle_knob:
-            body = _render_subtitle(result, "srt", max_line_width, max_line_count, highlight_words)
-        else:
-            body = _to_srt(segments)
-        return PlainTextResponse(body, media_type="application/x-subrip")
-    if response_format == "vtt":
-        if subtitle_knob:
-            body = _render_subtitle(result, "vtt", max_line_width, max_line_count, highlight_words)
-        else:
-            body = _to_vtt(segments)
-        return PlainTextResponse(body, media_type="text/vtt")
+    if response_format in {"srt", "vtt"}:
+        body = _subtitle_body(
+            result, response_format, max_line_width, max_line_count, highlight_words
+        )
+        return PlainTextResponse(body, media_type=_SUBTITLE_MEDIA_TYPES[response_format])
     if response_format == "json":
         return JSONResponse({"text": result["text"]})
 
+    return JSONResponse(_verbose_payload(result, want_words, diarize))
+
+
+_SUBTITLE_MEDIA_TYPES = {"srt": "application/x-subrip", "vtt": "text/vtt"}
+
+
+def _subtitle_knob(
+    max_line_width: int | None, max_line_count: int | None, highlight_words: bool
+) -> bool:
+    return max_line_width is not None or max_line_count is not None or highlight_words
+
+
+def _subtitle_body(
+    result: dict[str, Any],
+    fmt: str,
+    max_line_width: int | None,
+    max_line_count: int | None,
+    highlight_words: bool,
+) -> str:
+    # A subtitle knob being set routes srt/vtt through WhisperX's SubtitlesWriter
+    # (byte-identical to the CLI). With no knob set we keep the legacy
+    # _to_srt/_to_vtt so default srt/vtt output is unchanged. The knobs are
+    # subtitle-only: json/text/verbose_json ignore them (mirroring WhisperX).
+    if _subtitle_knob(max_line_width, max_line_count, highlight_words):
+        return _render_subtitle(result, fmt, max_line_width, max_line_count, highlight_words)
+    return _to_srt(result["segments"]) if fmt == "srt" else _to_vtt(result["segments"])
+
+
+def _verbose_payload(result: dict[str, Any], want_words: bool, diarize: bool) -> dict[str, Any]:
     # verbose_json — full payload, trimmed to what the caller asked for.
     payload: dict[str, Any] = {
         "task": result["task"],
         "language": result["language"],
         "duration": result["duration"],
         "text": result["text"],
-        "segments": segments,
+        "segments": result["segments"],
     }
     if want_words and result.get("words") is not None:
         payload["words"] = result["words"]
     if diarize and result.get("speakers"):
         payload["speakers"] = result["speakers"]
-    return JSONResponse(payload)
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Streaming responses (stream=true)
+# ---------------------------------------------------------------------------
+# A streamed request runs the same stages as _transcribe, but ASR segments are
+# sent to the client as each VAD chunk decodes, so the first bytes arrive after
+# VAD plus one batch regardless of file length. json/text/verbose_json stream
+# as server-sent events in OpenAI's transcription-stream shape
+# (transcript.text.delta ... transcript.text.done) plus, for verbose_json, the
+# segment on each delta and transcript.words / transcript.speakers events once
+# alignment and diarization finish. Plain srt/vtt stream cue by cue; when a
+# subtitle knob, word timestamps or diarization is requested, alignment can
+# re-time the segments, so the subtitle is sent whole at the end instead.
+# Errors after the response has started are sent as an "error" event (srt/vtt:
+# the stream just ends).
+#
+# Events pass from the ASR worker thread through a bounded buffer; a client
+# slower than decoding eventually pauses ASR rather than growing memory.
+_STREAM_MAX_PENDING_EVENTS = 1024
+
+
+class _StreamCleanup:
+    """Frees a streamed request's upload, replica slot and admission token, once."""
+
+    def __init__(self, upload: ExitStack, replica: _Replica):
+        self._upload = upload
+        self.replica = replica
+        self._done = False
+
+    def __call__(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        try:
+            self._upload.close()
+        finally:
+            self.replica.in_flight -= 1
+            _ADMISSION.release()
+
+
+def _stream_asr(audio: Any, language: str | None, emit: Any, align: bool = False) -> dict[str, Any]:
+    """ASR for one clip, handing each segment to emit as it is decoded."""
+    model = _get_whisper(DEFAULT_MODEL)
+    languages, decoded = _iter_packed(model, [(audio, language)], [align])
+    segments: list[dict[str, Any]] = []
+    with closing(decoded):
+        for _, segment in decoded:
+            segments.append(segment)
+            emit(("segment", segment))
+    return {"segments": segments, "language": languages[0]}
+
+
+async def _run_stage(fn: Any, limiter: anyio.CapacityLimiter) -> Any:
+    # Without PIPELINE_STAGES the whole streamed request already holds its
+    # replica's inference_limiter (see _produce_events), as _transcribe would.
+    return await anyio.to_thread.run_sync(fn, limiter=limiter if PIPELINE_STAGES else None)
+
+
+async def _produce_events(job: dict[str, Any], post: bool, replica: _Replica, send: Any) -> None:
+    """Run one request's stages, sending (kind, value) events to send.
+
+    kind is "segment", then — when post — "aligned" (if words were wanted),
+    "diarized" (if speakers were) and "done" with the _transcribe-shaped
+    result; or "error" with the exception.
+    """
+
+    def emit(event: tuple[str, Any]) -> None:  # called from the ASR thread
+        anyio.from_thread.run(send.send, event)
+
+    _CURRENT_REPLICA.set(replica)  # this task's context, copied into its threads
+    async with send:
+        try:
+            async with nullcontext() if PIPELINE_STAGES else replica.inference_limiter:
+                if LONG_AUDIO_WINDOW_SECONDS:
+                    long_audio = await _run_stage(
+                        functools.partial(_open_long_job, job), _DECODE_LIMITER
+                    )
+                    if long_audio is not None:
+                        # Segments arrive a window at a time, already aligned.
+                        with closing(long_audio[1]):
+                            async with _long_audio_limiters(replica):
+                                result = await _run_stage(
+                                    functools.partial(_transcribe_long_job, job, long_audio, emit),
+                                    replica.inference_limiter,
+                                )
+                        if post:
+                            await _send_result_events(result, send)
+                        return
+                audio, key, cached = await _run_stage(
+                    functools.partial(_decode_job, job), _DECODE_LIMITER
+                )
+                if cached is not None:
+                    await _replay_cached(cached, post, send)
+                    return
+                result = await _run_stage(
+                    functools.partial(
+                        _stream_asr,
+                        audio,
+                        job["language"],
+                        emit,
+                        post and (job["want_words"] or job["diarize"]),
+                    ),
+                    replica.inference_limiter,
+                )
+                if not post:
+                    # Nothing left to run (no words or speakers were asked
+                    # for), so shaping the result for the cache is free.
+                    if key is not None:
+                        shaped = _finish_transcription(
+                            result,
+                            audio,
+                            job["language"],
+                            job["want_words"],
+                            job["diarize"],
+                            job["min_speakers"],
+                            job["max_speakers"],
+                        )
+                        _cache_store(key, shaped)
+                    return
+                result, detected_language, want_words, diarize = await _run_stage(
+                    functools.partial(
+                        _align_stage,
+                        result,
+                        audio,
+                        job["language"],
+                        job["want_words"],
+                        job["diarize"],
+                    ),
+                    replica.align_limiter,
+                )
+                if want_words:
+                    await send.send(("aligned", result))
+                speakers = None
+                if diarize:
+                    result, speakers = await _run_stage(
+                        functools.partial(
+                            _diarize_stage,
+                            result,
+                            audio,
+                            job["min_speakers"],
+                            job["max_speakers"],
+                        ),
+                        replica.diarize_limiter,
+                    )
+                    await send.send(("diarized", (result, speakers)))
+                result = _shape_transcription(
+                    result, audio, detected_language, want_words, speakers
+                )
+                _cache_store(key, result)
+                await send.send(("done", result))
+        except anyio.BrokenResourceError:
+            pass  # the client went away; the thread stopped at its next segment
+        except Exception as exc:  # noqa: BLE001 — reported in-band, the response has started
+            _note_inference_error(exc)
+            with suppress(anyio.BrokenResourceError):
+                await send.send(("error", exc))
+
+
+async def _replay_cached(cached: dict[str, Any], post: bool, send: Any) -> None:
+    # The same events a fresh run sends, from a cached _transcribe result.
+    for segment in cached["segments"]:
+        await send.send(("segment", segment))
+    if post:
+        await _send_result_events(cached, send)
+
+
+async def _send_result_events(result: dict[str, Any], send: Any) -> None:
+    # The events after the segments, from a finished _transcribe result.
+    if result["words"] is not None:
+        await send.send(("aligned", result))
+    if result["speakers"] is not None:
+        await send.send(("diarized", (result, result["speakers"])))
+    await send.send(("done", result))
+
+
+async def _stream_events(
+    job: dict[str, Any], post: bool, replica: _Replica
+) -> AsyncIterator[tuple[str, Any]]:
+    send, receive = anyio.create_memory_object_stream(_STREAM_MAX_PENDING_EVENTS)
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(_produce_events, job, post, replica, send)
+        async with receive:
+            async for event in receive:
+                yield event
+
+
+def _sse(event: dict[str, Any]) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def _stream_error(exc: Exception) -> dict[str, Any]:
+    if isinstance(exc, HTTPException):
+        return {"message": exc.detail, "code": exc.status_code}
+    return {"message": "internal error during transcription", "code": 500}
+
+
+async def _stream_body(
+    job: dict[str, Any],
+    response_format: str,
+    want_words: bool,
+    diarize: bool,
+    max_line_width: int | None,
+    max_line_count: int | None,
+    highlight_words: bool,
+    cleanup: _StreamCleanup,
+) -> AsyncIterator[str]:
+    subtitles = response_format in {"srt", "vtt"}
+    cue_by_cue = subtitles and not (
+        want_words or diarize or _subtitle_knob(max_line_width, max_line_count, highlight_words)
+    )
+    verbose = response_format == "verbose_json"
+    try:
+        cues = 0
+        if cue_by_cue and response_format == "vtt":
+            yield _VTT_HEADER
+        async for kind, value in _stream_events(job, not cue_by_cue, cleanup.replica):
+            if kind == "error":
+                if subtitles:
+                    print(f"WARN: streamed {response_format} transcription failed: {value!r}")
+                else:
+                    yield _sse({"type": "error", "error": _stream_error(value)})
+                return
+            if subtitles:
+                if kind == "segment" and cue_by_cue:
+                    cues += 1
+                    if response_format == "srt":
+                        cue = _srt_cue(cues, value)
+                        yield cue if cues == 1 else "\n" + cue
+                    else:
+                        yield "\n" + _vtt_cue(value)
+                elif kind == "done":
+                    yield _subtitle_body(
+                        value, response_format, max_line_width, max_line_count, highlight_words
+                    )
+                continue
+            if kind == "segment":
+                text = value.get("text", "").strip()
+                event = {
+                    "type": "transcript.text.delta",
+                    "delta": text if cues == 0 else " " + text,
+                }
+                cues += 1
+                if verbose:
+                    event["segment"] = value
+            elif kind == "aligned":
+                if not verbose:
+                    continue
+                event = {"type": "transcript.words", "words": _flatten_words(value["segments"])}
+            elif kind == "diarized":
+                if not verbose:
+                    continue
+                result, speakers = value
+                event = {
+                    "type": "transcript.speakers",
+                    "speakers": speakers,
+                    "segments": result["segments"],
+                }
+            else:
+                event = {"type": "transcript.text.done", "text": value["text"]}
+                if verbose:
+                    event.update(_verbose_payload(value, want_words, diarize))
+            yield _sse(event)
+    finally:
+        cleanup()
+
+
+def _streaming_response(
+    job: dict[str, Any],
+    response_format: str,
+    want_words: bool,
+    diarize: bool,
+    max_line_width: int | None,
+    max_line_count: int | None,
+    highlight_words: bool,
+    cleanup: _StreamCleanup,
+) -> StreamingResponse:
+    media_type = _SUBTITLE_MEDIA_TYPES.get(response_format, "text/event-stream")
+    # cleanup also runs as a background task in case the body is never iterated
+    # (client gone before the first chunk); it only acts once.
+    background = BackgroundTasks()
+    background.add_task(cleanup)
+    return StreamingResponse(
+        _stream_body(
+            job,
+            response_format,
+            want_words,
+            diarize,
+            max_line_width,
+            max_line_count,
+            highlight_words,
+            cleanup,
+        ),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache"},
+        background=background,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -601,6 +2221,32 @@ def ping():
     return JSONResponse({"status": "unavailable"}, status_code=503)
 
 
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """Result cache counters in the Prometheus text format.
+
+    All zero while the cache is off (WHISPERX_RESULT_CACHE_BYTES and
+    WHISPERX_RESULT_CACHE_DIR unset).
+    """
+    hits, misses, memory_bytes, disk_bytes = {"memory": 0, "disk": 0}, 0, 0, 0
+    if _RESULT_CACHE is not None:
+        hits, misses = _RESULT_CACHE.hits, _RESULT_CACHE.misses
+        memory_bytes, disk_bytes = _RESULT_CACHE.memory_bytes, _RESULT_CACHE.disk_bytes
+    lines = [
+        "# HELP whisperx_result_cache_hits_total Transcriptions served from the result cache.",
+        "# TYPE whisperx_result_cache_hits_total counter",
+        *(f'whisperx_result_cache_hits_total{{tier="{tier}"}} {n}' for tier, n in hits.items()),
+        "# HELP whisperx_result_cache_misses_total Transcriptions not found in the result cache.",
+        "# TYPE whisperx_result_cache_misses_total counter",
+        f"whisperx_result_cache_misses_total {misses}",
+        "# HELP whisperx_result_cache_bytes Encoded results held by each cache tier.",
+        "# TYPE whisperx_result_cache_bytes gauge",
+        f'whisperx_result_cache_bytes{{tier="memory"}} {memory_bytes}',
+        f'whisperx_result_cache_bytes{{tier="disk"}} {disk_bytes}',
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
 @app.get("/v1/models")
 def list_models() -> dict[str, Any]:
     """Advertise the single served model id for OpenAI-client compatibility.
@@ -632,6 +2278,7 @@ async def _handle_transcription(
     max_line_width: int | None = None,
     max_line_count: int | None = None,
     highlight_words: bool = False,
+    stream: bool = False,
 ):
     valid_formats = {"json", "text", "srt", "vtt", "verbose_json"}
     if response_format not in valid_formats:
@@ -665,16 +2312,21 @@ async def _handle_transcription(
     # Admission control: take a non-blocking token from the hard-capped
     # _ADMISSION semaphore before we touch the body, so an overload is shed with
     # 503 without reading or spooling the upload. Cheap validation above runs
-    # first, so a bad request never consumes a token. Released in finally.
+    # first, so a bad request never consumes a token. Released in finally, or
+    # by the stream once it ends for stream=true.
     if not _ADMISSION.acquire(blocking=False):
         raise HTTPException(503, "server busy: inference queue full")
+    cleanup = None
     try:
         suffix = Path(file.filename or "audio.wav").suffix or ".wav"
-        # Stream the upload to a temp file in chunks with an incremental size
-        # cap, so a large/hostile upload never materializes as one big bytes
-        # object in RAM and is rejected (413) mid-stream. WhisperX/faster-whisper
-        # read from a path (ffmpeg subprocess), so a spooled temp file is needed.
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=True) as tmp:
+        # Stream the upload in chunks with an incremental size cap, so a
+        # large/hostile upload is rejected (413) mid-stream. Up to
+        # IN_MEMORY_UPLOAD_BYTES it is kept in RAM and decoded in-process; past
+        # that it spills to a temp file, so a big upload never materializes as
+        # one large buffer, and is decoded from the path by ffmpeg.
+        with ExitStack() as stack:
+            buf = bytearray()
+            tmp = None
             total = 0
             while True:
                 chunk = await file.read(_UPLOAD_CHUNK_BYTES)
@@ -683,25 +2335,72 @@ async def _handle_transcription(
                 total += len(chunk)
                 if total > MAX_UPLOAD_BYTES:
                     raise HTTPException(413, f"upload exceeds {MAX_UPLOAD_BYTES} bytes")
-                tmp.write(chunk)
+                if tmp is None and total > IN_MEMORY_UPLOAD_BYTES:
+                    tmp = stack.enter_context(
+                        tempfile.NamedTemporaryFile(suffix=suffix, delete=True)
+                    )
+                    tmp.write(buf)
+                    buf = bytearray()
+                if tmp is not None:
+                    tmp.write(chunk)
+                else:
+                    buf += chunk
             if total == 0:
                 raise HTTPException(400, "empty audio upload")
-            tmp.flush()
-            # _transcribe is synchronous + long-running (GPU + ffmpeg); offload to
-            # a worker thread (serialized by _INFERENCE_LIMITER, capacity 1) so the
-            # event loop / GET /ping stays responsive.
-            result = await anyio.to_thread.run_sync(
-                functools.partial(
-                    _transcribe,
-                    audio_path=tmp.name,
-                    language=language,
-                    want_words=want_words or subtitle_formatting,
-                    diarize=diarize,
-                    min_speakers=min_speakers,
-                    max_speakers=max_speakers,
-                ),
-                limiter=_INFERENCE_LIMITER,
-            )
+            if tmp is not None:
+                tmp.flush()
+            job = {
+                "audio_path": tmp.name if tmp is not None else None,
+                "audio_bytes": buf if tmp is None else None,
+                "audio_suffix": suffix,
+                "language": language,
+                "want_words": want_words or subtitle_formatting,
+                "diarize": diarize,
+                "min_speakers": min_speakers,
+                "max_speakers": max_speakers,
+            }
+            replica = _dispatch()
+            if stream:
+                # The response outlives this call: the stream takes over the
+                # upload, the replica slot and the admission token and frees
+                # them when it ends.
+                cleanup = _StreamCleanup(stack.pop_all(), replica)
+                return _streaming_response(
+                    job,
+                    response_format,
+                    want_words,
+                    diarize,
+                    max_line_width,
+                    max_line_count,
+                    highlight_words,
+                    cleanup,
+                )
+            token = _CURRENT_REPLICA.set(replica)
+            try:
+                long_audio = None
+                if LONG_AUDIO_WINDOW_SECONDS and (PIPELINE_STAGES or replica.batcher is not None):
+                    # Staging and batching take whole clips: decode up to one
+                    # window first, and transcribe anything longer windowed.
+                    long_audio = await anyio.to_thread.run_sync(
+                        _open_long_job, job, limiter=_DECODE_LIMITER
+                    )
+                if long_audio is not None:
+                    result = await _transcribe_long(job, long_audio, replica)
+                elif PIPELINE_STAGES:
+                    result = await _transcribe_staged(job)
+                elif replica.batcher is not None:
+                    result = await replica.batcher.transcribe(**job)
+                else:
+                    # _transcribe is synchronous + long-running (GPU + ffmpeg);
+                    # offload to a worker thread (serialized by the replica's
+                    # inference_limiter, capacity 1) so the event loop / GET
+                    # /ping stays responsive.
+                    result = await anyio.to_thread.run_sync(
+                        functools.partial(_transcribe, **job), limiter=replica.inference_limiter
+                    )
+            finally:
+                _CURRENT_REPLICA.reset(token)
+                replica.in_flight -= 1
         return _format_response(
             result,
             response_format,
@@ -712,7 +2411,8 @@ async def _handle_transcription(
             highlight_words,
         )
     finally:
-        _ADMISSION.release()
+        if cleanup is None:
+            _ADMISSION.release()
 
 
 @app.post("/v1/audio/transcriptions")
@@ -727,6 +2427,7 @@ async def transcribe(
     max_line_width: int | None = Form(None),
     max_line_count: int | None = Form(None),
     highlight_words: bool = Form(False),
+    stream: bool = Form(False),
 ):
     return await _handle_transcription(
         file=file,
@@ -739,6 +2440,7 @@ async def transcribe(
         max_line_width=max_line_width,
         max_line_count=max_line_count,
         highlight_words=highlight_words,
+        stream=stream,
     )
 
 
@@ -754,6 +2456,7 @@ async def invocations(
     max_line_width: int | None = Form(None),
     max_line_count: int | None = Form(None),
     highlight_words: bool = Form(False),
+    stream: bool = Form(False),
 ):
     return await _handle_transcription(
         file=file,
@@ -766,4 +2469,5 @@ async def invocations(
         max_line_width=max_line_width,
         max_line_count=max_line_count,
         highlight_words=highlight_words,
+        stream=stream,
     )
@@ -12,6 +12,7 @@ import glob
 import os
 import shutil
 import subprocess
+import sys
 import unittest
 
 DEVICE = os.environ.get("EXPECTED_DEVICE", "").lower()
@@ -112,6 +113,8 @@ class TestHandlerFiles(unittest.TestCase):
         "/sagemaker/serve.py",
         "/sagemaker/python_service.py",
         "/sagemaker/tfs_utils.py",
+        "/sagemaker/tfs_grpc_utils.py",
+        "/sagemaker/tfs_protos.py",
         "/sagemaker/multi_model_utils.py",
         "/sagemaker/tensorflowServing.js",
         "/sagemaker/nginx.conf.template",
@@ -146,6 +149,49 @@ class TestHandlerImports(unittest.TestCase):
         import requests  # noqa: F401
 
 
+@sagemaker_only
+class TestHandlerGrpc(unittest.TestCase):
+    """python_service's gRPC path (grpc protocol, npy/npz, shared-TFS MME and
+    the warm pool) must work without the tensorflow framework wheel."""
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, "/sagemaker")
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove("/sagemaker")
+
+    def test_grpc_available(self):
+        import tfs_grpc_utils
+
+        self.assertTrue(tfs_grpc_utils.grpc_available())
+
+    def test_tensor_round_trip(self):
+        import numpy as np
+        import tfs_grpc_utils
+        import tfs_protos
+
+        array = np.arange(6, dtype=np.float32).reshape(2, 3)
+        proto = tfs_grpc_utils.make_tensor_proto(array, tfs_protos.DT_FLOAT)
+        wire = tfs_protos.TensorProto.FromString(proto.SerializeToString())
+        np.testing.assert_array_equal(tfs_grpc_utils.make_ndarray(wire), array)
+
+    def test_reload_config_parses_model_config(self):
+        import tfs_protos
+        from google.protobuf import text_format
+
+        request = tfs_protos.ReloadConfigRequest()
+        text_format.Parse(
+            "model_config_list: { config: { name: 'm' base_path: '/opt/ml/models/m/model' "
+            "model_platform: 'tensorflow' model_version_policy: { specific: { versions: 1 } } } }",
+            request.config,
+        )
+        config = request.config.model_config_list.config[0]
+        self.assertEqual(config.name, "m")
+        self.assertEqual(list(config.model_version_policy.specific.versions), [1])
+
+
 class TestEntrypoints(unittest.TestCase):
     """SageMaker entrypoint scripts wired via ENTRYPOINT/CMD."""
 
@@ -1,7 +1,9 @@
 """Content-Type negotiation tests for TF 2.20 inference DLC.
 
-Focuses on text/csv — the njs csv_request handler converts CSV rows into a
-{"instances": [[...], [...]]} body before forwarding to TFS.
+Mostly text/csv — the njs csv_request handler converts CSV rows into a
+{"instances": [[...], [...]]} body before forwarding to TFS. application/x-npy
+is handed to python_service and sent to TFS over gRPC when
+SAGEMAKER_TFS_ENABLE_NUMPY opts in.
 """
 
 from __future__ import annotations
@@ -91,3 +93,37 @@ def test_csv_mixed_type_produces_valid_error(
         assert 400 <= status < 500, (
             f"expected 4xx from TFS on string input to numeric model, got {status}"
         )
+
+
+def test_npy_content_type_round_trip(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """application/x-npy in and out skips JSON; python_service sends it over gRPC."""
+    import io
+
+    import numpy as np
+
+    with tempfile.TemporaryDirectory(prefix="tf220-npy-") as workdir:
+        tar_path = build_sample_model(output_dir=workdir, multiplier=2.0)
+        model_data = upload_tarball(
+            sagemaker_session,
+            tar_path,
+            key_prefix=f"tf220-inference-tests/npy/{random_suffix_name('run', 63)}",
+        )
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=model_data,
+            container_env={"SAGEMAKER_TFS_ENABLE_NUMPY": "true"},
+            name_prefix="tf220-npy",
+        )
+
+        buf = io.BytesIO()
+        np.save(buf, np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], dtype=np.float32))
+        result = endpoint.invoke(
+            body=buf.getvalue(),
+            content_type="application/x-npy",
+            accept="application/x-npy",
+        )
+        output = np.load(io.BytesIO(result.body.read()), allow_pickle=False)
+        assert output.shape == (2, 3), f"expected (2, 3) output, got {output.shape}"
+        assert output.tolist() == pytest.approx([[2.0, 4.0, 6.0], [8.0, 10.0, 12.0]])
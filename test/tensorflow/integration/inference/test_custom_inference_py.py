@@ -6,15 +6,44 @@ input_handler + output_handler; asserts both fire end-to-end via markers.
 
 from __future__ import annotations
 
+import concurrent.futures
 import json
 import tempfile
 
 import pytest
+from botocore.exceptions import ClientError
 from test_utils import random_suffix_name
 
 from .resources.build_sample_model import build_sample_model
 from .resources.helpers import CUSTOM_INFERENCE_PY, upload_tarball
 
+# input_handler that leaves CSV -> {"instances": ...} to the container's converter
+TO_TFS_JSON_INFERENCE_PY = """\
+def input_handler(data, context):
+    return context.to_tfs_json(data.read())
+
+
+def output_handler(response, context):
+    return response.content, context.accept_header
+"""
+
+# handler that answers text/plain requests with the container's own /metrics
+METRICS_INFERENCE_PY = """\
+import os
+
+import requests
+
+
+def handler(data, context):
+    if context.request_content_type == "text/plain":
+        port = os.environ.get("SAGEMAKER_BIND_TO_PORT", "8080")
+        metrics = requests.get("http://localhost:{}/metrics".format(port), timeout=10)
+        metrics.raise_for_status()
+        return metrics.content, "text/plain"
+    response = requests.post(context.rest_uri, data=data.read(), timeout=30)
+    return response.content, context.accept_header
+"""
+
 
 def test_custom_inference_py_handlers(
     sagemaker_session,
@@ -69,3 +98,158 @@ def test_custom_inference_py_handlers(
         assert marker_values == pytest.approx([18.0, 18.0, 18.0]), (
             f"marker row got {marker_values!r}"
         )
+
+
+def test_custom_inference_py_to_tfs_json(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """context.to_tfs_json converts CSV the way nginx does for handler-less models."""
+    with tempfile.TemporaryDirectory(prefix="tf220-to-tfs-json-") as workdir:
+        tar_path = build_sample_model(
+            output_dir=workdir,
+            multiplier=2.0,
+            code_files={"inference.py": TO_TFS_JSON_INFERENCE_PY},
+        )
+        model_data = upload_tarball(
+            sagemaker_session,
+            tar_path,
+            key_prefix=f"tf220-inference-tests/to-tfs-json/{random_suffix_name('run', 63)}",
+        )
+
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=model_data,
+            name_prefix="tf220-to-tfs-json",
+        )
+
+        result = endpoint.invoke(
+            body=b"1.0,2.0,3.0\n4.0, 5.0, 6.0\r\n",
+            content_type="text/csv",
+            accept="application/json",
+        )
+        rows = json.loads(result.body.read().decode("utf-8"))["predictions"]
+        assert len(rows) == 2, f"expected 2 rows from CSV input, got {len(rows)}: {rows!r}"
+
+        def _values(row):
+            return row["output"] if isinstance(row, dict) and "output" in row else row
+
+        assert _values(rows[0]) == pytest.approx([2.0, 4.0, 6.0]), f"row 1 got {rows[0]!r}"
+        assert _values(rows[1]) == pytest.approx([8.0, 10.0, 12.0]), f"row 2 got {rows[1]!r}"
+
+        # a body that is not UTF-8 is a client error, not a handler crash
+        with pytest.raises(ClientError) as excinfo:
+            endpoint.invoke(
+                body=b"1.0,\xff\xfe,3.0\n",
+                content_type="text/csv",
+                accept="application/json",
+            )
+        assert int(excinfo.value.response.get("OriginalStatusCode", 0)) == 400, (
+            f"expected 400 for non-UTF-8 CSV, got {excinfo.value.response!r}"
+        )
+
+
+def test_custom_inference_py_micro_batching(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """Concurrent invocations coalesced by SAGEMAKER_TFS_MICRO_BATCHING each get their own rows."""
+    with tempfile.TemporaryDirectory(prefix="tf220-micro-batch-") as workdir:
+        tar_path = build_sample_model(
+            output_dir=workdir,
+            multiplier=2.0,
+            code_files={"inference.py": CUSTOM_INFERENCE_PY},
+        )
+        model_data = upload_tarball(
+            sagemaker_session,
+            tar_path,
+            key_prefix=f"tf220-inference-tests/micro-batch/{random_suffix_name('run', 63)}",
+        )
+
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=model_data,
+            name_prefix="tf220-micro-batch",
+            container_env={
+                "SAGEMAKER_TFS_MICRO_BATCHING": "true",
+                "SAGEMAKER_TFS_MICRO_BATCH_MAX_SIZE": "16",
+                "SAGEMAKER_TFS_MICRO_BATCH_MAX_WAIT_MS": "20",
+            },
+        )
+
+        def invoke(i):
+            payload = json.dumps({"instances": [[float(i), float(i), float(i)]]})
+            result = endpoint.invoke(
+                body=payload,
+                content_type="application/json",
+                accept="application/json",
+            )
+            return i, json.loads(result.body.read().decode("utf-8"))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(invoke, range(32)))
+
+        def _values(row):
+            return row["output"] if isinstance(row, dict) and "output" in row else row
+
+        for i, body in results:
+            # input_handler prepends the [9,9,9] marker row to every request.
+            predictions = body["predictions"]
+            assert body.get("_handler_marker") == "input_output_ok", f"request {i}: {body!r}"
+            assert len(predictions) == 2, f"request {i} got another request's rows: {body!r}"
+            assert _values(predictions[0]) == pytest.approx([18.0] * 3), f"request {i}: {body!r}"
+            assert _values(predictions[1]) == pytest.approx([2.0 * i] * 3), (
+                f"request {i} got {predictions[1]!r}"
+            )
+
+
+def test_custom_inference_py_metrics(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """SAGEMAKER_TFS_METRICS exposes request counts, latency and in-flight gauges on /metrics."""
+    with tempfile.TemporaryDirectory(prefix="tf220-metrics-") as workdir:
+        tar_path = build_sample_model(
+            output_dir=workdir,
+            multiplier=2.0,
+            code_files={"inference.py": METRICS_INFERENCE_PY},
+        )
+        model_data = upload_tarball(
+            sagemaker_session,
+            tar_path,
+            key_prefix=f"tf220-inference-tests/metrics/{random_suffix_name('run', 63)}",
+        )
+
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=model_data,
+            name_prefix="tf220-metrics",
+            container_env={"SAGEMAKER_TFS_METRICS": "true"},
+        )
+
+        payload = json.dumps({"instances": [[1.0, 2.0, 3.0]]})
+        for _ in range(3):
+            endpoint.invoke(
+                body=payload, content_type="application/json", accept="application/json"
+            )
+
+        result = endpoint.invoke(body=b"metrics", content_type="text/plain", accept="text/plain")
+        metrics = result.body.read().decode("utf-8")
+        samples = dict(
+            line.rsplit(" ", 1) for line in metrics.splitlines() if not line.startswith("#")
+        )
+
+        requests_ok = [
+            float(value)
+            for name, value in samples.items()
+            if name.startswith("sagemaker_tfs_requests_total{") and 'code="200"' in name
+        ]
+        assert sum(requests_ok) >= 3, f"invocations not counted: {metrics}"
+        assert any(
+            name.startswith("sagemaker_tfs_request_duration_seconds_count{") for name in samples
+        ), metrics
+        assert "sagemaker_tfs_request_queue_seconds_count" in samples, metrics
+        # the scrape itself is an invocation in flight to a TFS instance
+        in_flight = [
+            float(value)
+            for name, value in samples.items()
+            if name.startswith("sagemaker_tfs_instance_in_flight{")
+        ]
+        assert in_flight and sum(in_flight) >= 1, metrics
@@ -3,12 +3,12 @@ a single MME endpoint must all succeed with correct per-model predictions.
 
 Exercises:
     - multi_model_utils.lock() under concurrent load
-    - _mme_tfs_instances_status cross-worker consistency via pickle
+    - _mme_tfs_instances_status cross-worker consistency via the SQLite registry
     - Per-model TFS instance routing
     - SAGEMAKER_GUNICORN_WORKERS > 1 request handling
 
 Guards against:
-    - Non-atomic pickle write bricking MME state
+    - Partial registry writes bricking MME state
     - Blocking fcntl.lockf stalling other greenlets
     - Ghost dict entries after failed loads returning permanent 409
 """
@@ -1,7 +1,12 @@
 """Multi-model endpoint (MME) integration test for TF 2.20 inference DLC.
 
 Builds two tiny SavedModels (y=2x, y=3x), uploads to a shared S3 prefix,
-deploys an MME, and asserts target_model routes invocations correctly.
+deploys an MME, and asserts target_model routes invocations correctly, both
+with one TFS process per model, with both models hosted by one shared TFS
+(SAGEMAKER_TFS_MME_SHARED_INSTANCES), and with loads served from pre-spawned
+TFS processes (SAGEMAKER_TFS_MME_WARM_POOL_SIZE). Also checks that models with
+their own inference.py and code/lib keep separate module namespaces, and the
+bulk {"models": [...]} form of POST and DELETE /models.
 """
 
 from __future__ import annotations
@@ -11,15 +16,26 @@ import tempfile
 from pathlib import Path
 
 import pytest
+from botocore.exceptions import ClientError
 from test_utils import random_suffix_name
 
 from .resources.build_sample_model import build_sample_model
 from .resources.helpers import read_predictions, upload_tarball
 
 
+@pytest.mark.parametrize(
+    "container_env",
+    [
+        None,
+        {"SAGEMAKER_TFS_MME_SHARED_INSTANCES": "1"},
+        {"SAGEMAKER_TFS_MME_WARM_POOL_SIZE": "1"},
+    ],
+    ids=["per-model-tfs", "shared-tfs", "warm-pool"],
+)
 def test_mme_two_models(
     sagemaker_session,
     deploy_endpoint,
+    container_env,
 ):
     with tempfile.TemporaryDirectory(prefix="tf220-mme-") as workdir:
         workdir_path = Path(workdir)
@@ -44,6 +60,7 @@ def test_mme_two_models(
         endpoint, endpoint_name, model_name = deploy_endpoint(
             model_data_url=s3_model_prefix,
             mode="MultiModel",
+            container_env=container_env,
             name_prefix="tf220-mme",
         )
 
@@ -66,3 +83,186 @@ def test_mme_two_models(
         )
         values2 = read_predictions(resp2)
         assert values2 == pytest.approx([3.0, 6.0, 9.0]), f"model2 got {values2!r}"
+
+
+# inference.py that reports which lib/utils.py it imported next to the predictions
+LIB_TAG_INFERENCE_PY = """\
+import json
+
+import requests
+import utils
+
+
+def handler(data, context):
+    response = requests.post(context.rest_uri, data=data.read(), timeout=30)
+    body = json.loads(response.content)
+    body["utils_tag"] = utils.TAG
+    return json.dumps(body), "application/json"
+"""
+
+
+def test_mme_models_keep_their_own_lib_modules(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """Each model sees its own code/lib/utils.py; a broken inference.py fails the load."""
+    with tempfile.TemporaryDirectory(prefix="tf220-mme-lib-") as workdir:
+        workdir_path = Path(workdir)
+
+        tarballs = [
+            build_sample_model(
+                output_dir=workdir_path / name,
+                multiplier=multiplier,
+                tar_filename=f"{name}.tar.gz",
+                code_files={
+                    "inference.py": LIB_TAG_INFERENCE_PY,
+                    "lib/utils.py": f"TAG = {name!r}\n",
+                },
+            )
+            for name, multiplier in (("lib1", 2.0), ("lib2", 3.0))
+        ]
+        tarballs.append(
+            build_sample_model(
+                output_dir=workdir_path / "broken",
+                tar_filename="broken.tar.gz",
+                code_files={"inference.py": "raise RuntimeError('broken inference.py')\n"},
+            )
+        )
+
+        run_id = random_suffix_name("mme-lib", 63)
+        s3_key_prefix = f"tf220-inference-tests/mme-lib-models/{run_id}"
+        for tar_path in tarballs:
+            upload_tarball(sagemaker_session, tar_path, key_prefix=s3_key_prefix)
+        bucket = sagemaker_session.default_bucket()
+
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=f"s3://{bucket}/{s3_key_prefix}/",
+            mode="MultiModel",
+            name_prefix="tf220-mme-lib",
+        )
+
+        payload = json.dumps({"instances": [[1.0, 2.0, 3.0]]})
+        for name, expected in (("lib1", [2.0, 4.0, 6.0]), ("lib2", [3.0, 6.0, 9.0])):
+            result = endpoint.invoke(
+                body=payload,
+                content_type="application/json",
+                accept="application/json",
+                target_model=f"{name}.tar.gz",
+            )
+            body = json.loads(result.body.read().decode("utf-8"))
+            assert body["utils_tag"] == name, f"{name} imported another model's utils: {body!r}"
+            values = body["predictions"][0]
+            values = values["output"] if isinstance(values, dict) else values
+            assert values == pytest.approx(expected), f"{name} got {values!r}"
+
+        with pytest.raises(ClientError):
+            endpoint.invoke(
+                body=payload,
+                content_type="application/json",
+                accept="application/json",
+                target_model="broken.tar.gz",
+            )
+
+
+# inference.py that forwards {"method", "body"} to the container's own /models
+# API, loading copies of its own SavedModel, and returns the status and body
+BULK_MODELS_INFERENCE_PY = """\
+import json
+import os
+
+import requests
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def handler(data, context):
+    request = json.loads(data.read())
+    body = json.loads(json.dumps(request["body"]).replace("$MODEL_DIR", MODEL_DIR))
+    port = os.environ.get("SAGEMAKER_BIND_TO_PORT", "8080")
+    response = requests.request(
+        request["method"], "http://localhost:{}/models".format(port), json=body, timeout=300
+    )
+    return json.dumps({"status": response.status_code, "body": response.json()}), "application/json"
+"""
+
+
+def test_mme_bulk_load_and_unload(
+    sagemaker_session,
+    deploy_endpoint,
+):
+    """POST/DELETE /models with {"models": [...]}: 400 on bad input, per-model status otherwise."""
+    with tempfile.TemporaryDirectory(prefix="tf220-mme-bulk-") as workdir:
+        tar_path = build_sample_model(
+            output_dir=Path(workdir) / "bulk",
+            tar_filename="bulk.tar.gz",
+            code_files={"inference.py": BULK_MODELS_INFERENCE_PY},
+        )
+        run_id = random_suffix_name("mme-bulk", 63)
+        s3_key_prefix = f"tf220-inference-tests/mme-bulk-models/{run_id}"
+        upload_tarball(sagemaker_session, tar_path, key_prefix=s3_key_prefix)
+        bucket = sagemaker_session.default_bucket()
+
+        endpoint, endpoint_name, model_name = deploy_endpoint(
+            model_data_url=f"s3://{bucket}/{s3_key_prefix}/",
+            mode="MultiModel",
+            name_prefix="tf220-mme-bulk",
+        )
+
+        def models_api(method, body):
+            result = endpoint.invoke(
+                body=json.dumps({"method": method, "body": body}),
+                content_type="application/json",
+                accept="application/json",
+                target_model="bulk.tar.gz",
+            )
+            reply = json.loads(result.body.read().decode("utf-8"))
+            return reply["status"], reply["body"]
+
+        # malformed or duplicate entries reject the whole request
+        for bad in (
+            {"models": []},
+            {"models": [{"model_name": "bulk-a"}]},
+            {"models": [{"model_name": "bulk-a", "url": "$MODEL_DIR"}, {"url": "$MODEL_DIR"}]},
+            {
+                "models": [
+                    {"model_name": "bulk-a", "url": "$MODEL_DIR"},
+                    {"model_name": "bulk-a", "url": "$MODEL_DIR"},
+                ]
+            },
+        ):
+            status, body = models_api("POST", bad)
+            assert status == 400, f"{bad!r} got {status}: {body!r}"
+            assert "error" in body, body
+        status, body = models_api("DELETE", {"models": ["bulk-a", "bulk-a"]})
+        assert status == 400, f"duplicate bulk DELETE got {status}: {body!r}"
+
+        # one bad url: the others still load, and each model reports its own status
+        status, body = models_api(
+            "POST",
+            {
+                "models": [
+                    {"model_name": "bulk-a", "url": "$MODEL_DIR"},
+                    {"model_name": "bulk-b", "url": "$MODEL_DIR"},
+                    {"model_name": "bulk-missing", "url": "/opt/ml/models/does-not-exist"},
+                ]
+            },
+        )
+        assert status == 207, f"partial bulk load got {status}: {body!r}"
+        statuses = {name: model["status"] for name, model in body["models"].items()}
+        assert statuses == {"bulk-a": 200, "bulk-b": 200, "bulk-missing": 404}, body
+
+        # loading an already loaded model again is a per-model 409
+        status, body = models_api(
+            "POST", {"models": [{"model_name": "bulk-a", "url": "$MODEL_DIR"}]}
+        )
+        assert status == 207, f"reload got {status}: {body!r}"
+        assert body["models"]["bulk-a"]["status"] == 409, body
+
+        status, body = models_api("DELETE", {"models": ["bulk-a", "bulk-b", "bulk-missing"]})
+        assert status == 207, f"bulk unload got {status}: {body!r}"
+        statuses = {name: model["status"] for name, model in body["models"].items()}
+        assert statuses == {"bulk-a": 200, "bulk-b": 200, "bulk-missing": 404}, body
+
+        status, body = models_api("DELETE", {"models": ["bulk-a", "bulk-b"]})
+        assert status == 207, f"second bulk unload got {status}: {body!r}"
+        assert all(model["status"] == 404 for model in body["models"].values()), body
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the TensorFlow Serving SageMaker container.
+
+Measures how long it takes until a model can serve: container start to the
+first successful GET /ping for a single-model container (`single`), or the
+latency of POST /models on a running multi-model container (`mme`). Compare
+images built before and after a change to see startup time gained or lost.
+With --models N, `mme` times loading N models per iteration, one POST each
+or, with --bulk, one bulk POST /models.
+
+Usage:
+    # single model: start the container N times, time docker run -> /ping 200
+    python tfs_cold_start_benchmark.py single \\
+        --image "$IMAGE_URI" --model-dir $PWD/model --iterations 5
+
+    # MME: load/unload a model N times on a running MME container
+    python tfs_cold_start_benchmark.py mme \\
+        --url http://localhost:8080 --model-url /opt/ml/models/half_plus_three/model \\
+        --iterations 10 --output-json mme.json
+
+    # MME warmup: 50 models per iteration in one bulk request
+    python tfs_cold_start_benchmark.py mme \\
+        --url http://localhost:8080 --model-url /opt/ml/models/half_plus_three/model \\
+        --models 50 --bulk --iterations 3
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+POLL_SECONDS = 0.01
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def wait_for_ping(url, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(POLL_SECONDS)
+    return False
+
+
+def run_single(args):
+    samples = []
+    for i in range(args.iterations):
+        name = "tfs-cold-start-{}".format(i)
+        cmd = [
+            "docker",
+            "run",
+            "-d",
+            "--rm",
+            "--name",
+            name,
+            "-p",
+            "{}:8080".format(args.port),
+            "-v",
+            "{}:/opt/ml/model".format(args.model_dir),
+        ]
+        for env in args.env:
+            cmd += ["-e", env]
+        cmd += [args.image, "serve"]
+
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        try:
+            ok = wait_for_ping("http://localhost:{}/ping".format(args.port), args.timeout)
+            elapsed = time.perf_counter() - start
+        finally:
+            subprocess.run(["docker", "rm", "-f", name], check=False, stdout=subprocess.DEVNULL)
+        samples.append({"iteration": i, "ok": ok, "seconds": elapsed})
+        print("iteration {}: {:.3f}s{}".format(i, elapsed, "" if ok else " (timed out)"))
+    return samples
+
+
+def run_mme(args):
+    samples = []
+    for i in range(args.iterations):
+        model_names = ["{}-{}-{}".format(args.model_name, i, j) for j in range(args.models)]
+        start = time.perf_counter()
+        if args.bulk:
+            resp = requests.post(
+                "{}/models".format(args.url),
+                json={"models": [{"model_name": m, "url": args.model_url} for m in model_names]},
+                timeout=args.timeout,
+            )
+            statuses = [resp.status_code]
+        else:
+            statuses = [
+                requests.post(
+                    "{}/models".format(args.url),
+                    json={"model_name": m, "url": args.model_url},
+                    timeout=args.timeout,
+                ).status_code
+                for m in model_names
+            ]
+        elapsed = time.perf_counter() - start
+        ok = all(status == 200 for status in statuses)
+        status = statuses[0] if ok else next(s for s in statuses if s != 200)
+        samples.append({"iteration": i, "ok": ok, "status": status, "seconds": elapsed})
+        print("iteration {}: {:.3f}s (HTTP {})".format(i, elapsed, status))
+        if args.bulk:
+            requests.delete(
+                "{}/models".format(args.url), json={"models": model_names}, timeout=args.timeout
+            )
+        else:
+            for m in model_names:
+                requests.delete("{}/models/{}".format(args.url, m), timeout=args.timeout)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    single = sub.add_parser("single", help="time docker run -> first /ping 200")
+    single.add_argument("--image", required=True)
+    single.add_argument("--model-dir", required=True, help="host dir mounted at /opt/ml/model")
+    single.add_argument("--port", type=int, default=8080)
+    single.add_argument("--env", action="append", default=[], help="KEY=VALUE for the container")
+
+    mme = sub.add_parser("mme", help="time POST /models on a running MME container")
+    mme.add_argument("--url", default="http://localhost:8080")
+    mme.add_argument("--model-url", required=True, help="model path inside the container")
+    mme.add_argument("--model-name", default="cold-start")
+    mme.add_argument("--models", type=int, default=1, help="models loaded per iteration")
+    mme.add_argument("--bulk", action="store_true", help="load them with one bulk POST /models")
+
+    for p in (single, mme):
+        p.add_argument("--iterations", type=int, default=5)
+        p.add_argument("--timeout", type=float, default=300)
+        p.add_argument("--output-json", default=None)
+    args = parser.parse_args()
+
+    samples = run_single(args) if args.mode == "single" else run_mme(args)
+    seconds = [s["seconds"] for s in samples if s["ok"]]
+    summary = {
+        "mode": args.mode,
+        "iterations": args.iterations,
+        "successful": len(seconds),
+        "seconds_mean": statistics.mean(seconds) if seconds else 0.0,
+        "seconds_min": min(seconds) if seconds else 0.0,
+        "seconds_p50": percentile(seconds, 50),
+        "seconds_p90": percentile(seconds, 90),
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf8") as f:
+            json.dump({"summary": summary, "samples": samples}, f, indent=2)
+    return 0 if len(seconds) == len(samples) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
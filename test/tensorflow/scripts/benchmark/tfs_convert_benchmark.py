@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+CSV / JSON Lines conversion benchmark: tfs_convert vs the nginx njs handlers.
+
+Builds CSV and JSON Lines bodies, converts each with the Python converter
+custom handlers use (sagemaker/tfs_convert.py) and with csv_request /
+json_request from tensorflowServing.js run under node, checks that both
+produce the same bytes, and reports conversion throughput. Exits non-zero on
+any mismatch. node runs the njs functions with a stub request object; njs
+itself is slower, so the JS numbers are a lower bound.
+
+Usage:
+    python tfs_convert_benchmark.py --rows 100000 --cols 32 --iterations 5
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+SAGEMAKER_DIR = os.path.join(REPO_ROOT, "scripts", "docker", "tensorflow", "inference", "sagemaker")
+sys.path.insert(0, SAGEMAKER_DIR)
+
+import tfs_convert  # noqa: E402
+
+# Runs one njs handler on a request body read from argv[2]; writes the body it
+# would send to TFS to argv[3] and the per-iteration seconds to stdout.
+NODE_DRIVER = """
+import fs from 'fs';
+import tfs from './tensorflowServing.mjs';
+const [handler, input, output, iterations] = process.argv.slice(2);
+const text = fs.readFileSync(input, 'utf8');
+let sent = null;
+const r = {
+    requestText: text, uri: '/invocations', headersIn: {},
+    variables: {default_tfs_model: 'model'},
+    subrequest(uri, options, callback) { sent = options.body; },
+};
+const seconds = [];
+for (let i = 0; i < Number(iterations); i++) {
+    const start = process.hrtime.bigint();
+    tfs[handler](r);
+    seconds.push(Number(process.hrtime.bigint() - start) / 1e9);
+}
+fs.writeFileSync(output, sent);
+console.log(JSON.stringify(seconds));
+"""
+
+
+def make_payloads(rows, cols, seed):
+    rng = random.Random(seed)
+
+    def number():
+        return rng.choice(
+            [
+                "{:.6f}".format(rng.uniform(-1000, 1000)),
+                str(rng.randint(-1000, 1000)),
+                "{:.3e}".format(rng.uniform(-1, 1)),
+            ]
+        )
+
+    numeric_csv = "\n".join(",".join(number() for _ in range(cols)) for _ in range(rows))
+    spaced_csv = "\r\n".join(", ".join(number() for _ in range(cols)) for _ in range(rows))
+    single_column_csv = "\n".join(number() for _ in range(rows)) + "\n"
+    words = ["hello", 'say "hi"', "a,b", "back\\slash", " padded ", ""]
+    mixed_csv = "\n".join(
+        ",".join(
+            number() if c % 2 else '"{}"'.format(rng.choice(words).replace('"', '""'))
+            for c in range(cols)
+        )
+        for _ in range(rows)
+    )
+    json_lines = "\n".join(
+        json.dumps({"features": [float(number()) for _ in range(cols)]}) for _ in range(rows)
+    )
+    return [
+        ("csv-numeric", "text/csv", numeric_csv),
+        ("csv-numeric-spaced-crlf", "text/csv", spaced_csv),
+        ("csv-single-column", "text/csv", single_column_csv),
+        ("csv-mixed-quoted", "text/csv", mixed_csv),
+        ("jsonlines", "application/jsonlines", json_lines),
+    ]
+
+
+def run_node(workdir, handler, payload, iterations):
+    input_path = os.path.join(workdir, "input")
+    output_path = os.path.join(workdir, "output")
+    with open(input_path, "w", encoding="utf8") as f:
+        f.write(payload)
+    result = subprocess.run(
+        ["node", "driver.mjs", handler, input_path, output_path, str(iterations)],
+        cwd=workdir,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    with open(output_path, "rb") as f:
+        return f.read(), json.loads(result.stdout)
+
+
+def run_python(content_type, payload, iterations):
+    data = payload.encode("utf-8")
+    seconds = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = tfs_convert.to_tfs_json(data, content_type)
+        seconds.append(time.perf_counter() - start)
+    return body, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-json", default=None)
+    args = parser.parse_args()
+
+    if shutil.which("node") is None:
+        print("node is required to run the njs handlers", file=sys.stderr)
+        return 2
+
+    results, mismatches = [], 0
+    with tempfile.TemporaryDirectory(prefix="tfs-convert-bench-") as workdir:
+        shutil.copy(
+            os.path.join(SAGEMAKER_DIR, "tensorflowServing.js"),
+            os.path.join(workdir, "tensorflowServing.mjs"),
+        )
+        with open(os.path.join(workdir, "driver.mjs"), "w", encoding="utf8") as f:
+            f.write(NODE_DRIVER)
+
+        for name, content_type, payload in make_payloads(args.rows, args.cols, args.seed):
+            handler = "csv_request" if content_type == "text/csv" else "json_request"
+            js_body, js_seconds = run_node(workdir, handler, payload, args.iterations)
+            py_body, py_seconds = run_python(content_type, payload, args.iterations)
+            identical = js_body == py_body
+            mismatches += not identical
+            megabytes = len(payload.encode("utf-8")) / 1e6
+            result = {
+                "payload": name,
+                "megabytes": megabytes,
+                "identical": identical,
+                "js_mb_per_s": megabytes / statistics.median(js_seconds),
+                "python_mb_per_s": megabytes / statistics.median(py_seconds),
+            }
+            results.append(result)
+            print(
+                "{payload:<26} {megabytes:8.2f} MB  js {js_mb_per_s:8.1f} MB/s  "
+                "python {python_mb_per_s:8.1f} MB/s  {status}".format(
+                    status="identical" if identical else "MISMATCH", **result
+                )
+            )
+
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Invocation benchmark client for the TensorFlow Serving SageMaker container.
+
+Sends a synthetic float tensor payload to POST /invocations and reports
+end-to-end latency percentiles, request throughput and payload size. Run it
+against the same model with different container settings to compare request
+paths, e.g. SAGEMAKER_TFS_DEFAULT_HANDLER_PROTOCOL=rest vs grpc.
+
+Usage:
+    python tfs_invocations_benchmark_client.py \\
+        --url http://localhost:8080/invocations \\
+        --content-type application/json --rows 64 --cols 1024 \\
+        --num-requests 500 --concurrency 8 --output-json rest.json
+"""
+
+import argparse
+import concurrent.futures
+import io
+import json
+import random
+import statistics
+import sys
+import time
+
+import requests
+
+CONTENT_TYPES = ("application/json", "text/csv", "application/x-npy")
+
+
+def build_payload(content_type, rows, cols, seed):
+    rng = random.Random(seed)
+    matrix = [[round(rng.uniform(-1.0, 1.0), 6) for _ in range(cols)] for _ in range(rows)]
+    if content_type == "application/json":
+        return json.dumps({"instances": matrix}).encode("utf-8")
+    if content_type == "text/csv":
+        return "\n".join(",".join(str(v) for v in row) for row in matrix).encode("utf-8")
+
+    import numpy as np
+
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(matrix, dtype=np.float32), allow_pickle=False)
+    return buf.getvalue()
+
+
+def send_request(session, url, payload, headers, req_id):
+    start = time.perf_counter()
+    try:
+        resp = session.post(url, data=payload, headers=headers, timeout=300)
+        elapsed = time.perf_counter() - start
+        return {
+            "id": req_id,
+            "ok": resp.status_code == 200,
+            "status": resp.status_code,
+            "latency_ms": elapsed * 1000,
+            "response_bytes": len(resp.content),
+        }
+    except requests.RequestException as e:
+        return {
+            "id": req_id,
+            "ok": False,
+            "status": None,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "error": str(e),
+        }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(args):
+    payload = build_payload(args.content_type, args.rows, args.cols, args.seed)
+    headers = {"Content-Type": args.content_type, "Accept": args.accept}
+    if args.custom_attributes:
+        headers["X-Amzn-SageMaker-Custom-Attributes"] = args.custom_attributes
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+
+    for i in range(args.warmup):
+        send_request(session, args.url, payload, headers, -1 - i)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(send_request, session, args.url, payload, headers, i)
+            for i in range(args.num_requests)
+        ]
+        results = [f.result() for f in futures]
+    duration = time.perf_counter() - start
+
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["latency_ms"] for r in ok]
+    summary = {
+        "url": args.url,
+        "content_type": args.content_type,
+        "rows": args.rows,
+        "cols": args.cols,
+        "payload_bytes": len(payload),
+        "concurrency": args.concurrency,
+        "num_requests": args.num_requests,
+        "successful": len(ok),
+        "failed": len(results) - len(ok),
+        "duration_s": duration,
+        "requests_per_second": len(ok) / duration if duration else 0.0,
+        "latency_ms_mean": statistics.mean(latencies) if latencies else 0.0,
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p90": percentile(latencies, 90),
+        "latency_ms_p99": percentile(latencies, 99),
+    }
+    return summary, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--url", default="http://localhost:8080/invocations")
+    parser.add_argument("--content-type", choices=CONTENT_TYPES, default="application/json")
+    parser.add_argument("--accept", default="application/json")
+    parser.add_argument("--custom-attributes", default=None)
+    parser.add_argument("--rows", type=int, default=16, help="instances per request")
+    parser.add_argument("--cols", type=int, default=128, help="values per instance")
+    parser.add_argument("--num-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-json", default=None)
+    args = parser.parse_args()
+
+    summary, results = run(args)
+    print(json.dumps(summary, indent=2))
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf8") as f:
+            json.dump({"summary": summary, "requests": results}, f, indent=2)
+    if summary["failed"]:
+        errors = [r for r in results if not r["ok"]][:3]
+        print("sample failures: {}".format(errors), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
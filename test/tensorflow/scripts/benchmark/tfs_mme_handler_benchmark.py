@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+MME handler import benchmark: eager per-sync import vs lazy per-model import.
+
+Generates N model directories, each with a code/inference.py that imports
+modules from its own code/lib, and times in a fresh interpreter per mode:
+the eager scheme python_service used before (every model's lib appended to
+sys.path and every inference.py executed when a worker syncs the registry)
+against tfs_handlers.HandlerCache (a sync only drops stale entries; a model's
+script is imported on its first invocation). Reports the cost of a worker's
+first sync with N models registered, of a re-sync after one more model is
+loaded, and of the first invocation of a model.
+
+Usage:
+    python tfs_mme_handler_benchmark.py --models 200 --lib-modules 5 --init-ms 5
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+SAGEMAKER_DIR = os.path.join(REPO_ROOT, "scripts", "docker", "tensorflow", "inference", "sagemaker")
+
+INFERENCE_PY = """\
+import json
+import time
+
+{imports}
+
+# stands in for import-time setup (reading vocabularies, building lookup tables)
+time.sleep({init_seconds})
+
+
+def input_handler(data, context):
+    return json.dumps({{"instances": [[{values}]]}})
+
+
+def output_handler(response, context):
+    return response.content, context.accept_header
+"""
+
+
+def make_models(root, models, lib_modules, init_ms):
+    for m in range(models + 1):  # one spare model for the re-sync
+        code_dir = os.path.join(root, "model{}".format(m), "model", "code")
+        lib_dir = os.path.join(code_dir, "lib")
+        os.makedirs(lib_dir)
+        for i in range(lib_modules):
+            # the same module names in every model, as real code/lib trees tend to have
+            with open(os.path.join(lib_dir, "helper{}.py".format(i)), "w", encoding="utf8") as f:
+                f.write("VALUE = {}\n\n\ndef scale(x):\n    return x * VALUE\n".format(m))
+        with open(os.path.join(code_dir, "inference.py"), "w", encoding="utf8") as f:
+            f.write(
+                INFERENCE_PY.format(
+                    imports="\n".join("import helper{}".format(i) for i in range(lib_modules)),
+                    values=", ".join("helper{}.scale(1.0)".format(i) for i in range(lib_modules)),
+                    init_seconds=init_ms / 1000.0,
+                )
+            )
+
+
+def _code_dir(root):
+    return os.path.join(root, "{}", "model", "code")
+
+
+def _eager_import(root, model_name, handlers):
+    """What _import_custom_modules did for each model missing from model_handlers."""
+    code_dir = _code_dir(root).format(model_name)
+    sys.path.append(os.path.join(code_dir, "lib"))
+    spec = importlib.util.spec_from_file_location(
+        "inference", os.path.join(code_dir, "inference.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    handlers[model_name] = (module.input_handler, module.output_handler)
+
+
+def run_eager(root, models, queue):
+    handlers = {}
+    names = ["model{}".format(m) for m in range(models)]
+    start = time.perf_counter()
+    for name in names:
+        _eager_import(root, name, handlers)
+    first_sync = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in names + ["model{}".format(models)]:
+        if name not in handlers:
+            _eager_import(root, name, handlers)
+    resync = time.perf_counter() - start
+    # module names collide: every model now sees model0's helper modules
+    shared = len({handlers[name][0].__globals__["helper0"].VALUE for name in handlers})
+    queue.put({"first_sync": first_sync, "resync": resync, "first_invoke": 0.0, "distinct": shared})
+
+
+def run_lazy(root, models, queue):
+    sys.path.insert(0, SAGEMAKER_DIR)
+    import tfs_handlers
+
+    cache = tfs_handlers.HandlerCache(lambda h, i, o: (i, o), code_dir=_code_dir(root))
+    generations = {"model{}".format(m): 1 for m in range(models)}
+    start = time.perf_counter()
+    cache.retain(generations)
+    first_sync = time.perf_counter() - start
+
+    generations["model{}".format(models)] = 1
+    start = time.perf_counter()
+    cache.retain(generations)
+    resync = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cache.get("model0", 1)
+    first_invoke = time.perf_counter() - start
+    for name in generations:
+        cache.get(name, 1)
+    distinct = len({cache.get(name, 1)[0].__globals__["helper0"].VALUE for name in generations})
+    queue.put(
+        {
+            "first_sync": first_sync,
+            "resync": resync,
+            "first_invoke": first_invoke,
+            "distinct": distinct,
+        }
+    )
+
+
+def measure(target, root, models):
+    # a fresh interpreter per run, as a new gunicorn worker would have
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=target, args=(root, models, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--models", type=int, default=200)
+    parser.add_argument("--lib-modules", type=int, default=5)
+    parser.add_argument("--init-ms", type=float, default=5, help="import-time work per script")
+    parser.add_argument("--output-json", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="tfs-mme-handler-bench-") as root:
+        make_models(root, args.models, args.lib_modules, args.init_ms)
+        results = {
+            "eager": measure(run_eager, root, args.models),
+            "lazy": measure(run_lazy, root, args.models),
+        }
+
+    for mode, result in results.items():
+        print(
+            "{mode:<6} first sync {first_sync:9.4f} s  re-sync {resync:9.4f} s  "
+            "first invocation {first_invoke:8.4f} s  distinct helper modules {distinct}/{total}".format(
+                mode=mode, total=args.models + 1, **result
+            )
+        )
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Unit tests for python_service's MME load path and last-used bookkeeping.
+
+These run on CPU with no TFS: python_service is imported from the SageMaker
+handler directory, the gRPC config reload is replaced by a stub and the
+model registry lives in a temporary directory.
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("falcon")
+pytest.importorskip("gevent")
+pytest.importorskip("grpc")
+
+SAGEMAKER_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    *[os.pardir] * 3,
+    "scripts",
+    "docker",
+    "tensorflow",
+    "inference",
+    "sagemaker",
+)
+
+
+@pytest.fixture(scope="module")
+def python_service():
+    with pytest.MonkeyPatch.context() as mp:
+        # single-model mode at import: the module builds its resources on import
+        mp.setenv("TFS_GRPC_PORTS", "9000")
+        mp.setenv("TFS_REST_PORTS", "8501")
+        mp.syspath_prepend(SAGEMAKER_DIR)
+        import python_service
+
+        yield python_service
+        sys.modules.pop("python_service", None)
+
+
+@pytest.fixture
+def shared_resource(python_service, monkeypatch):
+    """A PythonServiceResource hosting MME models on two shared TFS instances."""
+    resource = object.__new__(python_service.PythonServiceResource)
+    resource._tfs_shared_grpc_ports = [9000, 9002]
+    resource._tfs_shared_rest_ports = [9001, 9003]
+    resource._tfs_instance_count = 2
+    resource._tfs_wait_time_seconds = 1
+    resource._mme_tfs_instances_status = {
+        "loaded": [python_service.TfsInstanceStatus(9001, 9000, 100)],
+    }
+    monkeypatch.setattr(python_service.tfs_utils, "read_shared_tfs_pid", lambda i: 100 + i)
+    monkeypatch.setattr(python_service.tfs_utils, "wait_for_model", lambda *args: None)
+    return resource
+
+
+def _ports(statuses):
+    return {
+        model_name: sorted(status.grpc_port for status in status_list)
+        for model_name, status_list in statuses.items()
+    }
+
+
+def test_failed_shared_reload_restores_instance_status(python_service, shared_resource):
+    def reload(instance_id, add=None, remove=()):
+        raise ImportError("No module named 'tensorflow'")
+
+    shared_resource._reload_shared_tfs = reload
+    responses = shared_resource._load_models_shared({"a": "/opt/ml/models/a/model"})
+
+    assert responses["a"]["status"] == python_service.falcon.HTTP_500
+    assert "tensorflow" in responses["a"]["body"]
+    assert _ports(shared_resource._mme_tfs_instances_status) == {"loaded": [9000]}
+
+
+def test_failed_shared_reload_keeps_instances_that_loaded(python_service, shared_resource):
+    def reload(instance_id, add=None, remove=()):
+        if instance_id == 1:
+            raise RuntimeError("TFS config reload failed (3): bad config")
+
+    shared_resource._reload_shared_tfs = reload
+    responses = shared_resource._load_models_shared({"a": "/opt/ml/models/a/model"})
+
+    # The load fails as a whole; cleanup then unloads "a" from instance 0 only.
+    assert responses["a"]["status"] == python_service.falcon.HTTP_500
+    assert _ports(shared_resource._mme_tfs_instances_status) == {"loaded": [9000], "a": [9000]}
+
+
+def test_touches_stay_in_memory_until_flushed(python_service, tmp_path, monkeypatch):
+    registry = python_service.ModelRegistry(str(tmp_path / "registry.db"))
+    registry.record_load("a", 1.0, 10.0)
+    resource = object.__new__(python_service.PythonServiceResource)
+    resource._mme_registry = registry
+    resource._mme_pending_touches = {}
+    resource._mme_touch_flusher_pid = os.getpid()
+    monkeypatch.setattr(python_service.time, "time", lambda: 20.0)
+
+    resource._touch_mme_model("a")
+    assert registry.stats()["a"]["last_used"] == 10.0
+
+    resource._flush_mme_touches()
+    assert registry.stats()["a"]["last_used"] == 20.0
+    assert resource._mme_pending_touches == {}
+
+    # a flush carrying an older time does not move last_used back
+    registry.touch_many({"a": 15.0})
+    assert registry.stats()["a"]["last_used"] == 20.0
@@ -77,10 +77,12 @@ def _install_stubs() -> None:
     fastapi.Form = _form_marker
     fastapi.UploadFile = type("UploadFile", (), {})
     fastapi.HTTPException = type("HTTPException", (Exception,), {})
+    fastapi.BackgroundTasks = type("BackgroundTasks", (), {})
 
     fastapi_responses = types.ModuleType("fastapi.responses")
     fastapi_responses.JSONResponse = type("JSONResponse", (), {})
     fastapi_responses.PlainTextResponse = type("PlainTextResponse", (), {})
+    fastapi_responses.StreamingResponse = type("StreamingResponse", (), {})
 
     whisperx = types.ModuleType("whisperx")
     whisperx.load_model = lambda *a, **k: None
@@ -101,6 +101,19 @@ def _install_stubs() -> None:
             self.content = content
             self.media_type = kwargs.get("media_type")
 
+    class _StreamingResponse:
+        def __init__(self, content=None, **kwargs):
+            self.body_iterator = content
+            self.media_type = kwargs.get("media_type")
+            self.background = kwargs.get("background")
+
+    class _BackgroundTasks:
+        def __init__(self):
+            self.tasks = []
+
+        def add_task(self, fn, *args, **kwargs):
+            self.tasks.append((fn, args, kwargs))
+
     torch = types.ModuleType("torch")
     torch.cuda = types.SimpleNamespace(is_available=lambda: False)
 
@@ -110,10 +123,12 @@ def _install_stubs() -> None:
     fastapi.Form = _form_marker
     fastapi.UploadFile = type("UploadFile", (), {})
     fastapi.HTTPException = _HTTPException
+    fastapi.BackgroundTasks = _BackgroundTasks
 
     fastapi_responses = types.ModuleType("fastapi.responses")
     fastapi_responses.JSONResponse = _JSONResponse
     fastapi_responses.PlainTextResponse = _PlainTextResponse
+    fastapi_responses.StreamingResponse = _StreamingResponse
 
     whisperx = types.ModuleType("whisperx")
     whisperx.load_model = lambda *a, **k: None
@@ -13,26 +13,59 @@ need no model:
     becomes a 422 rather than a speaker-less 200.
   * the blocking ``_transcribe`` call is offloaded off the event loop via
     ``anyio.to_thread.run_sync`` so long transcriptions don't starve /ping.
-  * GPU inference is serialized via ``_INFERENCE_LIMITER``
-    (``WHISPERX_MAX_CONCURRENT_REQUESTS``, default 1), so two concurrent
-    ``_handle_transcription`` calls never run ``_transcribe`` at the same time.
+  * GPU inference is serialized per replica via its ``inference_limiter``
+    (capacity 1), so with one replica two concurrent ``_handle_transcription``
+    calls never run ``_transcribe`` at the same time; with
+    ``WHISPERX_REPLICAS`` they are dispatched to the least-loaded replica and
+    run side by side, each on its own models.
   * the returned dict's ``task`` reflects ``WHISPERX_TASK``.
   * admission control: a full inference queue is shed with 503 before the body is
     read, and an oversized upload is rejected with 413.
   * passive readiness: ``/ping`` reports 503 once the inference path observes a
     fatal CUDA fault; transient OOM leaves it healthy.
   * extension params are validated at the boundary (422).
+  * uploads are decoded in memory (PCM16 WAV / raw PCM straight from the
+    buffer) and fall back to ffmpeg via a temp file for anything else; uploads
+    over ``WHISPERX_IN_MEMORY_UPLOAD_BYTES`` spill to disk mid-stream.
+  * opt-in stage pipelining (``WHISPERX_PIPELINE_STAGES``): one request's ASR
+    overlaps another's diarization, while no stage ever runs twice at once.
+  * opt-in short-clip batching (``WHISPERX_BATCH_WINDOW_MS``): concurrent
+    requests share one ``_transcribe_batch`` call, their VAD chunks are packed
+    into one pipeline pass per language, and a failure decoding one upload
+    fails only that request.
+  * ``WHISPERX_REPLICAS``: ``auto`` sizes the pool from the CPU count, a
+    request goes to the replica with the fewest in-flight requests, and
+    replicas run side by side on their own models.
+  * the opt-in result cache (``WHISPERX_RESULT_CACHE_BYTES`` /
+    ``WHISPERX_RESULT_CACHE_DIR``) serves a resubmitted clip in any format
+    without inference, from memory or from disk after a restart, and counts
+    hits and misses on ``/metrics``.
+  * ``WHISPERX_ALIGN_PRELOAD`` loads the listed aligners at warmup, a request
+    that will be aligned prefetches its aligner while ASR runs, and aligner
+    loads and hit ratios are logged.
+  * ``WHISPERX_LONG_AUDIO_WINDOW_SECONDS``: long audio is cut into overlapping
+    windows, never decoded whole, and each segment in an overlap is kept once;
+    speakers of separate windows share labels when their embeddings match.
+    The decoded duration decides, also for in-memory uploads (compressed ones
+    piped to ffmpeg) on the pipelined, batched and streamed paths.
+  * ``stream=true`` sends one SSE delta per decoded segment before the final
+    text, streamed srt/vtt is byte-identical to the buffered body, and the
+    admission token is released when the stream ends (also on failure).
 """
 
 import asyncio
 import importlib.util
 import inspect
+import io
+import json
+import os
 import sys
 import threading
 import time
 import types
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 # server.py lives in the image-build tree, a sibling of test/; load it by path.
@@ -77,6 +110,19 @@ def _install_stubs() -> None:
             self.content = content
             self.media_type = kwargs.get("media_type")
 
+    class _StreamingResponse:
+        def __init__(self, content=None, **kwargs):
+            self.body_iterator = content
+            self.media_type = kwargs.get("media_type")
+            self.background = kwargs.get("background")
+
+    class _BackgroundTasks:
+        def __init__(self):
+            self.tasks = []
+
+        def add_task(self, fn, *args, **kwargs):
+            self.tasks.append((fn, args, kwargs))
+
     torch = types.ModuleType("torch")
     torch.cuda = types.SimpleNamespace(is_available=lambda: False)
 
@@ -86,10 +132,12 @@ def _install_stubs() -> None:
     fastapi.Form = _form_marker
     fastapi.UploadFile = type("UploadFile", (), {})
     fastapi.HTTPException = _HTTPException
+    fastapi.BackgroundTasks = _BackgroundTasks
 
     fastapi_responses = types.ModuleType("fastapi.responses")
     fastapi_responses.JSONResponse = _JSONResponse
     fastapi_responses.PlainTextResponse = _PlainTextResponse
+    fastapi_responses.StreamingResponse = _StreamingResponse
 
     whisperx = types.ModuleType("whisperx")
     whisperx.load_model = lambda *a, **k: None
@@ -133,6 +181,9 @@ def _load_server():
 class _FakeModel:
     """Stand-in Whisper model: transcribe() yields one Spanish segment."""
 
+    def detect_language(self, audio):
+        return "es"
+
     def transcribe(self, audio, **kwargs):
         return {"segments": [{"text": "hola", "start": 0.0, "end": 1.0}], "language": "es"}
 
@@ -263,7 +314,7 @@ def test_transcribe_runs_in_worker_thread():
     )
 
     assert recorded["thread_id"] != main_thread_id
-    assert recorded["kwargs"]["audio_path"]  # tempfile path was forwarded through
+    assert recorded["kwargs"]["audio_bytes"] == b"RIFFfake-audio-bytes"  # upload forwarded
 
 
 # ---------------------------------------------------------------------------
@@ -287,11 +338,11 @@ def _run_concurrently(target, n=8):
 def test_get_whisper_dedupes_concurrent_loads():
     """Concurrent cold misses must trigger exactly one model load (the lock).
 
-    One model per container: _get_whisper caches a single resident model. Without
-    _WHISPER_LOCK, N worker threads racing the first request would all see
-    _WHISPER_MODEL is None before any store completes and each call load_model —
+    One model per replica: _get_whisper caches a single resident model. Without
+    the replica's whisper_lock, N worker threads racing the first request would
+    all see no model before any store completes and each call load_model —
     N redundant ~30 s loads. The lock serializes check-load-store so only the
-    first loads (defense-in-depth if MAX_CONCURRENT_REQUESTS>1).
+    first loads.
     """
     server = _load_server()
     calls = {"count": 0}
@@ -548,8 +599,8 @@ class _ChunkedUpload:
     ``read_sizes == [-1]`` call and fail ``test_upload_read_in_chunks``.
     """
 
-    def __init__(self, total_bytes, filename="a.wav"):
-        self._buf = b"x" * total_bytes
+    def __init__(self, total_bytes, filename="a.wav", payload=None):
+        self._buf = b"x" * total_bytes if payload is None else payload
         self._pos = 0
         self.filename = filename
         self.read_sizes = []
@@ -615,7 +666,8 @@ def test_max_concurrent_clamped_to_one(monkeypatch):
     monkeypatch.setenv("WHISPERX_MAX_CONCURRENT_REQUESTS", "4")
     server = _load_server()
     assert server.MAX_CONCURRENT_REQUESTS == 1
-    assert server._INFERENCE_LIMITER.total_tokens == 1
+    assert len(server._REPLICAS) == 1
+    assert server._REPLICAS[0].inference_limiter.total_tokens == 1
 
 
 # ---------------------------------------------------------------------------
@@ -740,7 +792,7 @@ def test_align_evicts_before_loading():
     sizes_at_load: list[int] = []
 
     def _recording_load(*args, **kwargs):
-        sizes_at_load.append(len(server._ALIGN_LRU))
+        sizes_at_load.append(len(server._REPLICAS[0].align_lru))
         return (object(), {})
 
     server.whisperx.load_align_model = _recording_load
@@ -751,7 +803,7 @@ def test_align_evicts_before_loading():
 
     assert sizes_at_load == [0, 1, 1]
     assert all(n <= server._ALIGN_LRU_MAX - 1 for n in sizes_at_load)
-    assert len(server._ALIGN_LRU) == 2  # bounded by MAX after eviction
+    assert len(server._REPLICAS[0].align_lru) == 2  # bounded by MAX after eviction
 
 
 def test_get_align_dedupes_concurrent_loads():
@@ -782,3 +834,875 @@ def test_get_align_dedupes_concurrent_loads():
     assert calls["count"] == 1  # lock deduped 8 concurrent misses to one load
     assert len(results) == 8
     assert all(m is sentinel for m in results)
+
+
+def test_align_preload_loads_listed_languages_at_warmup(monkeypatch):
+    """WHISPERX_ALIGN_PRELOAD fills the LRU at startup, sized to hold them all."""
+    monkeypatch.setenv("WHISPERX_ALIGN_PRELOAD", "en, de,fr,ja")
+    server = _load_server()
+    server._get_whisper = lambda name: None
+    server._load_diarization = lambda device: None
+    loaded = []
+    server.whisperx.load_align_model = lambda language_code, **k: (
+        loaded.append(language_code) or (object(), {})
+    )
+
+    server._warm_replica(server._REPLICAS[0])
+
+    assert server._ALIGN_LRU_MAX == 4  # default 3 raised to fit the preload list
+    assert loaded == ["en", "de", "fr", "ja"]
+    assert list(server._REPLICAS[0].align_lru) == loaded
+
+
+def test_aligner_prefetched_while_asr_runs():
+    """A word-timestamp request starts loading its aligner before ASR finishes.
+
+    The fake model's transcribe() blocks until load_align_model has been
+    called, so the request only completes if the load overlaps ASR; the align
+    stage then reuses the prefetched aligner instead of loading it again.
+    """
+    server = _load_server()
+    server.whisperx.load_audio = lambda path: [0.0] * 16000
+    load_started = threading.Event()
+    loads = []
+
+    def _load(language_code, **kwargs):
+        loads.append(language_code)
+        load_started.set()
+        return (object(), {})
+
+    class _BlockingModel(_FakeModel):
+        def transcribe(self, audio, **kwargs):
+            assert load_started.wait(2), "aligner was not prefetched during ASR"
+            assert kwargs["language"] == "es"  # detected once, passed through
+            return super().transcribe(audio, **kwargs)
+
+    server.whisperx.load_align_model = _load
+    server._get_whisper = lambda name: _BlockingModel()
+
+    _transcribe(server, want_words=True, diarize=False)
+
+    assert loads == ["es"]
+    assert server._REPLICAS[0].align_stats == {"es": [1, 1]}  # the request hit
+
+
+def test_align_hit_ratio_logged(capsys):
+    server = _load_server()
+    server._ALIGN_STATS_EVERY = 2
+    server._get_align("es")
+    server._get_align("es")
+
+    out = capsys.readouterr().out
+    assert "loaded aligner for language=es" in out
+    assert "aligner hit ratio on cpu: 1/2 (50%); es 1/2" in out
+
+
+# ---------------------------------------------------------------------------
+# short-clip batching: one packed ASR pass for concurrent requests
+# ---------------------------------------------------------------------------
+def test_batching_disabled_by_default():
+    server = _load_server()
+    assert server.BATCH_WINDOW_MS == 0
+    assert server._REPLICAS[0].batcher is None
+
+
+def test_batcher_gathers_concurrent_requests(monkeypatch):
+    """Three requests inside the window reach _transcribe_batch together, and
+    each gets its own result back."""
+    monkeypatch.setenv("WHISPERX_BATCH_WINDOW_MS", "200")
+    monkeypatch.setenv("WHISPERX_MAX_QUEUE", "4")
+    server = _load_server()
+    calls = []
+
+    def _batch(jobs):
+        calls.append([bytes(job["audio_bytes"]).decode() for job in jobs])
+        return [{"text": bytes(job["audio_bytes"]).decode(), "segments": []} for job in jobs]
+
+    server._transcribe_batch = _batch
+
+    async def _drive():
+        async def _one(payload):
+            resp = await server._handle_transcription(
+                file=_ChunkedUpload(0, payload=payload.encode()),
+                language=None,
+                response_format="json",
+                timestamp_granularities=None,
+                diarize=False,
+                min_speakers=None,
+                max_speakers=None,
+            )
+            return resp.content["text"]
+
+        return await asyncio.gather(_one("a"), _one("b"), _one("c"))
+
+    texts = asyncio.run(_drive())
+    assert len(calls) == 1  # one GPU batch for all three
+    assert sorted(calls[0]) == ["a", "b", "c"]
+    assert texts == ["a", "b", "c"]  # every request got its own result
+
+
+def test_batcher_raises_per_request_failures(monkeypatch):
+    monkeypatch.setenv("WHISPERX_BATCH_WINDOW_MS", "1")
+    server = _load_server()
+    server._transcribe_batch = lambda jobs: [ValueError("undecodable")] * len(jobs)
+    with pytest.raises(ValueError, match="undecodable"):
+        _handle(server)
+
+
+class _FakeVad:
+    """Splits every clip into two equal VAD chunks."""
+
+    @staticmethod
+    def preprocess_audio(audio):
+        return audio
+
+    def __call__(self, inputs):
+        return inputs["waveform"]
+
+    @staticmethod
+    def merge_chunks(audio, chunk_size, onset, offset):
+        half = len(audio) / 16000 / 2
+        return [{"start": 0.0, "end": half}, {"start": half, "end": 2 * half}]
+
+
+class _FakePipeline:
+    """FasterWhisperPipeline stand-in recording each batched pass."""
+
+    suppress_numerals = False
+
+    def __init__(self):
+        self.vad_model = _FakeVad()
+        self.tokenizer = None
+        self.options = object()
+        self.passes = []
+
+    def detect_language(self, audio):
+        return "es"
+
+    def __call__(self, inputs, batch_size, num_workers):
+        chunks = [item["inputs"] for item in inputs]
+        self.passes.append((self.tokenizer, [len(c) for c in chunks]))
+        return [{"text": f"{self.tokenizer}:{len(c)}", "avg_logprob": -0.1} for c in chunks]
+
+
+def test_transcribe_packed_one_pass_per_language():
+    """Chunks of every clip sharing a language go through one pipeline call and
+    are scattered back to their own clip in order."""
+    server = _load_server()
+    server._pipeline_tokenizer = lambda model, language: language
+    model = _FakePipeline()
+    clips = [([0.0] * 16000, None), ([0.0] * 32000, None), ([0.0] * 8000, "en")]
+
+    results = server._transcribe_packed(model, clips)
+
+    assert model.passes == [("es", [8000, 8000, 16000, 16000]), ("en", [4000, 4000])]
+    assert [r["language"] for r in results] == ["es", "es", "en"]
+    assert [s["text"] for s in results[1]["segments"]] == ["es:16000", "es:16000"]
+    assert results[1]["segments"][1]["start"] == 1.0
+    assert results[2]["segments"][0] == {
+        "text": "en:4000",
+        "start": 0.0,
+        "end": 0.25,
+        "avg_logprob": -0.1,
+    }
+    assert model.tokenizer is None  # restored for auto-detecting callers
+
+
+def test_transcribe_batch_isolates_decode_failure():
+    """An upload that fails to decode fails alone; the rest of the batch is served."""
+    server = _load_server()
+
+    def _load_audio(path):
+        if path == "bad":
+            raise RuntimeError("ffmpeg failed")
+        return [0.0] * 16000
+
+    server.whisperx.load_audio = _load_audio
+    server._get_whisper = lambda name: _FakePipeline()
+    server._pipeline_tokenizer = lambda model, language: language
+
+    def _job(path):
+        return {
+            "audio_path": path,
+            "audio_bytes": None,
+            "audio_suffix": ".wav",
+            "language": None,
+            "want_words": False,
+            "diarize": False,
+            "min_speakers": None,
+            "max_speakers": None,
+        }
+
+    good, bad = server._transcribe_batch([_job("good"), _job("bad")])
+    assert isinstance(bad, RuntimeError)
+    assert good["text"] == "es:8000 es:8000"
+    assert good["duration"] == 1.0
+    assert server._HEALTHY is True
+
+
+# ---------------------------------------------------------------------------
+# in-memory decode: no temp file or ffmpeg for PCM uploads
+# ---------------------------------------------------------------------------
+def _wav_bytes(samples, rate=16000, channels=1):
+    import wave
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return buf.getvalue()
+
+
+def _server_without_ffmpeg():
+    server = _load_server()
+
+    def _must_not_spawn(path):
+        raise AssertionError("ffmpeg path used for a PCM upload")
+
+    server.whisperx.load_audio = _must_not_spawn
+    return server
+
+
+def test_pcm16_wav_decoded_in_memory():
+    server = _server_without_ffmpeg()
+    audio = server._load_audio(None, _wav_bytes([0, 16384, -32768, 32767]), ".wav")
+    assert audio.dtype == np.float32
+    assert audio.tolist() == [0.0, 0.5, -1.0, 32767 / 32768]
+
+
+def test_stereo_wav_downmixed():
+    server = _server_without_ffmpeg()
+    audio = server._load_audio(None, _wav_bytes([16384, 0, -16384, -16384], channels=2), ".wav")
+    assert audio.tolist() == [0.25, -0.5]
+
+
+def test_raw_pcm_read_as_16k_mono():
+    server = _server_without_ffmpeg()
+    data = np.asarray([16384, -16384, 7], dtype="<i2").tobytes() + b"\x01"  # odd trailing byte
+    audio = server._load_audio(None, data, ".pcm")
+    assert audio.tolist() == [0.5, -0.5, 7 / 32768]
+
+
+def test_undecodable_upload_falls_back_to_ffmpeg(monkeypatch):
+    """A WAV PyAV can't take (here: PyAV absent) goes to whisperx.load_audio via a temp file."""
+    server = _load_server()
+    monkeypatch.setitem(sys.modules, "faster_whisper", None)
+    seen = {}
+
+    def _load_audio(path):
+        seen["path"] = path
+        with open(path, "rb") as f:
+            seen["data"] = f.read()
+        return [0.0] * 8
+
+    server.whisperx.load_audio = _load_audio
+    data = _wav_bytes([1, 2, 3], rate=8000)
+    assert server._load_audio(None, data, ".wav") == [0.0] * 8
+    assert seen["path"].endswith(".wav")
+    assert seen["data"] == data
+
+
+def test_large_upload_spills_to_disk(monkeypatch):
+    monkeypatch.setenv("WHISPERX_IN_MEMORY_UPLOAD_BYTES", "8")
+    server = _load_server()
+    recorded = {}
+
+    def _recorder(**kwargs):
+        recorded.update(kwargs)
+        with open(kwargs["audio_path"], "rb") as f:
+            recorded["on_disk"] = f.read()
+        return {"text": "hi", "segments": []}
+
+    server._transcribe = _recorder
+    _handle(server, upload=_ChunkedUpload(3 * server._UPLOAD_CHUNK_BYTES + 1))
+    assert recorded["audio_bytes"] is None
+    assert recorded["on_disk"] == b"x" * (3 * server._UPLOAD_CHUNK_BYTES + 1)
+
+
+# ---------------------------------------------------------------------------
+# stage pipelining: ASR of one request overlaps diarization of another
+# ---------------------------------------------------------------------------
+def test_pipelined_stages_overlap_but_never_self_overlap(monkeypatch):
+    monkeypatch.setenv("WHISPERX_PIPELINE_STAGES", "true")
+    server = _load_server()
+    spans = {"asr": [], "align": [], "diarize": []}
+    lock = threading.Lock()
+
+    def _timed(stage, seconds, value):
+        def _run(*args, **kwargs):
+            start = time.monotonic()
+            time.sleep(seconds)
+            with lock:
+                spans[stage].append((start, time.monotonic()))
+            return value
+
+        return _run
+
+    segments = {"segments": [{"text": "hi", "start": 0.0, "end": 1.0}], "language": "en"}
+    server._load_audio = lambda *a: [0.0] * 16000
+    server._asr = _timed("asr", 0.1, segments)
+    server._align_stage = _timed("align", 0.02, (segments, "en", False, True))
+    server._diarize_stage = _timed("diarize", 0.1, (segments, ["SPEAKER_00"]))
+
+    async def _drive():
+        async def _one():
+            return await server._handle_transcription(
+                file=_FakeUpload(),
+                language=None,
+                response_format="verbose_json",
+                timestamp_granularities=None,
+                diarize=True,
+                min_speakers=None,
+                max_speakers=None,
+            )
+
+        return await asyncio.gather(_one(), _one())
+
+    responses = asyncio.run(_drive())
+    assert [r.content["speakers"] for r in responses] == [["SPEAKER_00"], ["SPEAKER_00"]]
+    for stage, intervals in spans.items():
+        (a0, a1), (b0, b1) = sorted(intervals)
+        assert a1 <= b0, f"{stage} ran twice at once"
+    first_diarize, second_asr = sorted(spans["diarize"])[0], sorted(spans["asr"])[1]
+    assert second_asr[0] < first_diarize[1] and first_diarize[0] < second_asr[1]
+
+
+def test_pipelined_result_matches_serial(monkeypatch):
+    """The staged path produces the same response as _transcribe."""
+
+    def _run(pipelined):
+        if pipelined:
+            monkeypatch.setenv("WHISPERX_PIPELINE_STAGES", "true")
+        else:
+            monkeypatch.delenv("WHISPERX_PIPELINE_STAGES", raising=False)
+        server = _load_server()
+        server.whisperx.load_audio = lambda path: [0.0] * 16000
+        server._get_whisper = lambda name: _FakeModel()
+        server.whisperx.align = lambda segments, *a, **k: {
+            "segments": [
+                dict(seg, words=[{"word": "hola", "start": 0.1, "end": 0.5}]) for seg in segments
+            ]
+        }
+        server.IN_MEMORY_UPLOAD_BYTES = 0
+        return _handle(
+            server, response_format="verbose_json", timestamp_granularities=["word"]
+        ).content
+
+    assert _run(pipelined=True) == _run(pipelined=False)
+
+
+# ---------------------------------------------------------------------------
+# stream=true: segments reach the client as they decode
+# ---------------------------------------------------------------------------
+def _stream(server, **overrides):
+    """Run a stream=true request to completion; returns (response, body chunks)."""
+
+    async def _run():
+        response = await server._handle_transcription(
+            file=overrides.pop("upload", None) or _FakeUpload(),
+            language=None,
+            response_format=overrides.pop("response_format", "json"),
+            timestamp_granularities=None,
+            diarize=False,
+            min_speakers=None,
+            max_speakers=None,
+            stream=True,
+            **overrides,
+        )
+        return response, [chunk async for chunk in response.body_iterator]
+
+    return asyncio.run(_run())
+
+
+def _streaming_server():
+    server = _load_server()
+    server._load_audio = lambda path, data, suffix: [0.0] * 16000
+    server._get_whisper = lambda name: _FakePipeline()
+    server._pipeline_tokenizer = lambda model, language: language
+    # the buffered path decodes the same way, so the two can be compared
+    server._asr = lambda audio, language, align=False: server._transcribe_packed(
+        server._get_whisper(None), [(audio, language)], [align]
+    )[0]
+    return server
+
+
+def _admission_all_free(server):
+    taken = [server._ADMISSION.acquire(blocking=False) for _ in range(server._ADMISSION_CAPACITY)]
+    return all(taken) and not server._ADMISSION.acquire(blocking=False)
+
+
+def test_stream_sends_sse_deltas_then_done():
+    """json streams one transcript.text.delta per segment, then the full text."""
+    server = _streaming_server()
+
+    response, chunks = _stream(server)
+
+    assert response.media_type == "text/event-stream"
+    events = [json.loads(c.removeprefix("data: ")) for c in chunks]
+    assert [e["type"] for e in events] == [
+        "transcript.text.delta",
+        "transcript.text.delta",
+        "transcript.text.done",
+    ]
+    assert "".join(e["delta"] for e in events[:2]) == events[2]["text"] == "es:8000 es:8000"
+    # the admission token was handed to the stream and released when it ended
+    assert _admission_all_free(server)
+
+
+@pytest.mark.parametrize("fmt", ["srt", "vtt"])
+def test_streamed_subtitles_match_buffered(fmt):
+    """Cue-by-cue srt/vtt concatenates to exactly the non-streamed body."""
+    server = _streaming_server()
+    buffered = _handle(server, response_format=fmt).content
+
+    response, chunks = _stream(server, response_format=fmt)
+
+    assert len(chunks) == (2 if fmt == "srt" else 3)
+    assert "".join(chunks) == buffered
+    assert response.media_type == server._SUBTITLE_MEDIA_TYPES[fmt]
+
+
+def test_stream_failure_sent_as_error_event():
+    """A failure after the response started arrives in-band, and still frees the token."""
+    server = _streaming_server()
+
+    def _fail(*args, **kwargs):
+        raise RuntimeError("CUDA error: an illegal memory access was encountered")
+
+    server._load_audio = _fail
+
+    _, chunks = _stream(server)
+
+    assert [json.loads(c.removeprefix("data: ")) for c in chunks] == [
+        {"type": "error", "error": {"message": "internal error during transcription", "code": 500}}
+    ]
+    assert server._HEALTHY is False
+    assert _admission_all_free(server)
+
+
+# ---------------------------------------------------------------------------
+# replicas: independent pipelines in one container, least-loaded dispatch
+# ---------------------------------------------------------------------------
+def test_replicas_default_to_one_per_cpu_thread_group(monkeypatch):
+    monkeypatch.setenv("WHISPERX_REPLICAS", "auto")
+    monkeypatch.setenv("WHISPERX_CPU_THREADS_PER_REPLICA", "2")
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    server = _load_server()
+    assert [r.device for r in server._REPLICAS] == ["cpu"] * 4
+    assert server.MAX_CONCURRENT_REQUESTS == 4
+    assert server._ADMISSION_CAPACITY == 4 + server.MAX_QUEUE
+
+
+def test_dispatch_picks_least_loaded_replica(monkeypatch):
+    monkeypatch.setenv("WHISPERX_REPLICAS", "3")
+    server = _load_server()
+    for replica, load in zip(server._REPLICAS, [2, 0, 1]):
+        replica.in_flight = load
+    assert server._dispatch() is server._REPLICAS[1]
+    assert server._dispatch() in server._REPLICAS[1:]  # 2, 1, 1 -> a tie on one
+
+
+def test_replicas_serve_concurrently_on_their_own_models(monkeypatch):
+    """Two requests run at once, each on a different replica's model, and every
+    replica still runs one transcription at a time."""
+    monkeypatch.setenv("WHISPERX_REPLICAS", "2")
+    monkeypatch.setenv("WHISPERX_MAX_QUEUE", "2")
+    server = _load_server()
+    server.whisperx.load_model = lambda *a, **k: object()
+    live = {"cur": 0, "max": 0}
+    used: list[tuple[int, int]] = []
+    lock = threading.Lock()
+
+    def _transcribe(**kwargs):
+        replica = server._replica()
+        with lock:
+            live["cur"] += 1
+            live["max"] = max(live["max"], live["cur"])
+            used.append((replica.index, id(server._get_whisper("large-v2"))))
+        time.sleep(0.05)
+        with lock:
+            live["cur"] -= 1
+        return {"text": "hi", "segments": []}
+
+    server._transcribe = _transcribe
+
+    async def _drive():
+        async def _one():
+            return await server._handle_transcription(
+                file=_FakeUpload(),
+                language=None,
+                response_format="json",
+                timestamp_granularities=None,
+                diarize=False,
+                min_speakers=None,
+                max_speakers=None,
+            )
+
+        await asyncio.gather(_one(), _one(), _one(), _one())
+
+    asyncio.run(_drive())
+    assert live["max"] == 2
+    assert sorted(index for index, _ in used) == [0, 0, 1, 1]
+    models = {index: {model for i, model in used if i == index} for index, _ in used}
+    assert len(models[0]) == len(models[1]) == 1 and models[0] != models[1]
+    assert [r.in_flight for r in server._REPLICAS] == [0, 0]
+
+
+# ---------------------------------------------------------------------------
+# result cache: a resubmitted clip skips inference
+# ---------------------------------------------------------------------------
+def _cached_server():
+    server = _load_server()
+    server.IN_MEMORY_UPLOAD_BYTES = 0
+    server.whisperx.load_audio = lambda path: [0.25] * 16000
+    calls = []
+
+    class _CountingModel(_FakeModel):
+        def transcribe(self, audio, **kwargs):
+            calls.append(kwargs)
+            return super().transcribe(audio, **kwargs)
+
+    server._get_whisper = lambda name: _CountingModel()
+    return server, calls
+
+
+def test_result_cache_off_by_default():
+    server = _load_server()
+    assert server._RESULT_CACHE is None
+    assert "whisperx_result_cache_misses_total 0" in server.metrics().content
+
+
+def test_result_cache_serves_repeats_in_any_format(monkeypatch):
+    """Same audio and knobs: one inference for a retry and a re-render; another
+    knob value is its own entry."""
+    monkeypatch.setenv("WHISPERX_RESULT_CACHE_BYTES", "1000000")
+    server, calls = _cached_server()
+
+    first = _handle(server).content
+    assert _handle(server).content == first
+    assert _handle(server, response_format="srt").content.startswith("1\n")
+    assert len(calls) == 1
+    _handle(server, language="es")
+    assert len(calls) == 2
+
+    body = server.metrics().content
+    assert 'whisperx_result_cache_hits_total{tier="memory"} 2' in body
+    assert "whisperx_result_cache_misses_total 2" in body
+
+
+def test_result_cache_disk_tier_outlives_the_process(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHISPERX_RESULT_CACHE_DIR", str(tmp_path))
+    server, calls = _cached_server()
+    first = _handle(server, response_format="verbose_json").content
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    server, calls = _cached_server()  # a fresh process: empty memory tier
+    assert _handle(server, response_format="verbose_json").content == first
+    assert calls == []
+    assert 'whisperx_result_cache_hits_total{tier="disk"} 1' in server.metrics().content
+
+
+def test_result_cache_memory_tier_evicts_least_recently_used(tmp_path):
+    server = _load_server()
+    entry = {"text": "x" * 80}
+    size = len(json.dumps(entry))
+    cache = server._ResultCache(2 * size, None, 0)
+    cache.put("a", entry)
+    cache.put("b", entry)
+    assert cache.get("a") == entry  # "b" is now the oldest
+    cache.put("c", entry)
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == entry
+    assert cache.memory_bytes == 2 * size
+
+    disk = server._ResultCache(0, str(tmp_path), size)
+    disk.put("a", entry)
+    disk.put("b", entry)
+    assert [p.name for p in tmp_path.glob("*.json")] == ["b.json"]
+    assert disk.disk_bytes == size
+
+
+# ---------------------------------------------------------------------------
+# windowed long-audio mode: overlapping windows, stitched once
+# ---------------------------------------------------------------------------
+def test_iter_windows_overlap_and_cover_the_stream():
+    server = _load_server()
+    samples = np.arange(25, dtype=np.float32)
+    blocks = iter(np.array_split(samples, 9))
+
+    windows = [(s, w.copy(), last) for s, w, last in server._iter_windows(blocks, 10, 4)]
+
+    assert [(s, len(w), last) for s, w, last in windows] == [
+        (0, 10, False),
+        (6, 10, False),
+        (12, 10, False),
+        (18, 7, True),
+    ]
+    assert all((w == samples[s : s + len(w)]).all() for s, w, _ in windows)
+    short = list(server._iter_windows(iter([samples[:5]]), 10, 4))
+    assert [(s, len(w), last) for s, w, last in short] == [(0, 5, True)]
+
+
+def _windowed_server(monkeypatch, **env):
+    """Server in 10 s windows (4 s overlap) with a fake ASR that reads its position.
+
+    Each sample of a _stamped_wav encodes its second, so the ASR knows where
+    its window sits and emits the 2 s segments that fit inside it,
+    window-relative. Returns the server and the list of ASR input lengths.
+    """
+    monkeypatch.setenv("WHISPERX_LONG_AUDIO_WINDOW_SECONDS", "10")
+    monkeypatch.setenv("WHISPERX_LONG_AUDIO_OVERLAP_SECONDS", "4")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    server = _load_server()
+
+    def _must_not_load_whole(*args):
+        raise AssertionError("audio decoded whole")
+
+    server._load_audio = _must_not_load_whole
+    lengths = []
+
+    def _asr(audio, language, align=False):
+        lengths.append(len(audio))
+        offset = int(round(audio[0] * 32768))
+        end = offset + len(audio) // 16000
+        starts = range(offset + offset % 2, end - 1, 2)
+        return {
+            "segments": [
+                {"text": f"s{t}", "start": float(t - offset), "end": float(t - offset + 2)}
+                for t in starts
+            ],
+            "language": "en",
+        }
+
+    server._asr = _asr
+    return server, lengths
+
+
+def _stamped_wav(seconds):
+    return _wav_bytes(np.repeat(np.arange(seconds), 16000))
+
+
+def test_windowed_transcription_stitches_overlapping_windows(monkeypatch):
+    """A 25 s clip in 10 s windows (4 s overlap) keeps every 2 s segment once."""
+    server, lengths = _windowed_server(monkeypatch)
+    result = server._transcribe(
+        audio_path=None,
+        language=None,
+        want_words=False,
+        diarize=False,
+        min_speakers=None,
+        max_speakers=None,
+        audio_bytes=_stamped_wav(25),
+    )
+
+    assert [seg["text"] for seg in result["segments"]] == [f"s{t}" for t in range(0, 24, 2)]
+    assert [seg["start"] for seg in result["segments"]] == [float(t) for t in range(0, 24, 2)]
+    assert result["duration"] == 25.0
+    assert result["language"] == "en"
+    assert max(lengths) == 10 * 16000  # never more than one window at a time
+
+
+def test_windowed_transcription_trims_speech_cut_differently(monkeypatch):
+    """Windows that segment the overlap differently still keep each word once.
+
+    A 16 s clip in 10 s windows (4 s overlap) holds one word per second. The
+    first window cuts it at 0/4/7 s, the second at 6/9/12 s: its first segment
+    repeats w6, which the first window already kept, and adds w7 and w8, which
+    it did not.
+    """
+    server, _ = _windowed_server(monkeypatch)
+    cuts = {0: [0, 4, 7, 10], 6: [6, 9, 12, 16]}
+
+    def _asr(audio, language, align=False):
+        offset = int(round(audio[0] * 32768))
+        bounds = cuts[offset]
+        segments = []
+        for first, stop in zip(bounds, bounds[1:]):
+            words = [
+                {"word": f"w{t}", "start": float(t - offset), "end": t - offset + 0.8}
+                for t in range(first, stop)
+            ]
+            segments.append(
+                {
+                    "text": " " + " ".join(w["word"] for w in words) + ".",
+                    "start": words[0]["start"],
+                    "end": words[-1]["end"],
+                    "words": words,
+                }
+            )
+        return {"segments": segments, "language": "en"}
+
+    server._asr = _asr
+    server._align_stage = lambda result, audio, language, want_words, diarize: (
+        result,
+        "en",
+        want_words,
+        diarize,
+    )
+    result = server._transcribe(
+        audio_path=None,
+        language=None,
+        want_words=True,
+        diarize=False,
+        min_speakers=None,
+        max_speakers=None,
+        audio_bytes=_stamped_wav(16),
+    )
+
+    assert [seg["text"] for seg in result["segments"]] == [
+        " w0 w1 w2 w3.",
+        " w4 w5 w6.",
+        " w7 w8.",
+        " w9 w10 w11.",
+        " w12 w13 w14 w15.",
+    ]
+    words = [word for seg in result["segments"] for word in seg["words"]]
+    assert [word["word"] for word in words] == [f"w{t}" for t in range(16)]
+    assert [word["start"] for word in words] == [float(t) for t in range(16)]
+    assert result["segments"][2]["start"] == 7.0
+
+
+@pytest.mark.parametrize(
+    "env",
+    [{"WHISPERX_PIPELINE_STAGES": "true"}, {"WHISPERX_BATCH_WINDOW_MS": "5"}],
+    ids=["pipelined", "batched"],
+)
+def test_long_in_memory_upload_windowed_when_staged_or_batched(monkeypatch, env):
+    """Windowing follows the decoded duration, not where the upload was kept."""
+    server, lengths = _windowed_server(monkeypatch, **env)
+    upload = _ChunkedUpload(0, payload=_stamped_wav(25))
+
+    content = _handle(server, upload=upload, response_format="verbose_json").content
+
+    assert [seg["text"] for seg in content["segments"]] == [f"s{t}" for t in range(0, 24, 2)]
+    assert max(lengths) == 10 * 16000
+
+
+@pytest.mark.parametrize(
+    "env",
+    [{"WHISPERX_PIPELINE_STAGES": "true"}, {"WHISPERX_BATCH_WINDOW_MS": "5"}],
+    ids=["pipelined", "batched"],
+)
+def test_short_upload_decoded_once_when_staged_or_batched(monkeypatch, env):
+    """A clip within one window keeps the staged or batched path, and its first decode."""
+    server, lengths = _windowed_server(monkeypatch, **env)
+    server._transcribe_packed = lambda model, clips, align: [
+        server._asr(audio, language) for audio, language in clips
+    ]
+    server._get_whisper = lambda name: None
+    upload = _ChunkedUpload(0, payload=_stamped_wav(6))
+
+    content = _handle(server, upload=upload, response_format="verbose_json").content
+
+    assert [seg["text"] for seg in content["segments"]] == ["s0", "s2", "s4"]
+    assert lengths == [6 * 16000]
+
+
+def test_long_upload_streamed_window_by_window(monkeypatch):
+    """stream=true sends each window's segments as it finishes, then the whole text."""
+    server, lengths = _windowed_server(monkeypatch)
+
+    _, chunks = _stream(server, upload=_ChunkedUpload(0, payload=_stamped_wav(25)))
+
+    events = [json.loads(c.removeprefix("data: ")) for c in chunks]
+    assert [e["type"] for e in events] == ["transcript.text.delta"] * 12 + ["transcript.text.done"]
+    assert events[-1]["text"] == " ".join(f"s{t}" for t in range(0, 24, 2))
+    assert max(lengths) == 10 * 16000
+    assert _admission_all_free(server)
+
+
+def _echo_ffmpeg(server, monkeypatch, fail=False, script=None):
+    """Make ffmpeg a process that copies stdin to stdout (or fails), recording commands."""
+    commands = []
+    real_popen = server.subprocess.Popen
+    script = script or (
+        "import shutil, sys; sys.exit(3)"
+        if fail
+        else "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"
+    )
+
+    def _popen(cmd, **kwargs):
+        commands.append(cmd)
+        return real_popen([sys.executable, "-c", script], **kwargs)
+
+    monkeypatch.setattr(server.subprocess, "Popen", _popen)
+    return commands
+
+
+def test_compressed_in_memory_upload_piped_to_ffmpeg(monkeypatch):
+    """Non-PCM bytes are fed to ffmpeg's stdin and come back a block at a time."""
+    server = _load_server()
+    commands = _echo_ffmpeg(server, monkeypatch)
+    # bigger than a pipe buffer, so a feed that blocked the reader would hang
+    samples = np.arange(3 * server._UPLOAD_CHUNK_BYTES // 2, dtype=np.int64) % 20000
+    data = samples.astype("<i2").tobytes()
+
+    blocks = list(server._iter_audio_blocks(None, data, ".mp3"))
+
+    assert commands[0][commands[0].index("-i") + 1] == "pipe:0"
+    assert len(blocks) > 1
+    assert np.concatenate(blocks).tolist() == (samples / 32768.0).astype(np.float32).tolist()
+
+
+def test_piped_decode_failure_retried_from_temp_file(monkeypatch):
+    server = _load_server()
+    commands = _echo_ffmpeg(server, monkeypatch, fail=True)
+
+    with pytest.raises(RuntimeError):
+        list(server._iter_audio_blocks(None, b"not audio", ".m4a"))
+
+    inputs = [cmd[cmd.index("-i") + 1] for cmd in commands]
+    assert inputs[0] == "pipe:0"
+    assert inputs[1].endswith(".m4a")
+
+
+def test_ffmpeg_error_output_drained_while_decoding(monkeypatch):
+    """Errors beyond a pipe buffer neither stall ffmpeg nor grow the message unbounded."""
+    server = _load_server()
+    _echo_ffmpeg(
+        server,
+        monkeypatch,
+        script=(
+            "import sys\n"
+            "for i in range(4096): sys.stderr.write(f'bad packet {i:06d}\\n' * 8)\n"
+            "sys.stdout.buffer.write(bytes(64)); sys.exit(1)"
+        ),
+    )
+    errors = []
+
+    def _decode():
+        try:
+            list(server._ffmpeg_blocks("clip.mp3"))
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    decoder = threading.Thread(target=_decode, daemon=True)
+    decoder.start()
+    decoder.join(timeout=30)
+
+    assert not decoder.is_alive(), "ffmpeg stalled on a full stderr pipe"
+    assert len(errors) == 1
+    assert errors[0].rstrip().endswith("bad packet 004095")
+    assert len(errors[0]) < 2 * server._FFMPEG_STDERR_BYTES
+
+
+def test_speaker_clusters_keep_labels_across_windows():
+    server = _load_server()
+    clusters = server._SpeakerClusters(0.5)
+
+    first = clusters.assign({"SPEAKER_00": [1.0, 0.0], "SPEAKER_01": [0.0, 1.0]})
+    # pyannote numbers each window's speakers afresh; embeddings decide.
+    second = clusters.assign(
+        {"SPEAKER_00": [0.1, 1.0], "SPEAKER_01": [1.0, 0.05], "SPEAKER_02": [-1.0, 0.0]}
+    )
+
+    assert first == {"SPEAKER_00": "SPEAKER_00", "SPEAKER_01": "SPEAKER_01"}
+    assert second == {
+        "SPEAKER_00": "SPEAKER_01",
+        "SPEAKER_01": "SPEAKER_00",
+        "SPEAKER_02": "SPEAKER_02",
+    }
+    assert clusters.assign({"SPEAKER_00": None}) == {"SPEAKER_00": "SPEAKER_03"}